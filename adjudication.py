@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+提前裁决：在剩余步数内，若任何走法都已无法改变胜负（或平局）结果，则可以提前结束对局。
+
+胜负规则与模拟器一致：按各玩家目标区域内的棋子数排名，得分相同时玩家编号小者优先，
+所有玩家得分都为 0 时判为平局（winner = 0）。
+
+对每个玩家估计剩余步数内得分的上下界：
+  - 下界：每步最多把一颗己方棋子移出目标区，且目标区内的棋子至少需要
+    ceil(到目标区外的切比雪夫距离 / 2) 步才能离开，按所需步数从少到多累加，不超过剩余己方步数；
+  - 上界：目标区外的每颗棋子至少需要 ceil(到目标区的切比雪夫距离 / 2) 步才能进入
+    （单步最多前进 1 格，跳跃最多 2 格），按所需步数从少到多累加，不超过剩余己方步数。
+"""
+import numpy as np
+
+from ai.geometry import DEFAULT_GEOMETRY, PLAYERS
+
+
+def own_moves_left(player_id, plies_left, next_player):
+    """在剩余 plies_left 步（从 next_player 开始轮流）中，player_id 还能走几步"""
+    offset = (player_id - next_player) % len(PLAYERS)
+    if plies_left <= offset:
+        return 0
+    return (plies_left - offset + len(PLAYERS) - 1) // len(PLAYERS)
+
+
+def affordable(distances, moves):
+    """每颗棋子至少需要 ceil(距离 / 2) 步，moves 步之内最多能让几颗棋子完成"""
+    needed = np.sort((distances + 1) // 2)
+    return int(np.searchsorted(np.cumsum(needed), moves, side='right'))
+
+
+def score_bounds(board, plies_left, next_player, geometry=None):
+    """返回 {玩家: (最终得分下界, 最终得分上界)}"""
+    geometry = geometry or DEFAULT_GEOMETRY
+    bounds = {}
+    for p in PLAYERS:
+        moves = own_moves_left(p, plies_left, next_player)
+        target = geometry.target_masks[p]
+        mine = board == p
+        score = int(np.count_nonzero(mine & target))
+        upper = min(score + affordable(geometry.target_distance_tables[p][mine & ~target], moves),
+                    geometry.target_sizes[p])
+        lower = score - affordable(geometry.exit_distance_tables[p][mine & target], moves)
+        bounds[p] = (lower, upper)
+    return bounds
+
+
+def settled_result(board, plies_left, next_player, geometry=None):
+    """
+    若结果已成定局，返回 (True, winner)，winner 为 0 表示平局；否则返回 (False, None)。
+    """
+    bounds = score_bounds(board, plies_left, next_player, geometry)
+    if all(upper == 0 for _, upper in bounds.values()):
+        return True, 0
+    for p in PLAYERS:
+        lower = bounds[p][0]
+        if lower == 0:
+            continue
+        # 其他玩家即使拿到上界也追不上；得分相同时编号小者胜
+        if all(bounds[q][1] < lower or (bounds[q][1] == lower and q > p) for q in PLAYERS if q != p):
+            return True, p
+    return False, None
+
+
+def settled_team_result(board, plies_left, next_player, geometry=None, teams=((1, 4), (2, 3))):
+    """
+    两队对抗（teams 为两组座位，如 ((1, 4), (2, 3))）按队内得分之和比较时的定局判断：
+    一队得分和的下界超过另一队的上界，或两队的得分都已不可能再变且相等，返回 (True, None)，
+    这时按当前得分比较的结果与终局一致；否则返回 (False, None)。
+    """
+    bounds = score_bounds(board, plies_left, next_player, geometry)
+    (lower_a, upper_a), (lower_b, upper_b) = [
+        (sum(bounds[p][0] for p in seats), sum(bounds[p][1] for p in seats)) for seats in teams]
+    if lower_a > upper_b or lower_b > upper_a:
+        return True, None
+    if lower_a == upper_a == lower_b == upper_b:
+        return True, None
+    return False, None
@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本机 AI 走子服务：在 localhost TCP 端口上接受 choose_move 请求，由进程池中常驻的 AI 实例计算走法。
+
+协议为按行分隔的 JSON（每行一个请求或响应，UTF-8）：
+  请求  {"id": 7, "agent": "MCTS:time_limit=0.2", "player": 1, "board": [[0, 1, ...], ...], "camp_size": 3}
+        agent 也可以写作 {"name": "MCTS", "params": {"time_limit": 0.2}}；camp_size 可省略（默认 3），
+        棋盘尺寸取自 board 的形状。
+  响应  {"id": 7, "move": [[r, c], [r, c]], "time": 0.21}    无合法走法时 move 为 null
+        {"id": 7, "error": "..."}                           请求有误或 AI 出错
+同一连接上可以连续发送多个请求而不等待响应（流水线），响应按完成顺序返回，用 id 对应。
+
+每个工作进程按 (AI 配置, 玩家, 棋盘几何) 缓存 AI 实例，同一配置只在第一次请求时创建（导入模块、
+预计算等开销只付一次）。注意实例会被不同的请求复用，跟踪对局历史的选项（如 avoid_repetition、ponder）
+在服务中没有意义。
+
+各连接收到的请求进入一个有界队列，分发线程从队列中取出请求，每批最多 batch_size 个提交给进程池，
+同时在途的批次不超过 2 * workers。队列满时读取请求的线程阻塞，不再从该连接读数据，
+客户端的发送随之被 TCP 流量控制挡住（背压），服务端的内存占用不随负载增长。
+响应先放入各连接自己的发送队列，由该连接的写线程写出，客户端读得慢只会挡住它自己的写线程，
+不会挡住进程池的回调线程和其他连接的响应。
+
+  python cli.py serve --port 8765 --workers 4
+  python cli.py bench-service --clients 8 --requests 50 --agent Greedy
+"""
+import json
+import queue
+import socket
+import threading
+import time
+import multiprocessing
+import socketserver
+import concurrent.futures
+import numpy as np
+
+from stream_stats import MetricSummary
+
+DEFAULT_PORT = 8765
+
+# 工作进程中常驻的 AI 实例：(注册名, 参数, 玩家, 棋盘尺寸, 起始区边长) -> AI
+_worker_agents = {}
+
+
+def parse_agent_field(agent):
+    """请求中的 agent 字段 -> (注册名, 参数字典)"""
+    from ai.registry import parse_agent, get_spec
+    if isinstance(agent, str):
+        return parse_agent(agent)
+    name = get_spec(agent['name']).name
+    return name, dict(agent.get('params') or {})
+
+
+def get_worker_agent(name, params, player_id, shape, camp_size):
+    key = (name, json.dumps(params, sort_keys=True), player_id, shape, camp_size)
+    agent = _worker_agents.get(key)
+    if agent is None:
+        from ai.registry import create_agent
+        from ai.geometry import get_geometry
+        geometry = get_geometry(shape[0], shape[1], camp_size)
+        agent = _worker_agents[key] = create_agent(name, player_id, geometry=geometry, **params)
+    return agent
+
+
+def serve_request(request):
+    """在工作进程中处理一个请求，返回响应字典（异常也转换为响应）"""
+    response = {'id': request.get('id')}
+    try:
+        name, params = parse_agent_field(request['agent'])
+        board = np.array(request['board'], dtype=int)
+        agent = get_worker_agent(name, params, int(request['player']), board.shape, request.get('camp_size', 3))
+        if hasattr(agent, 'new_game'):
+            # 实例被不相关的请求复用：每个请求按新的一局处理，对局时钟等不跨请求累计
+            agent.new_game()
+        start = time.perf_counter()
+        move = agent.choose_move(board)
+        response['time'] = time.perf_counter() - start
+        response['move'] = None if move is None else [[int(v) for v in pos] for pos in move]
+    except Exception as e:
+        response['error'] = f"{type(e).__name__}: {e}"
+    return response
+
+
+def serve_batch(requests):
+    return [serve_request(request) for request in requests]
+
+
+class AgentService:
+    """
+    请求分发：有界队列 + 进程池。
+    submit(request, reply) 把请求放入队列（队列满时阻塞），算完后在进程池的回调线程中调用 reply(响应)，
+    所有连接共用这个线程，reply 不能阻塞（RequestHandler 只把响应放入连接的发送队列）。
+    """
+    def __init__(self, workers=None, batch_size=8, max_queue=256):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.batch_size = batch_size
+        self.requests = queue.Queue(maxsize=max_queue)
+        self.in_flight = threading.BoundedSemaphore(2 * self.workers)
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        self.served = 0
+        self.batches = 0
+        self._dispatcher = threading.Thread(target=self.dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, request, reply):
+        self.requests.put((request, reply))
+
+    def dispatch(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            batch = [item]
+            # 只取已经排队的请求，不为凑满一批而等待
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.requests.put(None)
+                    break
+                batch.append(item)
+            self.in_flight.acquire()
+            future = self.executor.submit(serve_batch, [request for request, _ in batch])
+            future.add_done_callback(lambda f, batch=batch: self.finish(f, batch))
+
+    def finish(self, future, batch):
+        self.in_flight.release()
+        self.batches += 1
+        try:
+            responses = future.result()
+        except Exception as e:
+            responses = [{'id': request.get('id'), 'error': f"{type(e).__name__}: {e}"} for request, _ in batch]
+        for (_, reply), response in zip(batch, responses):
+            self.served += 1
+            reply(response)
+
+    def close(self):
+        self.requests.put(None)
+        self._dispatcher.join()
+        self.executor.shutdown()
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    # 响应是一行行的小包，关闭 Nagle 算法，否则与客户端的延迟确认叠加会让每个响应多等约 40 ms
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        service = self.server.service
+        # 本连接的发送队列：reply 只入队，由写线程写出；None 表示结束
+        outbound = queue.Queue()
+        # 本连接尚未写出的响应数；客户端关闭发送方向后，等这些响应写完再关闭连接
+        pending = [0]
+        done = threading.Condition()
+
+        def write_responses():
+            connected = True
+            while True:
+                response = outbound.get()
+                if response is None:
+                    return
+                if connected:
+                    try:
+                        self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+                        # 队列中还有响应时先不 flush，合并成一次发送
+                        if outbound.empty():
+                            self.wfile.flush()
+                    except OSError:
+                        # 客户端已断开，之后的响应都丢弃
+                        connected = False
+                with done:
+                    pending[0] -= 1
+                    done.notify_all()
+
+        writer = threading.Thread(target=write_responses, daemon=True)
+        writer.start()
+        try:
+            for line in self.rfile:
+                line = line.strip()
+                if not line:
+                    continue
+                with done:
+                    pending[0] += 1
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    outbound.put({'id': None, 'error': f"JSON 格式错误: {e}"})
+                    continue
+                service.submit(request, outbound.put)
+        finally:
+            with done:
+                done.wait_for(lambda: pending[0] == 0)
+            outbound.put(None)
+            writer.join()
+
+
+class AgentServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, workers=None, batch_size=8, max_queue=256):
+        self.service = AgentService(workers, batch_size, max_queue)
+        super().__init__((host, port), RequestHandler)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """在后台线程中开始服务，返回线程"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def server_close(self):
+        super().server_close()
+        self.service.close()
+
+
+class AgentClient:
+    """服务的客户端（每个实例一个连接，不可在线程间共享）"""
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.rfile = self.sock.makefile('rb')
+        self.next_id = 0
+
+    def request(self, board, player_id, agent, camp_size=3):
+        self.next_id += 1
+        board = board.tolist() if isinstance(board, np.ndarray) else board
+        return {'id': self.next_id, 'agent': agent, 'player': player_id, 'board': board, 'camp_size': camp_size}
+
+    def send(self, requests):
+        self.sock.sendall("".join(json.dumps(r) + "\n" for r in requests).encode('utf-8'))
+
+    def receive(self):
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("服务已断开连接")
+        return json.loads(line)
+
+    def choose_move(self, board, player_id, agent, camp_size=3):
+        """发送一个请求并等待走法"""
+        self.send([self.request(board, player_id, agent, camp_size)])
+        response = self.receive()
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return None if response['move'] is None else tuple(tuple(pos) for pos in response['move'])
+
+    def choose_moves(self, requests):
+        """流水线发送多个请求 [(board, player_id, agent), ...]，按请求顺序返回响应字典"""
+        batch = [self.request(board, player_id, agent) for board, player_id, agent in requests]
+        self.send(batch)
+        responses = {}
+        while len(responses) < len(batch):
+            response = self.receive()
+            responses[response['id']] = response
+        return [responses[r['id']] for r in batch]
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+
+def run_load_test(host, port, agent, clients=8, requests=50, pipeline=1, seed=0):
+    """
+    clients 个线程各开一个连接，每次流水线发送 pipeline 个请求并等待全部响应，每个连接共 requests 个。
+    返回 {'requests', 'errors', 'elapsed', 'throughput', 'latency': MetricSummary（秒）}
+    """
+    from simulate_stats import sample_positions
+    positions = sample_positions(requests, seed=seed)
+    latency = MetricSummary()
+    lock = threading.Lock()
+    errors = [0]
+
+    def client_loop():
+        client = AgentClient(host, port)
+        try:
+            for i in range(0, len(positions), pipeline):
+                chunk = positions[i:i + pipeline]
+                start = time.perf_counter()
+                client.send([client.request(board, player, agent) for board, player in chunk])
+                # 每个响应的延迟从整组发出时算起
+                for _ in chunk:
+                    response = client.receive()
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        latency.add(elapsed)
+                        errors[0] += 'error' in response
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=client_loop) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    total = clients * len(positions)
+    return {'requests': total, 'errors': errors[0], 'elapsed': elapsed,
+            'throughput': total / elapsed if elapsed > 0 else 0.0, 'latency': latency}
+
+
+def print_load_result(agent, clients, pipeline, result):
+    t = result['latency'].summary()
+    print(f"{agent:<24}{clients:8d}{pipeline:9d}{result['requests']:10d}{result['errors']:8d}"
+          f"{result['throughput']:12.1f}{t['mean'] * 1000:10.1f}{t['p50'] * 1000:10.1f}"
+          f"{t['p95'] * 1000:10.1f}{t['p99'] * 1000:10.1f}")
+
+
+def print_load_header():
+    print(f"{'Agent':<24}{'Clients':>8}{'Pipeline':>9}{'Requests':>10}{'Errors':>8}"
+          f"{'Req/s':>12}{'Mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+
+
+if __name__ == '__main__':
+    server = AgentServer()
+    print(f"AI 服务监听 127.0.0.1:{server.port}，{server.service.workers} 个工作进程")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
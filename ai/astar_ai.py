@@ -3,14 +3,24 @@ import numpy as np
 import heapq
 import random
 from .move_utils import get_valid_moves, get_jump_moves
+from .geometry import DEFAULT_GEOMETRY
 
 class AStarAI:
-    def __init__(self, player_id):
+    def __init__(self, player_id, geometry=None, seed=None):
+        """
+        :param seed: 打乱棋子顺序所用的种子。None 时使用全局随机数；给出时由种子与局面哈希决定顺序，
+                     同一局面总是给出同一走法（可以使用决策缓存，见 decision_cache.py）
+        """
         self.player_id = player_id
+        self.geometry = geometry or DEFAULT_GEOMETRY
+        self.seed = seed
 
     def choose_move(self, board):
         positions = [tuple(pos) for pos in np.argwhere(board == self.player_id)]
-        random.shuffle(positions)
+        if self.seed is None:
+            random.shuffle(positions)
+        else:
+            random.Random(self.geometry.position_hash(board, self.player_id) ^ self.seed).shuffle(positions)
         for pos in positions:
             if self.in_target_area(pos):
                 continue
@@ -22,7 +32,7 @@ class AStarAI:
         for pos in positions:
             if self.in_target_area(pos):
                 continue
-            for move in get_valid_moves(pos, board) + get_jump_moves(pos, board):
+            for move in get_valid_moves(pos, board, self.geometry) + get_jump_moves(pos, board, self.geometry):
                 h = self.heuristic(move)
                 if h < best_h:
                     best_h = h
@@ -48,14 +58,7 @@ class AStarAI:
         return None
 
     def heuristic(self, pos):
-        if self.player_id == 1:
-            target = (9, 9)
-        elif self.player_id == 2:
-            target = (9, 0)
-        elif self.player_id == 3:
-            target = (0, 9)
-        elif self.player_id == 4:
-            target = (0, 0)
+        target = self.geometry.entry_targets[self.player_id]
         return abs(pos[0] - target[0]) + abs(pos[1] - target[1])
 
     def reconstruct_path(self, came_from, current):
@@ -67,15 +70,7 @@ class AStarAI:
         return path
 
     def get_neighbors(self, pos, board):
-        return get_valid_moves(pos, board) + get_jump_moves(pos, board)
+        return get_valid_moves(pos, board, self.geometry) + get_jump_moves(pos, board, self.geometry)
 
     def in_target_area(self, pos):
-        if self.player_id == 1:
-            return pos[0] >= 9 and pos[1] >= 9
-        elif self.player_id == 2:
-            return pos[0] >= 9 and pos[1] < 3
-        elif self.player_id == 3:
-            return pos[0] < 3 and pos[1] >= 9
-        elif self.player_id == 4:
-            return pos[0] < 3 and pos[1] < 3
-        return False
+        return self.geometry.in_target(self.player_id, pos)
@@ -0,0 +1,100 @@
+# ai/batch.py
+"""
+批量分析：对一组局面（形状为 (N, 行, 列) 的棋盘数组）一次性求走法或评估值，结果以数组返回。
+
+  - evaluate_positions：距离评估（-距离和）对整批局面向量化计算，不逐个循环；
+  - choose_moves：局面分块后交给进程池，每块只把 AI 传给工作进程一次，
+    工作进程内逐个调用 choose_move（各 AI 的搜索本身无法跨局面向量化）。
+
+走法数组形状为 (N, 2, 2)，即 [[起点行, 起点列], [落点行, 落点列]]，无走法的局面填 -1。
+各 AI 的 choose_moves 方法，以及 Minimax / MCTS 的 evaluate_positions 方法即调用这里的函数
+（Greedy 只给走法打分，没有局面评估，不提供 evaluate_positions）。
+"""
+import random
+import concurrent.futures
+import numpy as np
+from .geometry import DEFAULT_GEOMETRY
+
+NO_MOVE = -1
+
+
+def stack_boards(boards):
+    """把单个棋盘、棋盘列表或数组统一为 (N, 行, 列) 的数组"""
+    boards = np.asarray(boards)
+    if boards.ndim == 2:
+        boards = boards[None]
+    if boards.ndim != 3:
+        raise ValueError(f"局面数组应为 (N, 行, 列)，实际形状 {boards.shape}")
+    return boards
+
+
+def distance_sums(boards, player_ids, geometry=None):
+    """
+    每个局面中该玩家棋子到目标角的曼哈顿距离之和（向量化）。
+    player_ids 为单个玩家ID，或与局面一一对应的数组。
+    """
+    geometry = geometry or DEFAULT_GEOMETRY
+    boards = stack_boards(boards)
+    player_ids = np.broadcast_to(np.asarray(player_ids), (len(boards),))
+    result = np.zeros(len(boards), dtype=int)
+    for p in np.unique(player_ids):
+        rows = player_ids == p
+        table = geometry.distance_tables[int(p)]
+        result[rows] = ((boards[rows] == p) * table).sum(axis=(1, 2))
+    return result
+
+
+def evaluate_positions(boards, player_ids, geometry=None):
+    """与 MinimaxAI / MCTSAI 的 evaluate 相同的评估（-距离和），返回 (N,) 数组"""
+    return -distance_sums(boards, player_ids, geometry)
+
+
+def moves_to_array(moves):
+    result = np.full((len(moves), 2, 2), NO_MOVE, dtype=int)
+    for i, move in enumerate(moves):
+        if move:
+            result[i] = move
+    return result
+
+
+def array_to_moves(array):
+    """moves_to_array 的逆变换，返回走法元组列表（无走法为 None）"""
+    return [None if row[0, 0] == NO_MOVE else (tuple(int(v) for v in row[0]), tuple(int(v) for v in row[1]))
+            for row in array]
+
+
+def choose_chunk(agent, boards, start=0, seed=None):
+    """
+    在工作进程中依次求一块局面的走法，start 为块中第一个局面的全局序号。
+    AI 使用全局 random，按 seed 设置种子时先保存全局随机状态，结束后恢复（workers=0 时在调用方进程中运行）
+    """
+    state = random.getstate() if seed is not None else None
+    try:
+        moves = []
+        for i, board in enumerate(boards):
+            if seed is not None:
+                random.seed(seed + start + i)
+            moves.append(agent.choose_move(board))
+        return moves_to_array(moves)
+    finally:
+        if state is not None:
+            random.setstate(state)
+
+
+def choose_moves(agent, boards, workers=0, chunks_per_worker=4, seed=None):
+    """
+    对每个局面调用 agent.choose_move，返回 (N, 2, 2) 走法数组。
+    :param workers: 进程数，0 表示在本进程内依次计算
+    :param chunks_per_worker: 每个进程分到的块数（块越多负载越均衡，传递 AI 的次数也越多）
+    :param seed: 不为 None 时每个局面前按 (seed + 局面序号) 设置随机种子，
+                 带随机性的 AI（如 Greedy 的打乱顺序）结果可复现且与进程数无关
+    """
+    boards = stack_boards(boards)
+    if workers <= 0:
+        return choose_chunk(agent, boards, 0, seed)
+    n_chunks = max(1, min(len(boards), workers * chunks_per_worker))
+    bounds = np.linspace(0, len(boards), n_chunks + 1).astype(int)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(choose_chunk, agent, boards[start:stop], int(start), seed)
+                   for start, stop in zip(bounds[:-1], bounds[1:])]
+        return np.concatenate([f.result() for f in futures]) if futures else moves_to_array([])
@@ -2,42 +2,35 @@ import numpy as np
 import random
 from collections import deque
 from .move_utils import get_valid_moves, get_jump_moves
+from .geometry import DEFAULT_GEOMETRY
 
 class BFSAgent:
-    def __init__(self, player_id, max_depth=8):
+    def __init__(self, player_id, max_depth=8, geometry=None, seed=None):
         """
         :param player_id: 玩家ID
         :param max_depth: BFS最多搜索的深度，避免搜索过大造成卡顿
+        :param geometry: 棋盘几何，默认 12x12
+        :param seed: 打乱棋子顺序所用的种子。None 时使用全局随机数；给出时由种子与局面哈希决定顺序，
+                     同一局面总是给出同一走法（可以使用决策缓存，见 decision_cache.py）
         """
         self.player_id = player_id
         self.max_depth = max_depth
+        self.geometry = geometry or DEFAULT_GEOMETRY
+        self.seed = seed
 
     def in_target_area(self, pos):
-        if self.player_id == 1:
-            return pos[0] >= 9 and pos[1] >= 9
-        elif self.player_id == 2:
-            return pos[0] >= 9 and pos[1] < 3
-        elif self.player_id == 3:
-            return pos[0] < 3 and pos[1] >= 9
-        elif self.player_id == 4:
-            return pos[0] < 3 and pos[1] < 3
-        return False
+        return self.geometry.in_target(self.player_id, pos)
 
     def calculate_distance_to_target(self, pos):
-        # 简单用曼哈顿距离判断离目标角的远近
-        if self.player_id == 1:
-            target = (11, 11)
-        elif self.player_id == 2:
-            target = (11, 0)
-        elif self.player_id == 3:
-            target = (0, 11)
-        else:  # player_id == 4
-            target = (0, 0)
-        return abs(pos[0] - target[0]) + abs(pos[1] - target[1])
+        # 简单用曼哈顿距离判断离目标角的远近（查几何中预计算的距离表）
+        return self.geometry.distance_tables[self.player_id][pos]
 
     def choose_move(self, board):
         positions = [tuple(pos) for pos in np.argwhere(board == self.player_id)]
-        random.shuffle(positions)
+        if self.seed is None:
+            random.shuffle(positions)
+        else:
+            random.Random(self.geometry.position_hash(board, self.player_id) ^ self.seed).shuffle(positions)
         for pos in positions:
             # 若己方棋子已经在目标区，可根据策略决定是否继续搜索让它深入，简化起见此处直接跳过
             if self.in_target_area(pos):
@@ -80,7 +73,7 @@ class BFSAgent:
                 continue
 
             # 获取当前位置所有合法下一步（单步+跳跃），在静态棋盘下
-            next_moves = get_valid_moves(cur, board) + get_jump_moves(cur, board)
+            next_moves = get_valid_moves(cur, board, self.geometry) + get_jump_moves(cur, board, self.geometry)
             for nxt in next_moves:
                 if nxt not in visited:
                     visited.add(nxt)
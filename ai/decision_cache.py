@@ -0,0 +1,174 @@
+# ai/decision_cache.py
+"""
+磁盘上的决策缓存：确定性的 AI（同一局面总是给出同一走法，见 AgentSpec.is_deterministic）的走法
+按 (AI 注册名, 完整参数, 棋盘几何, 玩家, 局面) 存入 SQLite 文件，之后的对局、其他工作进程、
+以后的批量模拟遇到同一局面直接取出，不再计算。开局阶段每局都从同一布局出发，命中率最高。
+
+  - 键为上述内容的 BLAKE2b 摘要（16 字节），局面按 int8 字节串参与摘要，不会因哈希冲突取错走法；
+  - 多个进程同时读写同一个文件：WAL 模式，写入冲突时等待（timeout）；
+  - 新结果先在内存中攒一批（flush_every 条）再一次写入，命中时更新的最近使用时间也随之写入；
+  - 条目数超过 max_entries 时按最近使用时间淘汰最久未用的，淘汰到容量的 EVICT_TARGET。
+注意缓存不知道 AI 代码的版本：修改了确定性 AI 的实现后请删除缓存文件。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+
+# 超出容量时一次淘汰到容量的这个比例，避免每次写入都触发淘汰
+EVICT_TARGET = 0.9
+
+
+class DecisionCache:
+    def __init__(self, path, max_entries=200000, flush_every=32, timeout=30.0):
+        """
+        :param path: SQLite 文件路径（不存在时创建）
+        :param max_entries: 条目数上限
+        :param flush_every: 攒够这么多条新结果后写入文件
+        :param timeout: 等待其他进程释放写锁的最长时间（秒）
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.timeout = timeout
+        self._conn = None
+        self._pid = None
+        self._pending = {}      # 键 -> 走法 JSON（未写入的新结果）
+        self._touched = set()   # 命中过、待更新最近使用时间的键
+
+    def __getstate__(self):
+        # 连接不能跨进程使用：传给工作进程时只带配置，在工作进程中重新打开
+        state = self.__dict__.copy()
+        state.update(_conn=None, _pid=None, _pending={}, _touched=set())
+        return state
+
+    def connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS decisions "
+                         "(key BLOB PRIMARY KEY, move TEXT, last_used REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS decisions_last_used ON decisions (last_used)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def make_key(prefix, board):
+        """prefix 为 AI、参数、几何与玩家的描述（CachedAgent 中预先算好）"""
+        if board.dtype != np.int8:
+            board = board.astype(np.int8)
+        return hashlib.blake2b(prefix + board.tobytes(), digest_size=16).digest()
+
+    def get(self, key):
+        """返回缓存的走法 JSON，未命中时返回 None"""
+        move = self._pending.get(key)
+        if move is not None:
+            return move
+        row = self.connection().execute("SELECT move FROM decisions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._touched.add(key)
+        return row[0]
+
+    def put(self, key, move):
+        self._pending[key] = move
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """写入攒下的新结果与最近使用时间，必要时淘汰"""
+        if not self._pending and not self._touched:
+            return
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO decisions (key, move, last_used) VALUES (?, ?, ?)",
+                             [(key, move, now) for key, move in self._pending.items()])
+            conn.executemany("UPDATE decisions SET last_used = ? WHERE key = ?",
+                             [(now, key) for key in self._touched])
+            if self._pending:
+                self.evict(conn)
+        self._pending.clear()
+        self._touched.clear()
+
+    def evict(self, conn):
+        count = conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+        if count > self.max_entries:
+            excess = count - int(self.max_entries * EVICT_TARGET)
+            conn.execute("DELETE FROM decisions WHERE key IN "
+                         "(SELECT key FROM decisions ORDER BY last_used LIMIT ?)", (excess,))
+
+    def __len__(self):
+        self.flush()
+        return self.connection().execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self.flush()
+            self._conn.close()
+        self._conn = None
+
+
+class CachedAgent:
+    """
+    包装一个确定性的 AI：choose_move 先查 DecisionCache，未命中时调用原 AI 并存入。
+    其他属性（avoid_repetition、history 等）都转给原 AI。
+    """
+    def __init__(self, agent, cache, name, params, geometry):
+        self.agent = agent
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        description = json.dumps([name, params, [geometry.rows, geometry.cols, geometry.camp_size],
+                                  agent.player_id], sort_keys=True, default=repr)
+        self.prefix = description.encode()
+
+    def choose_move(self, board):
+        key = DecisionCache.make_key(self.prefix, board)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            move = json.loads(cached)
+            return None if move is None else tuple(tuple(pos) for pos in move)
+        self.misses += 1
+        move = self.agent.choose_move(board)
+        stored = None if move is None else [[int(v) for v in pos] for pos in move]
+        self.cache.put(key, json.dumps(stored))
+        return move
+
+    def take_stats(self):
+        """返回并清零 (命中次数, 未命中次数)"""
+        stats = (self.hits, self.misses)
+        self.hits = 0
+        self.misses = 0
+        return stats
+
+    def __getattr__(self, name):
+        if name == 'agent':
+            raise AttributeError(name)
+        return getattr(self.agent, name)
+
+    def __setattr__(self, name, value):
+        if name in ('agent', 'cache', 'hits', 'misses', 'prefix'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.agent, name, value)
+
+
+def collect_cache_stats(agents, names):
+    """取出并清零各 CachedAgent 的命中统计，按 AI 名称汇总：{名称: [命中, 未命中]}；没有缓存时返回 None"""
+    stats = {}
+    for p, agent in agents.items():
+        if isinstance(agent, CachedAgent):
+            hits, misses = agent.take_stats()
+            entry = stats.setdefault(names[p], [0, 0])
+            entry[0] += hits
+            entry[1] += misses
+    return stats or None
@@ -0,0 +1,181 @@
+# ai/geometry.py
+"""
+棋盘几何：尺寸、有效格掩码、各玩家起始区/目标区，以及走子用的邻接表、跳跃表和距离表。
+所有表在构造时一次性算好，Board、move_utils 与各 AI 直接查表，不再在每次调用时重新计算几何。
+
+四个玩家的布局与原 12x12 棋盘一致：
+  - 玩家1：左上 -> 右下
+  - 玩家2：右上 -> 左下
+  - 玩家3：左下 -> 右上
+  - 玩家4：右下 -> 左上
+"""
+from functools import lru_cache
+import numpy as np
+
+PLAYERS = (1, 2, 3, 4)
+# 单步方向与跳跃方向，顺序与原 get_valid_moves / get_jump_moves 一致
+STEP_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+JUMP_DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1),
+                   (0, -1),           (0, 1),
+                   (1, -1),  (1, 0),  (1, 1)]
+# 每个玩家的起始角（是否在下方、是否在右侧），目标角为对角
+START_CORNERS = {1: (False, False), 2: (False, True), 3: (True, False), 4: (True, True)}
+OPPOSITE = {1: 4, 2: 3, 3: 2, 4: 1}
+ZOBRIST_SEED = 20240501
+
+
+class BoardGeometry:
+    def __init__(self, rows=12, cols=12, camp_size=3, mask=None):
+        """
+        :param rows, cols: 棋盘尺寸
+        :param camp_size: 角上起始区/目标区的边长（camp_size x camp_size）
+        :param mask: 可选的布尔数组，False 的格子不属于棋盘（用于非矩形变体），
+                     这些格子在棋盘数组中以 -1 表示
+        """
+        self.rows = rows
+        self.cols = cols
+        self.camp_size = camp_size
+        self.shape = (rows, cols)
+        self.mask = np.ones(self.shape, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+
+        self.camp_masks = {}
+        self.camp_ranges = {}
+        for p, (bottom, right) in START_CORNERS.items():
+            row_range = range(rows - camp_size, rows) if bottom else range(0, camp_size)
+            col_range = range(cols - camp_size, cols) if right else range(0, camp_size)
+            camp = np.zeros(self.shape, dtype=bool)
+            camp[row_range.start:row_range.stop, col_range.start:col_range.stop] = True
+            self.camp_masks[p] = camp & self.mask
+            self.camp_ranges[p] = (row_range, col_range)
+
+        # 目标区即对角玩家的起始区
+        self.target_masks = {p: self.camp_masks[OPPOSITE[p]] for p in PLAYERS}
+        self.target_ranges = {p: self.camp_ranges[OPPOSITE[p]] for p in PLAYERS}
+        self.target_sizes = {p: int(self.target_masks[p].sum()) for p in PLAYERS}
+
+        self.deep_targets = {}     # 目标角最深处的格子
+        self.entry_targets = {}    # A* 启发函数使用的目标区参考点
+        self.entry_lines = {}      # 目标区靠近棋盘中心的入口行、入口列
+        self.inward = {}           # 指向目标角内部的方向
+        self.stable_masks = {}     # 目标区去掉入口行、入口列后的「稳定区」
+        for p in PLAYERS:
+            bottom, right = START_CORNERS[OPPOSITE[p]]
+            row_range, col_range = self.target_ranges[p]
+            self.deep_targets[p] = (rows - 1 if bottom else 0, cols - 1 if right else 0)
+            self.entry_targets[p] = (row_range.start if bottom else 0, col_range.start if right else 0)
+            entry_row = row_range.start if bottom else row_range.stop - 1
+            entry_col = col_range.start if right else col_range.stop - 1
+            self.entry_lines[p] = (entry_row, entry_col)
+            self.inward[p] = (1 if bottom else -1, 1 if right else -1)
+            stable = self.target_masks[p].copy()
+            stable[entry_row, :] = False
+            stable[:, entry_col] = False
+            self.stable_masks[p] = stable
+
+        # 每个格子到各玩家深层目标角的曼哈顿距离
+        row_idx, col_idx = np.indices(self.shape)
+        self.distance_tables = {
+            p: np.abs(row_idx - t[0]) + np.abs(col_idx - t[1]) for p, t in self.deep_targets.items()
+        }
+
+        # 每个格子到各玩家目标区域的切比雪夫距离（单步最多缩短 1，一次跳跃最多缩短 2）
+        self.target_distance_tables = {}
+        for p in PLAYERS:
+            target_cells = np.argwhere(self.target_masks[p])
+            cheb = np.maximum(np.abs(row_idx[..., None] - target_cells[:, 0]),
+                              np.abs(col_idx[..., None] - target_cells[:, 1]))
+            self.target_distance_tables[p] = cheb.min(axis=-1)
+        # 目标区内每个格子到目标区外最近有效格的切比雪夫距离（棋子离开目标区至少要走的距离）
+        self.exit_distance_tables = {}
+        for p in PLAYERS:
+            outside_cells = np.argwhere(self.mask & ~self.target_masks[p])
+            cheb = np.maximum(np.abs(row_idx[..., None] - outside_cells[:, 0]),
+                              np.abs(col_idx[..., None] - outside_cells[:, 1]))
+            self.exit_distance_tables[p] = cheb.min(axis=-1)
+
+        # 邻接表与跳跃表：{格子: [落点]} / {格子: [(中间格, 落点)]}，只包含有效格
+        self.cells = [tuple(int(v) for v in c) for c in np.argwhere(self.mask)]
+        self.step_table = {}
+        self.jump_table = {}
+        for (x, y) in self.cells:
+            self.step_table[(x, y)] = [
+                (x + dx, y + dy) for dx, dy in STEP_DIRECTIONS if self.is_cell((x + dx, y + dy))
+            ]
+            self.jump_table[(x, y)] = [
+                ((x + dx, y + dy), (x + 2 * dx, y + 2 * dy)) for dx, dy in JUMP_DIRECTIONS
+                if self.is_cell((x + dx, y + dy)) and self.is_cell((x + 2 * dx, y + 2 * dy))
+            ]
+
+        # Zobrist 随机数表：每个格子每种棋子一个 64 位随机数，另加「轮到谁走」
+        rng = np.random.default_rng(ZOBRIST_SEED)
+        self.zobrist_pieces = rng.integers(1, 2 ** 63, size=(rows, cols, len(PLAYERS) + 1), dtype=np.int64)
+        self.zobrist_pieces[:, :, 0] = 0
+        self.zobrist_turn = [int(v) for v in rng.integers(1, 2 ** 63, size=len(PLAYERS) + 1, dtype=np.int64)]
+
+    def is_cell(self, pos):
+        x, y = pos
+        return 0 <= x < self.rows and 0 <= y < self.cols and bool(self.mask[x, y])
+
+    def in_target(self, player_id, pos):
+        return bool(self.target_masks[player_id][pos])
+
+    def in_stable(self, player_id, pos):
+        return bool(self.stable_masks[player_id][pos])
+
+    def empty_board(self):
+        board = np.zeros(self.shape, dtype=int)
+        board[~self.mask] = -1
+        return board
+
+    def initial_board(self):
+        board = self.empty_board()
+        for p in PLAYERS:
+            board[self.camp_masks[p]] = p
+        return board
+
+    def target_score(self, board, player_id):
+        """目标区域内该玩家的棋子数"""
+        return int(np.count_nonzero(board[self.target_masks[player_id]] == player_id))
+
+    def scores(self, board):
+        return {p: self.target_score(board, p) for p in PLAYERS}
+
+    def is_finished(self, board, player_id):
+        return self.target_score(board, player_id) == self.target_sizes[player_id]
+
+    def distance_sum(self, board, player_id):
+        """该玩家所有棋子到深层目标角的曼哈顿距离之和"""
+        return int(self.distance_tables[player_id][board == player_id].sum())
+
+    def position_hash(self, board, player_to_move):
+        """局面的 Zobrist 哈希（包含轮到哪位玩家走）"""
+        occupied = board > 0
+        keys = self.zobrist_pieces[occupied, board[occupied]]
+        return int(np.bitwise_xor.reduce(keys)) ^ self.zobrist_turn[player_to_move]
+
+    def pieces_hash(self, board, player_id):
+        """只看某一玩家棋子分布的 Zobrist 哈希（用于检测单个玩家的来回循环）"""
+        keys = self.zobrist_pieces[board == player_id, player_id]
+        return int(np.bitwise_xor.reduce(keys)) if len(keys) else 0
+
+    def hash_after_move(self, position_hash, move, player_id, next_player):
+        """在 position_hash 基础上增量计算 player_id 走 move 之后、轮到 next_player 的哈希"""
+        f, t = move
+        z = self.zobrist_pieces
+        return (position_hash ^ int(z[f][player_id]) ^ int(z[t][player_id])
+                ^ self.zobrist_turn[player_id] ^ self.zobrist_turn[next_player])
+
+    def __reduce__(self):
+        # 进程间传递时只传构造参数，在对端重新预计算（并复用缓存）
+        if self.mask.all():
+            return (get_geometry, (self.rows, self.cols, self.camp_size))
+        return (BoardGeometry, (self.rows, self.cols, self.camp_size, self.mask))
+
+
+@lru_cache(maxsize=None)
+def get_geometry(rows=12, cols=None, camp_size=3):
+    """按尺寸获取共享的矩形棋盘几何（每种尺寸只预计算一次）"""
+    return BoardGeometry(rows, rows if cols is None else cols, camp_size)
+
+
+DEFAULT_GEOMETRY = get_geometry(12, 12, 3)
@@ -1,61 +1,167 @@
 # ai/greedy_ai.py
 import numpy as np
 import random
-from .move_utils import get_valid_moves, get_jump_moves, free_up_target_entry
+from .move_utils import get_valid_moves, get_jump_moves, free_up_target_entry, resolve_cache
+from .geometry import DEFAULT_GEOMETRY
+from . import batch
+
+# 候选走法的偏移顺序与 get_valid_moves + get_jump_moves 保持一致：先 4 个单步方向，再 8 个跳跃方向
+STEP_DIRECTIONS = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)])
+JUMP_DIRECTIONS = np.array([(-1, -1), (-1, 0), (-1, 1),
+                            (0, -1),           (0, 1),
+                            (1, -1),  (1, 0),  (1, 1)])
+MOVE_OFFSETS = np.concatenate([STEP_DIRECTIONS, 2 * JUMP_DIRECTIONS])
+MID_OFFSETS = np.concatenate([np.zeros_like(STEP_DIRECTIONS), JUMP_DIRECTIONS])
+IS_JUMP = np.array([False] * len(STEP_DIRECTIONS) + [True] * len(JUMP_DIRECTIONS))
+PAD = 2
 
 class GreedyAI:
-    def __init__(self, player_id):
+    def __init__(self, player_id, vectorized=True, geometry=None, avoid_repetition=False,
+                 target_bonus=20, last_piece_bonus=100, cache=None, cache_size=None):
+        """
+        :param player_id: 玩家ID
+        :param vectorized: 是否使用向量化打分（结果与逐个循环的实现一致）
+        :param geometry: 棋盘几何，默认 12x12
+        :param avoid_repetition: 是否避免走回已出现过的局面（需要对局循环提供 self.history，
+                                 仅作用于向量化路径的第三步）
+        :param target_bonus: 从目标区外进入目标区的走法额外加的改善量
+        :param last_piece_bonus: 只剩最后一颗棋子在目标区外时改用的加成
+        :param cache: 局面缓存（见 move_utils.resolve_cache），缓存腾挪入口的走法。
+                      每步都是新局面，实测命中率为 0，不会提速（见 move_utils.PositionCache）
+        :param cache_size: 共享缓存的容量（条目数）
+        """
         self.player_id = player_id
+        self.vectorized = vectorized
+        self.avoid_repetition = avoid_repetition
+        self.history = None
+        self.target_bonus = target_bonus
+        self.last_piece_bonus = last_piece_bonus
+        self.cache = resolve_cache(cache, cache_size)
+        self.geometry = geometry or DEFAULT_GEOMETRY
+        # 目标区域/稳定区域标记与评分直接取自几何的预计算表，供向量化打分使用。
+        # 各表在四周各填充 2 格，使跳跃落点越界时也能直接索引（填充格视为不可落子）
+        self.target_mask = self.geometry.target_masks[player_id]
+        self.stable_mask = self.geometry.stable_masks[player_id]
+        self.score_table = self.geometry.distance_tables[player_id]
+        self.padded_target = np.pad(self.target_mask, PAD, constant_values=False)
+        self.padded_score = np.pad(self.score_table, PAD)
 
     def get_deep_target(self):
-        if self.player_id == 1:
-            return (11, 11)
-        elif self.player_id == 2:
-            return (11, 0)
-        elif self.player_id == 3:
-            return (0, 11)
-        elif self.player_id == 4:
-            return (0, 0)
-        return None
+        return self.geometry.deep_targets.get(self.player_id)
 
     def in_target_area(self, pos):
-        if self.player_id == 1:
-            return pos[0] >= 9 and pos[1] >= 9
-        elif self.player_id == 2:
-            return pos[0] >= 9 and pos[1] < 3
-        elif self.player_id == 3:
-            return pos[0] < 3 and pos[1] >= 9
-        elif self.player_id == 4:
-            return pos[0] < 3 and pos[1] < 3
-        return False
+        return bool(self.target_mask[pos])
 
     def in_stable_area(self, pos):
-        if self.player_id == 1:
-            return pos[0] >= 10 and pos[1] >= 10
-        elif self.player_id == 2:
-            return pos[0] >= 10 and pos[1] <= 1
-        elif self.player_id == 3:
-            return pos[0] <= 1 and pos[1] >= 10
-        elif self.player_id == 4:
-            return pos[0] <= 1 and pos[1] <= 1
-        return False
+        return bool(self.stable_mask[pos])
 
     def calculate_score(self, pos):
         # 曼哈顿距离作为评分，距离越短表示位置越理想
-        deep_target = self.get_deep_target()
-        return abs(pos[0] - deep_target[0]) + abs(pos[1] - deep_target[1])
+        return self.score_table[pos]
+
+    def free_up_move(self, board):
+        if self.cache is not None:
+            return self.cache.free_up_move(board, self.player_id, self.geometry)
+        return free_up_target_entry(board, self.player_id, self.geometry)
 
     def choose_move(self, board):
+        if self.vectorized:
+            return self.choose_move_vectorized(board)
+        return self.choose_move_loop(board)
+
+    def choose_moves(self, boards, workers=0, seed=None):
+        """批量求走法，返回 (N, 2, 2) 数组，见 ai/batch.py"""
+        return batch.choose_moves(self, boards, workers, seed=seed)
+
+    def candidate_grid(self, padded, positions):
+        """
+        对 positions (P, 2) 中的每个棋子一次性生成全部 12 个候选落点。
+        padded 为四周填充 -1 的棋盘；返回填充坐标系下的落点 (P, 12, 2) 与合法性掩码。
+        """
+        origin = positions[:, None, :] + PAD
+        dest = origin + MOVE_OFFSETS[None, :, :]
+        mid = origin + MID_OFFSETS[None, :, :]
+        valid = padded[dest[..., 0], dest[..., 1]] == 0
+        # 跳跃要求中间格有棋子（-1 表示棋盘外或无效格，不能作为跳板）
+        valid &= ~IS_JUMP | (padded[mid[..., 0], mid[..., 1]] > 0)
+        return dest, valid
+
+    def choose_move_vectorized(self, board):
+        deep_target = self.get_deep_target()
+        all_positions = np.argwhere(board == self.player_id)
+        if not len(all_positions):
+            return None
+        padded = np.full((board.shape[0] + 2 * PAD, board.shape[1] + 2 * PAD), -1, dtype=board.dtype)
+        padded[PAD:-PAD, PAD:-PAD] = board
+        dest, valid = self.candidate_grid(padded, all_positions)
+
+        # 第一步：深层目标为空时，按棋子的行优先顺序找第一个能一步到达的棋子
+        if board[deep_target] == 0:
+            hits = valid & (dest[..., 0] == deep_target[0] + PAD) & (dest[..., 1] == deep_target[1] + PAD)
+            reachers = np.flatnonzero(hits.any(axis=1))
+            if len(reachers):
+                return (tuple(all_positions[reachers[0]]), deep_target)
+        # 第二步：尝试调用腾挪入口的走法（free_up_target_entry）
+        move_to_free = self.free_up_move(board)
+        if move_to_free:
+            return move_to_free
+
+        # 第三步：与 choose_move_loop 相同的筛选与随机打乱（保证随机数消耗一致），再整体打分
+        in_target = self.target_mask[all_positions[:, 0], all_positions[:, 1]]
+        in_stable = self.stable_mask[all_positions[:, 0], all_positions[:, 1]]
+        outside = np.flatnonzero(~in_target)
+        order = list(outside if len(outside) else np.flatnonzero(~in_stable))
+        bonus = self.last_piece_bonus if len(outside) == 1 else self.target_bonus
+        random.shuffle(order)
+        if not order:
+            return None
+
+        dest, valid = dest[order], valid[order]
+        pos_in_target = in_target[order]
+        dest_in_target = self.padded_target[dest[..., 0], dest[..., 1]]
+        valid &= ~(pos_in_target & in_stable[order])[:, None]
+        valid &= ~pos_in_target[:, None] | dest_in_target
+        if not valid.any():
+            # 没有任何候选时循环版本的 fallback 同样为空
+            return None
+
+        # 改善量 = 当前评分 - 新评分，从目标区外进入目标区额外加 bonus
+        positions = all_positions[order]
+        current_score = self.score_table[positions[:, 0], positions[:, 1]]
+        improvement = current_score[:, None] - self.padded_score[dest[..., 0], dest[..., 1]]
+        improvement += bonus * (~pos_in_target[:, None] & dest_in_target)
+        # argmax 返回第一个最大值，展平顺序即循环版本的遍历顺序，平局时结果一致
+        improvement[~valid] = improvement.min() - 1
+        best = int(np.argmax(improvement))
+        if self.avoid_repetition and self.history is not None:
+            best = self.avoid_repeated_move(board, best, positions, dest, valid, improvement)
+        i, k = divmod(best, dest.shape[1])
+        return (tuple(positions[i]), (int(dest[i, k, 0]) - PAD, int(dest[i, k, 1]) - PAD))
+
+    def avoid_repeated_move(self, board, best, positions, dest, valid, improvement):
+        """
+        若最佳走法会回到已出现过的局面，按改善量从高到低（平局按遍历顺序）
+        改选第一个不重复的走法；全部重复时保持原走法。返回展平后的候选下标。
+        """
+        order = np.argsort(-improvement.ravel(), kind='stable')
+        for flat in order[valid.ravel()[order]]:
+            i, k = divmod(int(flat), dest.shape[1])
+            move = (tuple(positions[i]), (int(dest[i, k, 0]) - PAD, int(dest[i, k, 1]) - PAD))
+            if not self.history.would_repeat(board, move, self.player_id):
+                return int(flat)
+        return best
+
+    def choose_move_loop(self, board):
         deep_target = self.get_deep_target()
         # 第一步：如果深层目标单元为空，尝试直接将某个棋子移动到深层目标上
         if board[deep_target] == 0:
             positions = [tuple(p) for p in np.argwhere(board == self.player_id)]
             for pos in positions:
-                valid_moves = get_valid_moves(pos, board) + get_jump_moves(pos, board)
+                valid_moves = get_valid_moves(pos, board, self.geometry) + get_jump_moves(pos, board, self.geometry)
                 if deep_target in valid_moves:
                     return (pos, deep_target)
         # 第二步：尝试调用腾挪入口的走法（free_up_target_entry）
-        move_to_free = free_up_target_entry(board, self.player_id)
+        move_to_free = self.free_up_move(board)
         if move_to_free:
             return move_to_free
 
@@ -64,9 +170,9 @@ class GreedyAI:
         outside_positions = [pos for pos in all_positions if not self.in_target_area(pos)]
         positions_to_consider = outside_positions if outside_positions else [pos for pos in all_positions if not self.in_stable_area(pos)]
         
-        bonus = 20
+        bonus = self.target_bonus
         if outside_positions and len(outside_positions) == 1:
-            bonus = 100
+            bonus = self.last_piece_bonus
 
         best_move = None
         best_improvement = -float('inf')
@@ -76,7 +182,7 @@ class GreedyAI:
         for pos in positions_to_consider:
             if self.in_target_area(pos) and self.in_stable_area(pos):
                 continue
-            candidate_moves = get_valid_moves(pos, board) + get_jump_moves(pos, board)
+            candidate_moves = get_valid_moves(pos, board, self.geometry) + get_jump_moves(pos, board, self.geometry)
             if self.in_target_area(pos):
                 candidate_moves = [m for m in candidate_moves if self.in_target_area(m)]
             
@@ -1,13 +1,32 @@
 # ai/mcts_ai.py
 import random
 import math
+import sys
 import time
+import threading
 import numpy as np
-from .move_utils import get_all_moves
+from .move_utils import get_all_moves, resolve_cache, approx_sizeof
+from .rollout_policies import EpsilonGreedyPolicy, UniformRandomPolicy, make_policy, is_jump
+from .geometry import DEFAULT_GEOMETRY
+from .time_manager import TimeManager, resolve_time_manager
+from .pn_search import EndgameSolver
+from . import batch
+
+# 树被裁剪时一次裁到预算的这个比例，避免每次扩展都触发裁剪
+PRUNE_TARGET = 0.8
+# 按对局时钟搜索时，每隔这么多次迭代检查一次领先是否已不可能被追上
+DECIDED_CHECK_INTERVAL = 16
+# 未指定 ponder_limit 时，单次后台思考最多持续这么多个 time_limit（对手的三个回合）
+PONDER_TURNS = 3
+
 
 class MCTSNode:
+    # 用 __slots__ 省去每个节点的 __dict__；棋盘以 int8 保存（走子与评估只用到 0..4 与 -1）
+    __slots__ = ('board_state', 'parent', 'move', 'children', 'wins', 'visits', 'untried_moves', 'player_id',
+                 'amaf_wins', 'amaf_visits', 'size', 'ponder_iterations', 'key', 'edges')
+
     def __init__(self, board_state, player_id, parent=None, move=None):
-        self.board_state = board_state.copy()
+        self.board_state = board_state.astype(np.int8)
         self.parent = parent
         self.move = move  # (from_pos, to_pos)
         self.children = []
@@ -15,122 +34,761 @@ class MCTSNode:
         self.visits = 0
         self.untried_moves = []
         self.player_id = player_id
+        # RAVE / AMAF 统计：该走法在之后任意时刻被己方走出时的累计回报与次数
+        self.amaf_wins = 0
+        self.amaf_visits = 0
+        # 创建时估计的内存占用（字节），由 MCTSAI.track 填写
+        self.size = 0
+        # 图搜索模式：局面的 Zobrist 哈希，以及与 children 一一对应的走法
+        # （同一节点可以有多个父节点，move 只是第一次到达它的走法）
+        self.key = None
+        self.edges = None
+
+
+# 节点对象本身与空子节点列表的字节数
+NODE_BYTES = sys.getsizeof(MCTSNode(np.zeros(0, dtype=np.int8), 0)) + sys.getsizeof([])
+# 一个坐标元组的字节数：get_all_moves 为每个有走法的棋子新建一个起点坐标元组，由该棋子的各走法共享
+POS_BYTES = sys.getsizeof((0, 0))
+# 裁剪时每个节点的临时开销：候选元组、候选列表中的指针与 seen 集合中的 id（裁剪发生在树已接近上限时）
+PRUNE_BYTES = sys.getsizeof((None,) * 4) + 8 + sys.getsizeof(2 ** 40) + 32
+# 图搜索模式下每个节点的哈希键与置换表条目；裁剪后重建置换表时新旧两张表同时存在，按两份计
+TABLE_BYTES = 2 * (sys.getsizeof(2 ** 62) + 48)
+
+
+def node_bytes(node):
+    """
+    节点的内存占用：对象、棋盘副本与未展开走法列表（走法按 move_utils 的估计计），
+    各走法的起点坐标元组（每个棋子一个；落点元组来自几何的邻接表，不重复计算），
+    以及裁剪时为它分配的临时对象和图搜索模式下的置换表条目
+    """
+    origins = len({id(move[0]) for move in node.untried_moves})
+    size = (NODE_BYTES + sys.getsizeof(node.board_state) + approx_sizeof(node.untried_moves)
+            + origins * POS_BYTES + PRUNE_BYTES)
+    if node.key is not None:
+        size += TABLE_BYTES
+    return size
+
 
 class MCTSAI:
-    def __init__(self, player_id, time_limit=1.0):
+    def __init__(self, player_id, time_limit=1.0, ponder=False, ponder_limit=None, rollout_policies=None,
+                 rave=False, rave_k=100, reward=None,
+                 widening=False, widening_c=1.0, widening_alpha=0.5, prune_backward=False,
+                 exploration=1.4, rollout_depth=15, cache=None, cache_size=None, geometry=None,
+                 max_nodes=None, max_tree_bytes=None, on_budget='prune', game_time=None, time_manager=None,
+                 endgame=False, endgame_nodes=20000, graph=False):
         """
         :param player_id: 玩家ID
         :param time_limit: 单次决策的时间限制（秒），如 1.0 表示 1 秒
+        :param ponder: 是否开启后台思考（pondering）：走子后在对手回合继续搜索。后台线程与同一进程中的
+                       对手争抢 GIL：12x12 上 time_limit=0.5 时，同进程的 Minimax(depth=2) 每步耗时约增至
+                       2.5 倍、Greedy 约 4 倍，而每次决策复用的访问次数约为前台迭代的 1/4。
+                       对手耗时有意义的对比（模拟统计）中不要开启，复用情况见 ponder_stats
+        :param ponder_limit: 单次后台思考的最长时间（秒），None 表示 PONDER_TURNS * time_limit。
+                             后台线程与同一进程中的其他 AI 争抢 GIL，不能无限制地搜索下去
+        :param rollout_policies: 模拟策略。可以是单个策略（所有玩家共用）、策略名，
+                                 或 {玩家ID: 策略} 字典；未指定的玩家沿用默认：
+                                 自己贪心（epsilon=0），其他玩家均匀随机
+        :param rave: 是否开启 RAVE（all-moves-as-first）统计
+        :param rave_k: RAVE 混合系数，beta = sqrt(k / (3n + k))，n 为子节点访问次数；
+                       k 越大，AMAF 统计被信任的时间越长
+        :param reward: 回报方式。'win'：模拟结束评价 > 0 记 1（原始做法）；
+                       'progress'：按相对根局面的距离改善量映射到 [0, 1]。
+                       默认开启 RAVE 时用 'progress'，否则用 'win'
+        :param widening: 是否开启渐进展开（progressive widening）：节点允许的子节点数
+                         为 ceil(widening_c * visits ** widening_alpha)，候选走法按先验排序
+                         （前进的跳跃优先，其次按距离改善量）
+        :param prune_backward: 是否剪掉后退（远离目标角）的走法；全部为后退走法时保留
+        :param exploration: UCT 探索系数 C
+        :param rollout_depth: 每次模拟最多走的步数
+        :param cache: 局面缓存（见 move_utils.resolve_cache）：True 使用进程内共享缓存，
+                      缓存展开节点时的走法列表（模拟中的局面几乎不重复，不使用缓存）。
+                      实测命中 25%～34%，提速在 0%～20% 之间（见 move_utils.PositionCache）
+        :param cache_size: 共享缓存的容量（条目数）
+        :param geometry: 棋盘几何，默认 12x12
+        :param max_nodes: 搜索树的节点数上限，None 表示不限
+        :param max_tree_bytes: 搜索树的内存上限（字节），None 表示不限。节点按 node_bytes 计，另为每次迭代的
+                               临时对象留出余量；12x12 棋盘上 tracemalloc 测得的决策峰值不超过上限的 102%
+        :param on_budget: 达到上限后的做法。'prune'：裁掉访问次数最少的子树（保留子树根节点自身的统计，
+                          根节点及其统计始终保留），裁到上限的 PRUNE_TARGET；'stop'：不再扩展新节点，
+                          只在现有的树上继续模拟
+        :param game_time: 整局的思考时间（秒），给出时不再使用 time_limit，按对局时钟分配每步时间
+                          （见 time_manager.py）：只有一个候选走法时直接返回；访问次数最多的子节点
+                          领先第二名的次数超过剩余时间内还能做的迭代次数时提前结束；到了基本时间而
+                          访问最多与平均回报最高的不是同一个子节点时，继续搜索直到一致或到达上限
+        :param time_manager: 直接指定 TimeManager（可与其他对象共用一个时钟），优先于 game_time
+        :param endgame: 目标区外只剩少数棋子时先用证明数搜索（见 pn_search.py）求最短完成序列，
+                        证明成功就按序列走子，不再搜索
+        :param endgame_nodes: 每次证明最多展开的节点数
+        :param graph: 图搜索模式：节点按局面哈希存放在表中，不同走子顺序到达的同一局面共用一个节点
+                      及其访问/回报统计。选择时记录实际经过的路径，回传沿路径进行（同一节点在一次迭代中
+                      只更新一次），选择时跳过路径上已有的节点以避免走回头路形成的环
         """
         self.player_id = player_id
+        self.geometry = geometry or DEFAULT_GEOMETRY
         self.time_limit = time_limit
+        self.rollout_policies = self.build_rollout_policies(rollout_policies)
+        self.rave = rave
+        self.rave_k = rave_k
+        self.reward = reward if reward is not None else ('progress' if rave else 'win')
+        self.widening = widening
+        self.widening_c = widening_c
+        self.widening_alpha = widening_alpha
+        self.prune_backward = prune_backward
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self.cache = resolve_cache(cache, cache_size)
+        if on_budget not in ('prune', 'stop'):
+            raise ValueError(f"未知的 on_budget: {on_budget}")
+        self.max_nodes = max_nodes
+        self.max_tree_bytes = max_tree_bytes
+        self.on_budget = on_budget
+        self.graph = graph
+        # 图搜索模式的置换表 {局面哈希: 节点}（每次 search 开始时按当前的树重建）
+        self.table = {}
+        # 最近一次决策中，扩展时命中置换表（复用已有节点）的次数
+        self.last_transpositions = 0
+        # 当前搜索树的节点数与大致字节数（每次 search 开始时重新统计）
+        self.tree_nodes = 0
+        self.tree_bytes = 0
+        # 每次迭代的模拟在树之外另需的字节数（预算中留出的余量，见 count_tree）
+        self.iteration_bytes = 0
+        self.ponder = ponder
+        self.ponder_limit = ponder_limit if ponder_limit is not None else PONDER_TURNS * time_limit
+        # 后台思考状态（线程对象延迟创建，保证 agent 在进程池中仍可 pickle）
+        self._ponder_root = None
+        self._ponder_thread = None
+        self._ponder_stop = None
+        # 最近一次决策的统计：前台迭代次数、复用的后台迭代次数
+        self.last_iterations = 0
+        self.last_ponder_iterations = 0
+        # 后台思考的累计统计（跨局累计，见 ponder_stats）
+        self.ponder_counts = {'decisions': 0, 'exact': 0, 'warm': 0, 'iterations': 0, 'reused_visits': 0}
+        self.last_tree_depth = 0
+        # 最近一次决策的树内存统计：结束时与峰值的节点数/字节数、被裁剪的节点数
+        self.last_tree_nodes = 0
+        self.last_tree_bytes = 0
+        self.last_peak_nodes = 0
+        self.last_peak_bytes = 0
+        self.last_pruned_nodes = 0
+        self.time_manager = resolve_time_manager(time_manager, game_time, self.geometry)
+        self.endgame = EndgameSolver(player_id, self.geometry, node_budget=endgame_nodes) if endgame else None
+        # 最近一次按对局时钟决策的结束原因：'single' / 'decided' / 'soft' / 'hard'
+        self.last_stop_reason = None
 
     def choose_move(self, board):
-        # 创建根节点
-        root = MCTSNode(board, self.player_id)
-        root.untried_moves = get_all_moves(board, self.player_id)
-        if not root.untried_moves:
+        # 有对局时钟时每一步（包括残局求解器给出的走法）都计入时钟，moves_played 与实际步数一致
+        clock = None if self.time_manager is None else self.time_manager.start(board, self.player_id)
+        try:
+            if self.endgame is not None and self.endgame.applies(board):
+                # 证明期间不与后台思考争抢 CPU；证明失败时照常搜索（不复用后台思考的树）
+                self.stop_pondering()
+                move = self.endgame.choose_move(board)
+                if move is not None:
+                    return move
+            return self.search_move(board, clock)
+        finally:
+            if clock is not None:
+                self.time_manager.finish(clock)
+
+    def new_game(self, max_moves=None, game_time=None):
+        """
+        新的一局开始前调用（模拟器、界面）：停止上一局遗留的后台思考，对局时钟恢复为整局时间
+        并记下步数上限 max_moves，清除残局求解器上一局的记录。
+        给出 game_time 时按它重设整局时间（原来没有对局时钟的改为按时钟走子）。
+        """
+        self.stop_pondering()
+        if self.time_manager is None and game_time is not None:
+            self.time_manager = TimeManager(game_time, self.geometry)
+        if self.time_manager is not None:
+            self.time_manager.reset(game_time, max_moves)
+        if self.endgame is not None:
+            self.endgame.reset()
+
+    def search_move(self, board, clock):
+        # 先停止后台思考，并尽量复用与实际局面对应的子树
+        root = self.stop_pondering(board)
+        if root is None:
+            # 创建根节点
+            root = MCTSNode(board, self.player_id)
+            root.untried_moves = self.candidate_moves(board)
+        if not root.untried_moves and not root.children:
             return None
+        if clock is not None and len(root.untried_moves) + len(root.children) == 1:
+            self.last_iterations = 0
+            self.last_stop_reason = 'single'
+            return self.child_moves(root)[0] if root.children else root.untried_moves[0]
 
         start_time = time.time()
-        iteration_count = 0
-
         # 在剩余时间内不断进行 MCTS 搜索
-        while True:
-            if time.time() - start_time > self.time_limit:
-                break
+        self.last_peak_nodes = 0
+        self.last_peak_bytes = 0
+        self.last_pruned_nodes = 0
+        if clock is None:
+            should_stop = lambda: time.time() - start_time > self.time_limit
+        else:
+            should_stop = self.clock_stop(root, clock)
+        self.last_iterations = self.search(root, should_stop)
+        self.last_tree_depth = self.tree_depth(root)
+        self.last_tree_nodes = self.tree_nodes
+        self.last_tree_bytes = self.tree_bytes
+
+        # 从根节点的子节点中选访问次数最多的
+        if not root.children:
+            return random.choice(root.untried_moves) if root.untried_moves else None
+        best_index = max(range(len(root.children)), key=lambda i: root.children[i].visits)
+        best_child = root.children[best_index]
+        best_move = self.child_moves(root)[best_index]
+        if self.ponder:
+            self.start_pondering(best_child)
+        return best_move if best_move else None
+
+    def clock_stop(self, root, clock):
+        """按 MoveClock 决定何时停止搜索的 should_stop"""
+        iterations = [0]
+
+        def should_stop():
+            iterations[0] += 1
+            elapsed = clock.elapsed()
+            if elapsed >= clock.hard:
+                self.last_stop_reason = 'hard'
+                return True
+            if elapsed >= clock.soft and self.root_stable(root):
+                self.last_stop_reason = 'soft'
+                return True
+            if iterations[0] % DECIDED_CHECK_INTERVAL == 0 and elapsed > 0:
+                # 按目前的速度，到上限为止还能做的迭代次数
+                remaining = iterations[0] / elapsed * (clock.hard - elapsed)
+                if self.lead_decided(root, remaining):
+                    self.last_stop_reason = 'decided'
+                    return True
+            return False
+
+        return should_stop
+
+    def lead_decided(self, root, remaining_iterations):
+        """访问次数最多的子节点领先其余走法的次数超过 remaining_iterations，最终选择已不会改变"""
+        if not root.children:
+            return False
+        visits = sorted((c.visits for c in root.children), reverse=True)
+        second = visits[1] if len(visits) > 1 else 0
+        return visits[0] - second > remaining_iterations
+
+    def root_stable(self, root):
+        """访问次数最多的子节点同时也是平均回报最高的子节点"""
+        visited = [c for c in root.children if c.visits > 0]
+        if len(visited) < 2:
+            return True
+        most_visited = max(visited, key=lambda c: c.visits)
+        best_value = max(visited, key=lambda c: c.wins / c.visits)
+        return most_visited is best_value or most_visited.wins / most_visited.visits >= best_value.wins / best_value.visits
+
+    def build_rollout_policies(self, spec):
+        policies = {}
+        if isinstance(spec, dict):
+            policies = {p: make_policy(s) for p, s in spec.items()}
+        elif spec is not None:
+            shared = make_policy(spec)
+            policies = {p: shared for p in range(1, 5)}
+        if self.player_id not in policies:
+            policies[self.player_id] = EpsilonGreedyPolicy(epsilon=0.0)
+        opponent_default = None
+        for p in range(1, 5):
+            if p not in policies:
+                if opponent_default is None:
+                    opponent_default = UniformRandomPolicy()
+                policies[p] = opponent_default
+        return policies
+
+    def choose_moves(self, boards, workers=0, seed=None):
+        """批量求走法，返回 (N, 2, 2) 数组，见 ai/batch.py"""
+        return batch.choose_moves(self, boards, workers, seed=seed)
+
+    def evaluate_positions(self, boards):
+        """批量计算 evaluate（向量化），返回 (N,) 数组"""
+        return batch.evaluate_positions(boards, self.player_id, self.geometry)
+
+    def memory_stats(self):
+        """最近一次决策的搜索树大小：结束时、峰值与被裁剪的节点数，以及对应的上限"""
+        return {'nodes': self.last_tree_nodes, 'bytes': self.last_tree_bytes,
+                'peak_nodes': self.last_peak_nodes, 'peak_bytes': self.last_peak_bytes,
+                'pruned_nodes': self.last_pruned_nodes,
+                'max_nodes': self.max_nodes, 'max_tree_bytes': self.max_tree_bytes}
+
+    def ponder_stats(self):
+        """
+        后台思考的复用情况：有后台思考的决策数，其中局面不变直接沿用整棵树（exact）与按己方走法
+        热启动（warm）的次数，复用率，后台迭代总数，以及平均每次决策复用的访问次数
+        """
+        counts = dict(self.ponder_counts)
+        decisions = counts['decisions']
+        counts['reuse_rate'] = (counts['exact'] + counts['warm']) / decisions if decisions else 0.0
+        counts['visits_per_decision'] = counts['reused_visits'] / decisions if decisions else 0.0
+        return counts
+
+    def rollout_stats(self):
+        """各模拟策略的吞吐量：{玩家ID: (策略名, 每秒模拟次数)}"""
+        return {p: (policy.name, policy.playouts_per_sec()) for p, policy in self.rollout_policies.items()}
+
+    def search(self, root, should_stop):
+        """反复执行 选择-扩展-模拟-回传，直到 should_stop() 为真，返回迭代次数"""
+        iteration_count = 0
+        base_value = self.evaluate(root.board_state)
+        self.count_tree(root)
+        if self.graph:
+            self.last_transpositions = 0
+            return self.search_graph(root, should_stop, base_value)
+        while not should_stop():
             iteration_count += 1
 
             node = self.select(root)
             if node.untried_moves:
-                node = self.expand(node)
-            result = self.simulate(node)
-            self.backpropagate(node, result)
+                # 先建出新节点，按它的实际大小检查预算，再挂到树上
+                child = self.new_child(node, node.untried_moves[-1])
+                if self.make_room(root, child):
+                    node = self.expand(node, child)
+            played = [] if self.rave else None
+            result = self.simulate(node, played)
+            self.backpropagate(node, self.reward_value(result, base_value), played)
+        return iteration_count
 
-        # 从根节点的子节点中选访问次数最多的
+    def search_graph(self, root, should_stop, base_value):
+        """图搜索模式的 search：沿记录的路径扩展与回传"""
+        iteration_count = 0
+        while not should_stop():
+            iteration_count += 1
+
+            path, moves = self.select_path(root)
+            node = path[-1]
+            if node.untried_moves:
+                expanded = self.expand_graph(root, node, path)
+                if expanded is not None:
+                    path.append(expanded[0])
+                    moves.append(expanded[1])
+            played = [] if self.rave else None
+            result = self.simulate(path[-1], played)
+            self.backpropagate_path(path, moves, self.reward_value(result, base_value), played)
+        return iteration_count
+
+    def child_moves(self, node):
+        """与 node.children 一一对应的走法（图搜索模式下子节点的 move 不一定是从该节点走过去的）"""
+        if node.edges is not None:
+            return node.edges
+        return [c.move for c in node.children]
+
+    def select_path(self, root):
+        """从根往下选择，返回经过的节点与走法；跳过已在路径上的子节点"""
+        path = [root]
+        moves = [None]
+        on_path = {id(root)}
+        node = root
+        while node.children and not self.can_expand(node):
+            index = self.best_child_index(node, on_path)
+            if index is None:
+                break
+            node = node.children[index]
+            path.append(node)
+            moves.append(self.child_moves(node=path[-2])[index])
+            on_path.add(id(node))
+        return path, moves
+
+    def best_child_index(self, node, excluded):
+        C = self.exploration
+        log_visits = math.log(node.visits)
+        best_index = None
+        best_value = -float('inf')
+        for i, c in enumerate(node.children):
+            if id(c) in excluded:
+                continue
+            q = self.rave_value(c) if self.rave else c.wins / c.visits
+            value = q + C * math.sqrt(log_visits / c.visits)
+            if value > best_value:
+                best_index, best_value = i, value
+        return best_index
+
+    def expand_graph(self, root, node, path):
+        """
+        展开一个走法，返回 (子节点, 走法)：走后局面已在置换表中时直接连到已有节点；
+        否则新建节点，预算不够（见 make_room，不折叠 path 上的节点）时不展开，返回 None。
+        """
+        move = node.untried_moves[-1]
+        key = self.geometry.hash_after_move(node.key, move, self.player_id, self.player_id)
+        child = self.table.get(key)
+        if child is None:
+            child = self.new_child(node, move, key)
+            if not self.make_room(root, child, path):
+                return None
+            self.table[key] = child
+            self.track(child)
+        else:
+            self.last_transpositions += 1
+        node.untried_moves.pop()
+        if node.edges is None:
+            node.edges = self.child_moves(node)
+        node.children.append(child)
+        node.edges.append(move)
+        return child, move
+
+    def backpropagate_path(self, path, moves, reward, played=None):
+        """沿路径回传；节点在路径上出现多次（不会发生，但防御）时只更新一次"""
+        later_moves = set(played) if played is not None else None
+        updated = set()
+        for node, move in zip(reversed(path), reversed(moves)):
+            if id(node) not in updated:
+                updated.add(id(node))
+                node.visits += 1
+                node.wins += reward
+                if later_moves is not None:
+                    for child, child_move in zip(node.children, self.child_moves(node)):
+                        if child_move in later_moves:
+                            child.amaf_visits += 1
+                            child.amaf_wins += reward
+            if later_moves is not None and move is not None:
+                later_moves.add(move)
+
+    def iter_nodes(self, root):
+        """不重复地遍历从 root 可达的节点（图搜索模式下同一节点可能有多个父节点，也可能成环）"""
+        seen = {id(root)}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            yield node
+            for child in node.children:
+                if id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append(child)
+
+    def count_tree(self, root):
+        """重新统计整棵树的节点数与字节数（复用后台思考的子树时树的大小未知）；图搜索模式下同时重建置换表"""
+        self.tree_nodes = 0
+        self.tree_bytes = 0
+        if self.graph:
+            self.table = {}
+        for node in self.iter_nodes(root):
+            if self.graph:
+                if node.key is None:
+                    node.key = self.geometry.position_hash(node.board_state, self.player_id)
+                    node.size = 0
+                self.table[node.key] = node
+            if not node.size:
+                node.size = node_bytes(node)
+            self.tree_nodes += 1
+            self.tree_bytes += node.size
+        # 每次迭代在树之外另需模拟用的棋盘副本与走法列表、选择路径和回传用的临时对象，
+        # 按两个节点的大小在预算中留出余量
+        self.iteration_bytes = 2 * root.size
+        self.record_peak()
+
+    def track(self, node):
+        if not node.size:
+            node.size = node_bytes(node)
+        self.tree_nodes += 1
+        self.tree_bytes += node.size
+        self.record_peak()
+
+    def record_peak(self):
+        self.last_peak_nodes = max(self.last_peak_nodes, self.tree_nodes)
+        self.last_peak_bytes = max(self.last_peak_bytes, self.tree_bytes)
+
+    def over_budget(self, nodes, size):
+        return ((self.max_nodes is not None and nodes > self.max_nodes)
+                or (self.max_tree_bytes is not None and size + self.iteration_bytes > self.max_tree_bytes))
+
+    def path_ids(self, node):
+        """node 及其所有祖先（本次迭代的选择路径）的 id"""
+        ids = set()
+        while node is not None:
+            ids.add(id(node))
+            node = node.parent
+        return ids
+
+    def make_room(self, root, child, path=None):
+        """
+        把新节点 child（已建出、尚未挂到树上）加入树之前检查预算，返回是否允许加入。
+        'prune' 模式下不够时先裁剪，但不折叠本次迭代的选择路径（图搜索模式下为 path，
+        否则为 child 的各级祖先），否则新节点会挂到已被丢弃的子树上。
+        """
+        if self.max_nodes is None and self.max_tree_bytes is None:
+            return True
+        if not self.over_budget(self.tree_nodes + 1, self.tree_bytes + child.size):
+            return True
+        if self.on_budget == 'stop':
+            return False
+        self.prune(root, {id(n) for n in path} if path is not None else self.path_ids(child.parent))
+        return not self.over_budget(self.tree_nodes + 1, self.tree_bytes + child.size)
+
+    def prune(self, root, keep=()):
+        """
+        按访问次数从少到多折叠子树：被折叠节点保留自身的访问与胜率统计，子节点被丢弃，
+        其走法重新放回 untried_moves，之后访问多了还可以重新展开。根节点与 keep 中的节点
+        （当前的选择路径）从不折叠，但它们的其他子树照常参与裁剪。
+        同样访问次数时先折叠更深的节点，保证后代总在祖先之前处理。
+        """
+        candidates = []
+        seen = {id(root)}
+        stack = [(root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            for child in node.children:
+                if child.children and id(child) not in seen:
+                    seen.add(id(child))
+                    if id(child) not in keep:
+                        candidates.append((child.visits, -(depth + 1), id(child), child))
+                    stack.append((child, depth + 1))
+        candidates.sort(key=lambda c: c[:3])
+        target_nodes = None if self.max_nodes is None else int(self.max_nodes * PRUNE_TARGET)
+        target_bytes = None if self.max_tree_bytes is None else int(self.max_tree_bytes * PRUNE_TARGET)
+        for _, _, _, node in candidates:
+            if ((target_nodes is None or self.tree_nodes <= target_nodes)
+                    and (target_bytes is None or self.tree_bytes <= target_bytes)):
+                break
+            self.collapse(node)
+        if self.graph:
+            # 被折叠的子树中可能有从别处仍然可达的节点，按实际可达的节点重新统计并重建置换表
+            self.count_tree(root)
+
+    def collapse(self, node):
+        removed_nodes = 0
+        removed_bytes = 0
+        seen = {id(node)}
+        stack = list(node.children)
+        while stack:
+            child = stack.pop()
+            if id(child) in seen:
+                continue
+            seen.add(id(child))
+            removed_nodes += 1
+            removed_bytes += child.size
+            stack.extend(child.children)
+        node.children = []
+        if node.edges is not None:
+            node.edges = []
+        old_size = node.size
+        node.untried_moves = self.candidate_moves(node.board_state)
+        node.size = node_bytes(node)
+        self.tree_nodes -= removed_nodes
+        self.tree_bytes -= removed_bytes + old_size - node.size
+        self.last_pruned_nodes += removed_nodes
+
+    def reward_value(self, result, base_value):
+        """把模拟结束时的评价转换为 [0, 1] 的回报"""
+        if self.reward == 'progress':
+            # 15 步模拟中己方约走 4 步，每步最多缩短 4 的距离，改善量 ±16 映射到 [0, 1]
+            return min(1.0, max(0.0, 0.5 + (result - base_value) / 32.0))
+        return 1 if result > 0 else 0
+
+    def start_pondering(self, node):
+        """
+        以己方走子后的局面（node）为根，在后台线程中继续搜索，
+        直到下次 choose_move 调用 stop_pondering 或超过 ponder_limit。对局结束时由模拟器 / 界面调用
+        stop_pondering，不让后台线程在对局之间继续占用 CPU。
+        """
+        node.parent = None  # 与旧树断开，便于回收
+        self._ponder_root = node
+        self._ponder_stop = threading.Event()
+        stop_event = self._ponder_stop
+        start_time = time.time()
+
+        def should_stop():
+            if stop_event.is_set():
+                return True
+            return time.time() - start_time > self.ponder_limit
+
+        def worker():
+            node.ponder_iterations = self.search(node, should_stop)
+
+        self._ponder_thread = threading.Thread(target=worker, daemon=True)
+        self._ponder_thread.start()
+
+    def stop_pondering(self, board=None):
+        """
+        停止后台思考。若给出实际局面 board，则返回可复用的根节点：
+          - 局面与思考时的根完全一致：直接沿用整棵子树；
+          - 对手已走子：新建根节点，把思考树中仍然合法的己方走法的统计迁移为子节点（热启动）；
+        没有可复用的统计时返回 None。
+        """
+        if self._ponder_thread is None:
+            return None
+        self._ponder_stop.set()
+        self._ponder_thread.join()
+        pondered = self._ponder_root
+        self._ponder_thread = None
+        self._ponder_stop = None
+        self._ponder_root = None
+        self.last_ponder_iterations = getattr(pondered, 'ponder_iterations', 0)
+        if board is None:
+            return None
+        counts = self.ponder_counts
+        counts['decisions'] += 1
+        counts['iterations'] += self.last_ponder_iterations
+        if pondered.visits == 0:
+            return None
+
+        if np.array_equal(pondered.board_state, board):
+            counts['exact'] += 1
+            counts['reused_visits'] += pondered.visits
+            return pondered
+
+        root = MCTSNode(board, self.player_id)
+        root.untried_moves = self.candidate_moves(board)
+        legal = set(root.untried_moves)
+        for old_child, move in zip(pondered.children, self.child_moves(pondered)):
+            if move not in legal or old_child.visits == 0:
+                continue
+            root.untried_moves.remove(move)
+            new_board = board.copy()
+            f, t = move
+            new_board[t] = new_board[f]
+            new_board[f] = 0
+            child = MCTSNode(new_board, self.player_id, parent=root, move=move)
+            child.untried_moves = self.candidate_moves(new_board)
+            child.wins = old_child.wins
+            child.visits = old_child.visits
+            child.amaf_wins = old_child.amaf_wins
+            child.amaf_visits = old_child.amaf_visits
+            root.children.append(child)
+            root.visits += child.visits
+            root.wins += child.wins
         if not root.children:
-            return random.choice(root.untried_moves) if root.untried_moves else None
-        best_child = max(root.children, key=lambda c: c.visits)
-        return best_child.move if best_child.move else None
+            return None
+        counts['warm'] += 1
+        counts['reused_visits'] += root.visits
+        return root
+
+    def candidate_moves(self, board):
+        """
+        生成节点的候选走法。开启 prune_backward 时去掉后退走法；
+        开启 widening 时按先验升序排列，expand 从末尾 pop，先展开先验最高的走法。
+        """
+        if self.cache is not None:
+            moves = self.cache.moves(board, self.player_id, self.geometry)
+        else:
+            moves = get_all_moves(board, self.player_id, geometry=self.geometry)
+        if not (self.widening or self.prune_backward):
+            return moves
+        dist = self.geometry.distance_tables[self.player_id]
+        deltas = {m: dist[m[0]] - dist[m[1]] for m in moves}
+        if self.prune_backward:
+            forward = [m for m in moves if deltas[m] >= 0]
+            if forward:
+                moves = forward
+        if self.widening:
+            moves.sort(key=lambda m: (is_jump(m) and deltas[m] > 0, deltas[m]))
+        return moves
+
+    def can_expand(self, node):
+        # 渐进展开：子节点数未达到 ceil(c * n^alpha) 时才允许继续展开
+        if not node.untried_moves:
+            return False
+        if not self.widening:
+            return True
+        allowed = math.ceil(self.widening_c * max(node.visits, 1) ** self.widening_alpha)
+        return len(node.children) < allowed
+
+    def tree_depth(self, root):
+        """从根出发的最大深度（图搜索模式下按广度优先取每个节点的最短深度）"""
+        depth = 0
+        seen = {id(root)}
+        level = [root]
+        while level:
+            next_level = []
+            for node in level:
+                for child in node.children:
+                    if id(child) not in seen:
+                        seen.add(id(child))
+                        next_level.append(child)
+            if next_level:
+                depth += 1
+            level = next_level
+        return depth
 
     def select(self, node):
-        # 当无未试走法且有子节点，采用 best_child 往下走
-        while not node.untried_moves and node.children:
+        # 当不能继续展开且有子节点，采用 best_child 往下走
+        while node.children and not self.can_expand(node):
             node = self.best_child(node)
         return node
 
     def best_child(self, node):
-        C = 1.4
+        C = self.exploration
+        if self.rave:
+            return max(node.children, key=lambda c: self.rave_value(c) + C * math.sqrt(math.log(node.visits) / c.visits))
         return max(
             node.children,
             key=lambda c: (c.wins / c.visits) + C * math.sqrt(math.log(node.visits) / c.visits)
         )
 
-    def expand(self, node):
-        move = node.untried_moves.pop()
+    def rave_value(self, child):
+        """按 beta = sqrt(k / (3n + k)) 混合 UCT 胜率与 AMAF 胜率"""
+        q = child.wins / child.visits
+        if child.amaf_visits == 0:
+            return q
+        beta = math.sqrt(self.rave_k / (3 * child.visits + self.rave_k))
+        return (1 - beta) * q + beta * (child.amaf_wins / child.amaf_visits)
+
+    def new_child(self, node, move, key=None):
+        """node 走 move 后的新节点（尚未挂到树上），key 为图搜索模式下的局面哈希，size 已按 node_bytes 计算"""
         new_board = node.board_state.copy()
         f, t = move
         if new_board[t] == 0:
             new_board[t] = new_board[f]
             new_board[f] = 0
         child_node = MCTSNode(new_board, self.player_id, parent=node, move=move)
-        child_node.untried_moves = get_all_moves(new_board, self.player_id)
+        child_node.key = key
+        child_node.untried_moves = self.candidate_moves(new_board)
+        child_node.size = node_bytes(child_node)
+        return child_node
+
+    def expand(self, node, child_node=None):
+        """展开 node 的最后一个未试走法；child_node 为事先用 new_child 建好的对应节点"""
+        move = node.untried_moves.pop()
+        if child_node is None:
+            child_node = self.new_child(node, move)
         node.children.append(child_node)
+        self.track(child_node)
         return child_node
 
-    def simulate(self, node):
-        # 半贪心模拟：自己回合选择最佳走法，其它玩家随机
+    def simulate(self, node, played=None):
+        # 按各玩家的模拟策略走子（默认：自己回合贪心，其它玩家随机）
+        # played 不为 None 时记录己方在模拟中走过的走法，供 RAVE 使用
         board = node.board_state.copy()
         current_player = self.player_id
-        depth_limit = 15  # 降低模拟步数
+        depth_limit = self.rollout_depth  # 降低模拟步数
+        start_time = time.perf_counter()
 
         for _ in range(depth_limit):
-            moves = get_all_moves(board, current_player)
+            moves = get_all_moves(board, current_player, geometry=self.geometry)
             if not moves:
                 break
 
-            if current_player == self.player_id:
-                # 在自己回合采用简单贪心：选 evaluation 最佳
-                best_move = None
-                best_val = -float('inf')
-                for m in moves:
-                    sim_board = board.copy()
-                    ff, tt = m
-                    sim_board[tt] = sim_board[ff]
-                    sim_board[ff] = 0
-                    val = self.evaluate(sim_board)
-                    if val > best_val:
-                        best_val = val
-                        best_move = m
-                chosen_move = best_move if best_move else random.choice(moves)
-            else:
-                # 其余玩家随机
-                chosen_move = random.choice(moves)
+            chosen_move = self.rollout_policies[current_player].select(board, moves, current_player, self.geometry)
+            if played is not None and current_player == self.player_id:
+                played.append(chosen_move)
 
             f, t = chosen_move
             board[t] = board[f]
             board[f] = 0
             current_player = (current_player % 4) + 1
 
+        elapsed = time.perf_counter() - start_time
+        for policy in set(self.rollout_policies.values()):
+            policy.record_playout(elapsed)
         return self.evaluate(board)
 
-    def backpropagate(self, node, result):
+    def backpropagate(self, node, reward, played=None):
+        # played 为模拟中己方的走法；沿路径向上时再并入树内走法，
+        # 用于更新每个节点下「之后被走出过」的兄弟走法的 AMAF 统计
+        later_moves = set(played) if played is not None else None
         while node is not None:
             node.visits += 1
-            if result > 0:
-                node.wins += 1
+            node.wins += reward
+            if later_moves is not None:
+                for child in node.children:
+                    if child.move in later_moves:
+                        child.amaf_visits += 1
+                        child.amaf_wins += reward
+                if node.move is not None:
+                    later_moves.add(node.move)
             node = node.parent
 
     def evaluate(self, board):
         # 简单评价：己方棋子到目标角的曼哈顿距离之和 (越小越好 => return -distance_sum)
-        if self.player_id == 1:
-            target = (11, 11)
-        elif self.player_id == 2:
-            target = (11, 0)
-        elif self.player_id == 3:
-            target = (0, 11)
-        elif self.player_id == 4:
-            target = (0, 0)
-        positions = np.argwhere(board == self.player_id)
-        total_dist = sum(abs(p[0] - target[0]) + abs(p[1] - target[1]) for p in positions)
-        return -total_dist
+        return -self.geometry.distance_sum(board, self.player_id)
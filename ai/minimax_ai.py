@@ -1,41 +1,262 @@
 # ai/minimax_ai.py
 import numpy as np
 import random
-from .move_utils import get_all_moves, free_up_target_entry
+import time
+import concurrent.futures
+from .move_utils import get_all_moves, free_up_target_entry, resolve_cache
+from .geometry import DEFAULT_GEOMETRY, PLAYERS
+from .symmetry import is_symmetric
+from .movegen import MoveList
+from .time_manager import TimeManager, resolve_time_manager
+from .pn_search import EndgameSolver
+from . import batch
+
+# 工作进程中按 (玩家, 深度, 几何, 缓存设置) 复用的搜索实例
+_worker_agents = {}
+
+
+def search_root_move(player_id, depth, geometry, use_cache, cache_values, cache_canonical, board, move, alpha):
+    """在工作进程中搜索一个根走法：返回 min_value(走后局面, depth - 1, alpha, +inf)"""
+    key = (player_id, depth, geometry, use_cache, cache_values, cache_canonical)
+    agent = _worker_agents.get(key)
+    if agent is None:
+        agent = _worker_agents[key] = MinimaxAI(player_id, depth, geometry, cache=use_cache,
+                                                cache_values=cache_values, cache_canonical=cache_canonical)
+    return agent.root_value(board, move, alpha)
+
 
 class MinimaxAI:
-    def __init__(self, player_id, depth=2):
+    def __init__(self, player_id, depth=2, geometry=None, cache=None, cache_size=None, cache_values=False,
+                 workers=0, cache_canonical=False, incremental=True, game_time=None, time_manager=None,
+                 endgame=False, endgame_nodes=20000):
+        """
+        :param workers: 大于 0 时把根节点的各个走法分给 workers 个进程并行搜索（根分裂），
+                        结果与串行搜索完全相同；0 为串行
+        :param incremental: 搜索中用增量走法表（movegen.MoveList）在同一个棋盘上走子/撤销，
+                            不再每个节点复制棋盘并重新生成走法；结果与逐节点生成完全相同
+        :param cache: 局面缓存（见 move_utils.resolve_cache）：True 使用进程内共享缓存，
+                      缓存走法列表（仅 incremental=False 时）。depth 2 / 3 的搜索几乎没有置换，
+                      实测命中率为 0，不会提速（见 move_utils.PositionCache）
+        :param cache_size: 共享缓存的容量（条目数）
+        :param cache_values: 同时缓存叶子的终局判断与评估值。当前的评估（距离和）比一次缓存查找还便宜，
+                             只有换成更昂贵的评估函数时才值得打开
+        :param cache_canonical: 评估值按规范局面缓存（见 symmetry.py），四个座位的 AI 共用条目；
+                                棋盘几何不对称时忽略
+        :param game_time: 整局的思考时间（秒），给出时按对局时钟分配每步时间（见 time_manager.py）：
+                          只有一个走法时直接返回，否则从深度 1 开始迭代加深，预计下一层超出本步时间时
+                          停在已完成的最深一层（最多 depth 层）；None 时总是搜索 depth 层
+        :param time_manager: 直接指定 TimeManager（可与其他对象共用一个时钟），优先于 game_time
+        :param endgame: 目标区外只剩少数棋子时先用证明数搜索（见 pn_search.py）求最短完成序列，
+                        证明成功就按序列走子，不再搜索
+        :param endgame_nodes: 每次证明最多展开的节点数
+        """
         self.player_id = player_id
         self.depth = depth
+        self.geometry = geometry or DEFAULT_GEOMETRY
+        self.cache = resolve_cache(cache, cache_size)
+        self.cache_values = cache_values and self.cache is not None
+        self.cache_canonical = cache_canonical and is_symmetric(self.geometry)
+        self.workers = workers
+        self.incremental = incremental
+        self.movelist = None
+        self._pool = None
+        self.time_manager = resolve_time_manager(time_manager, game_time, self.geometry)
+        self.endgame = EndgameSolver(player_id, self.geometry, node_budget=endgame_nodes) if endgame else None
+        # 最近一次决策实际搜索的深度
+        self.last_depth = 0
+
+    def all_moves(self, board, player_id):
+        if self.movelist is not None:
+            return self.movelist.moves(player_id)
+        if self.cache is not None:
+            return self.cache.moves(board, player_id, self.geometry)
+        return get_all_moves(board, player_id, geometry=self.geometry)
 
     def choose_move(self, board):
-        move_to_free = free_up_target_entry(board, self.player_id)
+        # 有对局时钟时每一步（包括残局求解器和腾出目标区入口的走法）都计入时钟，moves_played 与实际步数一致
+        clock = None if self.time_manager is None else self.time_manager.start(board, self.player_id)
+        try:
+            return self.decide(board, clock)
+        finally:
+            if clock is not None:
+                self.time_manager.finish(clock)
+
+    def decide(self, board, clock):
+        if self.endgame is not None:
+            move = self.endgame.choose_move(board)
+            if move is not None:
+                return move
+        if self.cache is not None:
+            move_to_free = self.cache.free_up_move(board, self.player_id, self.geometry)
+        else:
+            move_to_free = free_up_target_entry(board, self.player_id, self.geometry)
         if move_to_free:
             return move_to_free
         
-        moves = get_all_moves(board, self.player_id)
+        moves = self.all_moves(board, self.player_id)
         if not moves:
             return None
+        if clock is not None:
+            return self.choose_with_clock(board, moves, clock)
+        self.last_depth = self.depth
+        if self.workers > 0:
+            return self.choose_root_parallel(board, moves)
+        return self.search_root(board, moves, self.depth)
+
+    def new_game(self, max_moves=None, game_time=None):
+        """
+        新的一局开始前调用（模拟器、界面）：对局时钟恢复为整局时间，并记下步数上限 max_moves，
+        清除残局求解器上一局的记录。
+        给出 game_time 时按它重设整局时间（原来没有对局时钟的改为按时钟迭代加深）。
+        """
+        if self.time_manager is None and game_time is not None:
+            self.time_manager = TimeManager(game_time, self.geometry)
+        if self.time_manager is not None:
+            self.time_manager.reset(game_time, max_moves)
+        if self.endgame is not None:
+            self.endgame.reset()
+
+    def search_root(self, board, moves, depth):
+        """串行搜索 depth 层，返回值最大者中下标最小的走法"""
         best_val = -float('inf')
         best_move = None
-        for move in moves:
-            new_board = self.simulate_move(board, move)
-            val = self.min_value(new_board, self.depth - 1, -float('inf'), float('inf'))
-            if val > best_val:
-                best_val = val
-                best_move = move
+        self.start_search(board)
+        try:
+            for move in moves:
+                new_board = self.play(board, move, depth - 1)
+                val = self.min_value(new_board, depth - 1, -float('inf'), float('inf'))
+                self.unplay(depth - 1)
+                if val > best_val:
+                    best_val = val
+                    best_move = move
+        finally:
+            self.movelist = None
+        return best_move
+
+    def choose_with_clock(self, board, moves, clock):
+        """
+        按本步的 MoveClock 迭代加深。下一层的耗时按最近两层的耗时比外推（只完成一层时按走法数估计），
+        预计在本步的基本时间内完成才继续；已到 depth 层时与不限时搜索的结果相同。
+        """
+        if len(moves) == 1:
+            self.last_depth = 0
+            return moves[0]
+        best_move = None
+        durations = []
+        for depth in range(1, self.depth + 1):
+            if durations:
+                growth = durations[-1] / durations[-2] if len(durations) > 1 and durations[-2] > 0 else len(moves)
+                if clock.elapsed() + durations[-1] * growth > clock.soft:
+                    break
+            started = time.perf_counter()
+            if depth == self.depth and self.workers > 0:
+                best_move = self.choose_root_parallel(board, moves)
+            else:
+                best_move = self.search_root(board, moves, depth)
+            durations.append(time.perf_counter() - started)
+            self.last_depth = depth
         return best_move
 
+    def root_value(self, board, move, alpha):
+        """根走法 move 的值 min_value(走后局面, depth - 1, alpha, +inf)，供并行搜索的工作进程调用"""
+        self.start_search(board)
+        try:
+            return self.min_value(self.play(board, move, self.depth - 1), self.depth - 1, alpha, float('inf'))
+        finally:
+            self.movelist = None
+
+    def start_search(self, board):
+        if self.incremental:
+            self.movelist = MoveList(board, self.geometry)
+
+    def play(self, board, move, depth):
+        """
+        走一步，返回走后的棋盘（depth 为走后剩余的搜索深度）。增量模式下在走法表的棋盘上原地走子，
+        之后须以相同的 depth 调用 unplay；走到叶子（depth <= 0）时不再生成走法，直接复制棋盘更便宜。
+        """
+        if self.movelist is not None and depth > 0:
+            self.movelist.apply(move)
+            return self.movelist.board
+        return self.simulate_move(board, move)
+
+    def unplay(self, depth):
+        if self.movelist is not None and depth > 0:
+            self.movelist.undo()
+
+    def choose_root_parallel(self, board, moves):
+        """
+        根分裂并行搜索，返回与串行搜索相同的走法（值最大者中下标最小的一个）。
+
+        始终保持 workers 个根走法在搜索中，每个走法提交时带一个 alpha 下界：
+          - 已得到精确值的、下标更小的走法的值 v：本走法只有严格大于 v 才可能被串行搜索选中；
+          - 已得到精确值的、下标更大的走法的值 v 减 1：本走法至少要等于 v 才能因下标小而被选中
+            （评估值为整数，故 > v - 1 即 >= v）。
+        返回值大于所用 alpha 的结果是精确值；否则只是上界，说明该走法不会被串行搜索选中。
+        """
+        pool = self.get_pool()
+        exact = {}
+        pending = {}
+        next_index = 0
+
+        def alpha_for(i):
+            alpha = -float('inf')
+            for j, v in exact.items():
+                alpha = max(alpha, v if j < i else v - 1)
+            return alpha
+
+        while pending or next_index < len(moves):
+            while next_index < len(moves) and len(pending) < self.workers:
+                alpha = alpha_for(next_index)
+                future = pool.submit(search_root_move, self.player_id, self.depth, self.geometry,
+                                     self.cache is not None, self.cache_values, self.cache_canonical,
+                                     board, moves[next_index], alpha)
+                pending[future] = (next_index, alpha)
+                next_index += 1
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                i, alpha = pending.pop(future)
+                value = future.result()
+                if value > alpha:
+                    exact[i] = value
+        best = min(exact, key=lambda i: (-exact[i], i))
+        return moves[best]
+
+    def get_pool(self):
+        # 进程池在第一次并行搜索时创建，之后复用
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __getstate__(self):
+        # 进程池不能跨进程传递，复制出的实例在需要时重新创建
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+    def choose_moves(self, boards, workers=0, seed=None):
+        """批量求走法，返回 (N, 2, 2) 数组，见 ai/batch.py"""
+        return batch.choose_moves(self, boards, workers, seed=seed)
+
+    def evaluate_positions(self, boards):
+        """批量计算 evaluate（向量化），返回 (N,) 数组"""
+        return batch.evaluate_positions(boards, self.player_id, self.geometry)
+
     def max_value(self, board, depth, alpha, beta):
         if depth == 0 or self.terminal(board):
             return self.evaluate(board)
         value = -float('inf')
-        moves = get_all_moves(board, self.player_id)
+        moves = self.all_moves(board, self.player_id)
         if not moves:
             return self.evaluate(board)
         for move in moves:
-            new_board = self.simulate_move(board, move)
+            new_board = self.play(board, move, depth - 1)
             value = max(value, self.min_value(new_board, depth - 1, alpha, beta))
+            self.unplay(depth - 1)
             if value >= beta:
                 return value
             alpha = max(alpha, value)
@@ -47,12 +268,13 @@ class MinimaxAI:
         if depth == 0 or self.terminal(board):
             return self.evaluate(board)
         value = float('inf')
-        moves = get_all_moves(board, opp)
+        moves = self.all_moves(board, opp)
         if not moves:
             return self.evaluate(board)
         for move in moves:
-            new_board = self.simulate_move(board, move)
+            new_board = self.play(board, move, depth - 1)
             value = min(value, self.max_value(new_board, depth - 1, alpha, beta))
+            self.unplay(depth - 1)
             if value <= alpha:
                 return value
             beta = min(beta, value)
@@ -66,21 +288,17 @@ class MinimaxAI:
         return new_board
 
     def evaluate(self, board):
-        if self.player_id == 1:
-            my_target = (11, 11)
-        elif self.player_id == 2:
-            my_target = (11, 0)
-        elif self.player_id == 3:
-            my_target = (0, 11)
-        elif self.player_id == 4:
-            my_target = (0, 0)
-        my_pieces = np.argwhere(board == self.player_id)
-        my_distance = sum([abs(p[0] - my_target[0]) + abs(p[1] - my_target[1]) for p in my_pieces])
-        return -my_distance
+        # 己方棋子到目标角的曼哈顿距离之和取负
+        if self.cache_values:
+            return self.cache.value('distance', board, self.player_id,
+                                    lambda: -self.geometry.distance_sum(board, self.player_id),
+                                    canonical=self.cache_canonical, geometry=self.geometry)
+        return -self.geometry.distance_sum(board, self.player_id)
 
     def terminal(self, board):
-        p1_done = np.count_nonzero(board[9:12, 9:12] == 1) == 9
-        p2_done = np.count_nonzero(board[9:12, 0:3] == 2) == 9
-        p3_done = np.count_nonzero(board[0:3, 9:12] == 3) == 9
-        p4_done = np.count_nonzero(board[0:3, 0:3] == 4) == 9
-        return p1_done or p2_done or p3_done or p4_done
+        if self.cache_values:
+            # 与玩家无关，统一记在玩家 0 下（按规范局面缓存时以自己的视角规范化）
+            return self.cache.value('terminal', board, self.player_id if self.cache_canonical else 0,
+                                    lambda: any(self.geometry.is_finished(board, p) for p in PLAYERS),
+                                    canonical=self.cache_canonical, geometry=self.geometry)
+        return any(self.geometry.is_finished(board, p) for p in PLAYERS)
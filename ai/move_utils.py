@@ -1,37 +1,26 @@
 # ai/move_utils.py
+import sys
+from collections import OrderedDict
 import numpy as np
+from .geometry import DEFAULT_GEOMETRY
+from .symmetry import canonicalize
 
-def get_valid_moves(pos, board):
-    x, y = pos
-    moves = []
-    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-    for dx, dy in directions:
-        nx, ny = x + dx, y + dy
-        if 0 <= nx < board.shape[0] and 0 <= ny < board.shape[1] and board[nx, ny] == 0:
-            moves.append((nx, ny))
-    return moves
+def get_valid_moves(pos, board, geometry=None):
+    geometry = geometry or DEFAULT_GEOMETRY
+    return [n for n in geometry.step_table[pos] if board[n] == 0]
 
-def get_jump_moves(pos, board):
-    x, y = pos
-    moves = []
-    directions = [(-1, -1), (-1, 0), (-1, 1),
-                  (0, -1),           (0, 1),
-                  (1, -1),  (1, 0),  (1, 1)]
-    for dx, dy in directions:
-        midx, midy = x + dx, y + dy
-        landingx, landingy = x + 2 * dx, y + 2 * dy
-        if (0 <= midx < board.shape[0] and 0 <= midy < board.shape[1] and board[midx, midy] != 0):
-            if (0 <= landingx < board.shape[0] and 0 <= landingy < board.shape[1] and board[landingx, landingy] == 0):
-                moves.append((landingx, landingy))
-    return moves
+def get_jump_moves(pos, board, geometry=None):
+    geometry = geometry or DEFAULT_GEOMETRY
+    return [landing for mid, landing in geometry.jump_table[pos] if board[mid] != 0 and board[landing] == 0]
 
-def get_all_moves(board, player_id, as_move_tuple=True):
+def get_all_moves(board, player_id, as_move_tuple=True, geometry=None):
+    geometry = geometry or DEFAULT_GEOMETRY
+    step_table = geometry.step_table
+    jump_table = geometry.jump_table
     moves = []
-    positions = np.argwhere(board == player_id)
-    for pos in positions:
-        pos = tuple(pos)
-        valid = get_valid_moves(pos, board)
-        jump = get_jump_moves(pos, board)
+    for pos in map(tuple, np.argwhere(board == player_id).tolist()):
+        valid = [n for n in step_table[pos] if board[n] == 0]
+        jump = [landing for mid, landing in jump_table[pos] if board[mid] != 0 and board[landing] == 0]
         if as_move_tuple:
             moves.extend([(pos, m) for m in valid])
             moves.extend([(pos, m) for m in jump])
@@ -86,12 +75,12 @@ def get_continuous_jump_moves(pos, board, visited=None, max_depth=3):
      
     
 
-def free_up_target_entry(board, player_id):
+def free_up_target_entry(board, player_id, geometry=None):
     """
     当目标区域几乎填满，导致最后一个棋子无法进入时，
     尝试腾出目标入口位置，方法是将目标区域内处于入口边界的棋子向内部移动。
-    
-    四个玩家的目标区域和入口条件：
+
+    以默认 12x12 棋盘为例，四个玩家的目标区域和入口条件：
     - 玩家 1（目标：右下区域，即 row >= 9 且 col >= 9）：若棋子处于 row==9 或 col==9，
       尝试移动到 (row+1, col)、(row, col+1) 或 (row+1, col+1) 中空的单元。
     - 玩家 2（目标：左下区域，即 row >= 9 且 col < 3）：若棋子处于 row==9 或 col==2，
@@ -100,68 +89,172 @@ def free_up_target_entry(board, player_id):
       尝试移动到 (row-1, col)、(row, col+1) 或 (row-1, col+1) 中空的单元。
     - 玩家 4（目标：左上区域，即 row < 3 且 col < 3）：若棋子处于 row==2 或 col==2，
       尝试移动到 (row-1, col)、(row, col-1) 或 (row-1, col-1) 中空的单元。
+    其它尺寸的棋盘按 geometry 中的入口行/列与向内方向同样处理。
     """
-    if player_id == 1:
-        for row in range(9, 12):
-            for col in range(9, 12):
-                if board[row, col] == 1:
-                    if row == 9 or col == 9:
-                        candidates = []
-                        if row + 1 < 12 and board[row+1, col] == 0:
-                            candidates.append((row+1, col))
-                        if col + 1 < 12 and board[row, col+1] == 0:
-                            candidates.append((row, col+1))
-                        if row + 1 < 12 and col + 1 < 12 and board[row+1, col+1] == 0:
-                            candidates.append((row+1, col+1))
-                        if candidates:
-                            best_candidate = min(candidates, key=lambda pos: abs(pos[0]-11) + abs(pos[1]-11))
-                            return ((row, col), best_candidate)
-        return None
-    elif player_id == 2:
-        for row in range(9, 12):
-            for col in range(0, 3):
-                if board[row, col] == 2:
-                    if row == 9 or col == 2:
-                        candidates = []
-                        if row + 1 < 12 and board[row+1, col] == 0:
-                            candidates.append((row+1, col))
-                        if col - 1 >= 0 and board[row, col-1] == 0:
-                            candidates.append((row, col-1))
-                        if row + 1 < 12 and col - 1 >= 0 and board[row+1, col-1] == 0:
-                            candidates.append((row+1, col-1))
-                        if candidates:
-                            best_candidate = min(candidates, key=lambda pos: abs(pos[0]-11) + abs(pos[1]-0))
-                            return ((row, col), best_candidate)
-        return None
-    elif player_id == 3:
-        for row in range(0, 3):
-            for col in range(9, 12):
-                if board[row, col] == 3:
-                    if row == 2 or col == 9:
-                        candidates = []
-                        if row - 1 >= 0 and board[row-1, col] == 0:
-                            candidates.append((row-1, col))
-                        if col + 1 < 12 and board[row, col+1] == 0:
-                            candidates.append((row, col+1))
-                        if row - 1 >= 0 and col + 1 < 12 and board[row-1, col+1] == 0:
-                            candidates.append((row-1, col+1))
-                        if candidates:
-                            best_candidate = min(candidates, key=lambda pos: abs(pos[0]-0) + abs(pos[1]-11))
-                            return ((row, col), best_candidate)
-        return None
-    elif player_id == 4:
-        for row in range(0, 3):
-            for col in range(0, 3):
-                if board[row, col] == 4:
-                    if row == 2 or col == 2:
-                        candidates = []
-                        if row - 1 >= 0 and board[row-1, col] == 0:
-                            candidates.append((row-1, col))
-                        if col - 1 >= 0 and board[row, col-1] == 0:
-                            candidates.append((row, col-1))
-                        if row - 1 >= 0 and col - 1 >= 0 and board[row-1, col-1] == 0:
-                            candidates.append((row-1, col-1))
-                        if candidates:
-                            best_candidate = min(candidates, key=lambda pos: abs(pos[0]-0) + abs(pos[1]-0))
-                            return ((row, col), best_candidate)
+    geometry = geometry or DEFAULT_GEOMETRY
+    if player_id not in geometry.target_ranges:
         return None
+    row_range, col_range = geometry.target_ranges[player_id]
+    entry_row, entry_col = geometry.entry_lines[player_id]
+    dr, dc = geometry.inward[player_id]
+    dist = geometry.distance_tables[player_id]
+    for row in row_range:
+        for col in col_range:
+            if board[row, col] == player_id and (row == entry_row or col == entry_col):
+                candidates = [
+                    pos for pos in ((row + dr, col), (row, col + dc), (row + dr, col + dc))
+                    if geometry.is_cell(pos) and board[pos] == 0
+                ]
+                if candidates:
+                    best_candidate = min(candidates, key=lambda pos: dist[pos])
+                    return ((row, col), best_candidate)
+    return None
+
+
+_MISSING = object()
+
+
+# 缓存中一个走法的大致字节数：走法元组 (from, to) 与列表中的一个指针
+# （落点坐标元组来自几何的邻接表，起点坐标元组由同一棋子的走法共享，都不重复计算）
+MOVE_BYTES = sys.getsizeof((None, None)) + 8
+# 每个条目除棋盘字节串内容外的固定开销：键元组、字节串对象头、(值, 大小) 元组与 OrderedDict 的链表节点和哈希槽
+KEY_BYTES = sys.getsizeof((None,) * 4) + sys.getsizeof(b'') + sys.getsizeof((None, None)) + 100
+
+
+def approx_sizeof(value):
+    """缓存值的大致字节数（常数时间估计：走法序列按长度计，指针已含在 getsizeof 中）"""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += len(value) * (MOVE_BYTES - 8)
+    return size
+
+
+class PositionCache:
+    """
+    按局面缓存走法列表、评估值等计算结果，LRU 淘汰。
+
+    键为 (种类, 玩家ID, (行数, 列数, 起始区边长), 棋盘的 int8 字节串)：比 Zobrist 哈希快一个数量级，且不会冲突。
+    键中带上起始区边长：尺寸相同、角区大小不同的几何目标区不同，走法以外的结果（腾挪、评估）也不同。
+    同一个缓存可以在一局的多个 AI 之间共享（见 shared_cache），也可以每个 AI 各用一个。
+    hits / misses / evictions 统计命中情况，memory_bytes 为缓存内容（键与值）的大致内存占用。
+    不加锁：单个字典操作在 GIL 下是原子的，后台思考线程与其他 AI 并发使用时最多使计数略有偏差。
+
+    缓存不是通用的提速手段，只在局面确实重复时有用（12x12，cli.py bench-cache 实测）：
+      - MCTS 展开节点：命中 25%～34%，迭代速度约为不开缓存时的 1.0～1.2 倍，内存约 20 MB / 20 个局面；
+      - Minimax（depth 2 / 3）的走法列表、Greedy 的腾挪入口：每步都是新局面，命中率为 0，只增加开销；
+      - Minimax 的 cache_values（depth 3）：命中约 24%，但查找比距离评估更贵，慢 30%～45%。
+    打开前先用 cli.py bench-cache 检查具体配置的命中率与速度。
+    """
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # 键 -> (值, 大致字节数)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.memory_bytes = 0
+
+    def key(self, kind, board, player_id, geometry=None):
+        geometry = geometry or DEFAULT_GEOMETRY
+        if board.dtype != np.int8:
+            board = board.astype(np.int8)
+        return (kind, player_id, (geometry.rows, geometry.cols, geometry.camp_size), board.tobytes())
+
+    def lookup(self, kind, board, player_id, compute, geometry=None):
+        """返回缓存值；未命中时调用 compute() 计算并存入"""
+        key = self.key(kind, board, player_id, geometry)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            try:
+                self.entries.move_to_end(key)
+            except KeyError:
+                pass
+            return entry[0]
+        self.misses += 1
+        value = compute()
+        self.store(key, value)
+        return value
+
+    def store(self, key, value):
+        size = KEY_BYTES + len(key[3]) + approx_sizeof(value)
+        if self.entries.setdefault(key, (value, size))[1] is size:
+            self.memory_bytes += size
+            self.trim()
+
+    def trim(self):
+        while len(self.entries) > self.max_entries:
+            try:
+                _, (_, size) = self.entries.popitem(last=False)
+            except KeyError:
+                break
+            self.memory_bytes -= size
+            self.evictions += 1
+
+    def moves(self, board, player_id, geometry=None):
+        """缓存版的 get_all_moves（返回副本，调用方可以修改）"""
+        # 以元组保存：只含元组和整数的元组会被垃圾回收器取消跟踪，大量缓存条目不会拖慢 gc
+        return list(self.lookup('moves', board, player_id,
+                                lambda: tuple(get_all_moves(board, player_id, geometry=geometry)), geometry))
+
+    def free_up_move(self, board, player_id, geometry=None):
+        """缓存版的 free_up_target_entry"""
+        return self.lookup('free_up', board, player_id,
+                           lambda: free_up_target_entry(board, player_id, geometry), geometry)
+
+    def value(self, kind, board, player_id, compute, canonical=False, geometry=None):
+        """
+        缓存任意按 (局面, 玩家, 几何) 决定的评估值，kind 区分不同的评估函数。
+        canonical 为 True 时按规范局面（见 symmetry.py，变换到玩家 1 的视角）存取，四个座位共用条目；
+        只适用于在对称变换下不变的值（如距离评估、终局判断），且棋盘几何须对称。
+        """
+        if canonical:
+            board, _ = canonicalize(board, player_id, diagonal=True)
+            player_id = 1
+        return self.lookup(kind, board, player_id, compute, geometry)
+
+    def resize(self, max_entries):
+        self.max_entries = max_entries
+        self.trim()
+
+    def clear(self):
+        self.entries.clear()
+        self.memory_bytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self.entries), 'max_entries': self.max_entries,
+                'evictions': self.evictions, 'memory_bytes': self.memory_bytes}
+
+    def __len__(self):
+        return len(self.entries)
+
+
+_shared_cache = None
+
+
+def shared_cache(max_entries=None):
+    """本进程内所有 AI 共用的缓存；max_entries 不为 None 时调整其容量"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = PositionCache() if max_entries is None else PositionCache(max_entries)
+    elif max_entries is not None and max_entries != _shared_cache.max_entries:
+        _shared_cache.resize(max_entries)
+    return _shared_cache
+
+
+def shared_cache_stats():
+    """共享缓存的统计，未使用过时返回 None"""
+    return _shared_cache.stats() if _shared_cache is not None else None
+
+
+def resolve_cache(cache, cache_size=None):
+    """
+    AI 构造参数 cache 的约定：None / False 不使用缓存；True 使用共享缓存（容量 cache_size）；
+    也可以直接传入 PositionCache 实例
+    """
+    if isinstance(cache, PositionCache):
+        return cache
+    if cache:
+        return shared_cache(cache_size)
+    return None
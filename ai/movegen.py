@@ -0,0 +1,113 @@
+# ai/movegen.py
+"""
+增量维护的走法表：记录每个玩家每颗棋子的合法走法，走一步只重算受影响的棋子，支持撤销。
+
+一步 (f, t) 只改变 f、t 两格。某颗棋子的走法只取决于它的单步落点、跳跃的中间格与落点，
+所以只有「单步落点、跳跃中间格或跳跃落点包含 f 或 t」的棋子（以及刚走到 t 的棋子本身）需要重算。
+这些格子的反向索引按棋盘几何预先算好（influence_table）。
+
+走法列表的顺序与 move_utils.get_all_moves 完全一致（棋子按行优先，每颗棋子先单步后跳跃），
+可以直接替换，搜索中平局时选出的走法不变。
+"""
+import numpy as np
+from .geometry import DEFAULT_GEOMETRY
+
+# 每种棋盘几何的反向索引：{格子: 走法受该格影响的格子元组}
+_influence_tables = {}
+
+
+def influence_table(geometry):
+    table = _influence_tables.get(geometry)
+    if table is None:
+        influence = {cell: set() for cell in geometry.cells}
+        for cell in geometry.cells:
+            for n in geometry.step_table[cell]:
+                influence[n].add(cell)
+            for mid, landing in geometry.jump_table[cell]:
+                influence[mid].add(cell)
+                influence[landing].add(cell)
+        table = _influence_tables[geometry] = {cell: tuple(sorted(s)) for cell, s in influence.items()}
+    return table
+
+
+class MoveList:
+    def __init__(self, board, geometry=None, copy=True, record=True):
+        """
+        :param board: 棋盘数组
+        :param copy: 为 False 时直接使用传入的数组（之后对它的修改必须都经过 apply / undo）
+        :param record: 是否记录撤销信息。只前进不撤销的使用者（如 Board 的走法表）应关闭，
+                       否则每步的记录会一直累积
+        """
+        self.geometry = geometry or DEFAULT_GEOMETRY
+        self.board = board.copy() if copy else board
+        self.step_table = self.geometry.step_table
+        self.jump_table = self.geometry.jump_table
+        self.influence = influence_table(self.geometry)
+        # {玩家: {棋子位置: [走法, ...]}}
+        self.pieces = {p: {} for p in (1, 2, 3, 4)}
+        for pos in map(tuple, np.argwhere(self.board > 0).tolist()):
+            self.pieces[int(self.board[pos])][pos] = self.piece_moves(pos)
+        # 撤销记录：每步一个 (走法, [(玩家, 位置, 原走法列表或 None), ...])
+        self.record = record
+        self.history = []
+
+    def piece_moves(self, pos):
+        board = self.board
+        moves = [(pos, n) for n in self.step_table[pos] if board[n] == 0]
+        moves.extend([(pos, landing) for mid, landing in self.jump_table[pos]
+                      if board[mid] != 0 and board[landing] == 0])
+        return moves
+
+    def moves(self, player_id):
+        """该玩家的全部合法走法（顺序同 get_all_moves）"""
+        result = []
+        pieces = self.pieces[player_id]
+        for pos in sorted(pieces):
+            result.extend(pieces[pos])
+        return result
+
+    def is_legal(self, move, player_id=None):
+        """走法是否合法（player_id 为 None 时不限定走子方）"""
+        from_pos, to_pos = (tuple(int(v) for v in pos) for pos in move)
+        if not self.geometry.is_cell(from_pos):
+            return False
+        owner = int(self.board[from_pos])
+        if owner <= 0 or (player_id is not None and owner != player_id):
+            return False
+        return (from_pos, to_pos) in self.pieces[owner][from_pos]
+
+    def apply(self, move):
+        """走一步（不检查合法性），更新受影响棋子的走法"""
+        from_pos, to_pos = (tuple(int(v) for v in pos) for pos in move)
+        board = self.board
+        player = int(board[from_pos])
+        board[to_pos] = player
+        board[from_pos] = 0
+        changed = [(player, from_pos, self.pieces[player].pop(from_pos)), (player, to_pos, None)]
+        self.pieces[player][to_pos] = self.piece_moves(to_pos)
+        affected = set(self.influence[from_pos])
+        affected.update(self.influence[to_pos])
+        affected.discard(to_pos)
+        for cell in affected:
+            owner = board[cell]
+            if owner > 0:
+                owned = self.pieces[owner]
+                changed.append((owner, cell, owned[cell]))
+                owned[cell] = self.piece_moves(cell)
+        if self.record:
+            self.history.append(((from_pos, to_pos), changed))
+
+    def undo(self):
+        """撤销最近一步"""
+        (from_pos, to_pos), changed = self.history.pop()
+        board = self.board
+        board[from_pos] = board[to_pos]
+        board[to_pos] = 0
+        for owner, cell, old in reversed(changed):
+            if old is None:
+                del self.pieces[owner][cell]
+            else:
+                self.pieces[owner][cell] = old
+
+    def __len__(self):
+        return len(self.history)
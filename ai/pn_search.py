@@ -0,0 +1,215 @@
+# ai/pn_search.py
+"""
+残局证明数搜索：判断「玩家 X 能否在 N 步（X 自己的走子）之内把棋子全部走进目标区」，
+能则给出最短的走法序列。
+
+搜索只展开 X 自己的走法，其他玩家的棋子视为不动（四人轮流走子时把对手的所有应着都展开，
+证明树大到无法在决策时间内完成）。所以「证明」的含义是：只要对手不挡路，这条走法序列一定
+在 N 步内完成。每一步之前都重新检查剩余序列在实际局面中是否仍然合法（EndgameSolver），
+对手走进了序列要用的格子时重新证明，因此实际走出的每一步都是对当前局面的证明的第一步。
+
+算法为深度优先证明数搜索（df-pn），所有节点都是 OR 节点：
+  - 证明数 pn = 子节点 pn 的最小值，反证数 dn = 子节点 dn 之和；
+  - 叶子的 pn 初值为还需的最少步数（每颗目标区外的棋子到目标区的切比雪夫距离除以 2 向上取整之和，
+    一步只动一颗棋子、最多缩短 2，是下界），dn 初值为 1；
+  - 剩余步数少于下界的节点直接判为反证，全部进入目标区的节点为证明；
+  - 置换表以 (Zobrist 哈希, 剩余步数) 为键，不同走子顺序到达的同一局面只搜索一次。
+N 从下界开始逐步加大，第一个被证明的 N 即最短步数。展开的节点数超过 node_budget 时放弃（结果未知）。
+"""
+import numpy as np
+from .move_utils import get_all_moves
+from .geometry import DEFAULT_GEOMETRY
+
+INF = 10 ** 9
+
+PROVEN = 'proven'
+DISPROVEN = 'disproven'
+UNKNOWN = 'unknown'
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class PNSolver:
+    def __init__(self, player_id, geometry=None, node_budget=20000):
+        self.player_id = player_id
+        self.geometry = geometry or DEFAULT_GEOMETRY
+        self.node_budget = node_budget
+        self.target_mask = self.geometry.target_masks[player_id]
+        self.target_distance = self.geometry.target_distance_tables[player_id]
+        self.table = {}
+        self.nodes = 0
+
+    def lower_bound(self, board):
+        """还需的最少步数；目标区中被其他玩家占住的格子多到放不下己方棋子时为 INF"""
+        p = self.player_id
+        free = int(np.count_nonzero((board == 0) & self.target_mask)) + self.count_inside(board)
+        if free < self.geometry.target_sizes[p]:
+            return INF
+        return int(((self.target_distance[board == p] + 1) // 2).sum())
+
+    def count_inside(self, board):
+        return int(np.count_nonzero((board == self.player_id) & self.target_mask))
+
+    def solve(self, board, max_moves):
+        """
+        返回 (结果, 走法序列)：PROVEN 时序列为最短的完成序列；
+        DISPROVEN 表示 max_moves 步内做不到（在其他棋子不动的前提下）；UNKNOWN 表示超出节点预算。
+        """
+        board = np.array(board, dtype=np.int8)
+        self.table = {}
+        self.nodes = 0
+        if self.geometry.is_finished(board, self.player_id):
+            return PROVEN, []
+        bound = self.lower_bound(board)
+        if bound > max_moves:
+            return DISPROVEN, None
+        root_hash = self.geometry.position_hash(board, self.player_id)
+        try:
+            for depth in range(bound, max_moves + 1):
+                self.mid(board, root_hash, depth, INF, INF)
+                pn, _ = self.table[(root_hash, depth)]
+                if pn == 0:
+                    return PROVEN, self.principal_line(board, root_hash, depth)
+        except BudgetExceeded:
+            return UNKNOWN, None
+        return DISPROVEN, None
+
+    def child_numbers(self, board, position_hash, depth):
+        """走后局面（剩余 depth 步）的 (pn, dn)：终局、下界剪枝、置换表或初值"""
+        if self.count_inside(board) == self.geometry.target_sizes[self.player_id]:
+            return 0, INF
+        bound = self.lower_bound(board)
+        if bound > depth:
+            return INF, 0
+        entry = self.table.get((position_hash, depth))
+        if entry is not None:
+            return entry
+        return max(1, bound), 1
+
+    def mid(self, board, position_hash, depth, thpn, thdn):
+        """df-pn 的多次迭代加深：在阈值内搜索该节点，结果写入置换表"""
+        self.nodes += 1
+        if self.nodes > self.node_budget:
+            raise BudgetExceeded()
+        p = self.player_id
+        moves = get_all_moves(board, p, geometry=self.geometry)
+        while True:
+            pn = INF
+            second = INF
+            dn = 0
+            best = None
+            for move in moves:
+                f, t = move
+                board[t] = p
+                board[f] = 0
+                child_hash = self.geometry.hash_after_move(position_hash, move, p, p)
+                child_pn, child_dn = self.child_numbers(board, child_hash, depth - 1)
+                board[f] = p
+                board[t] = 0
+                dn = min(INF, dn + child_dn)
+                if child_pn < pn:
+                    second = pn
+                    pn = child_pn
+                    best = (move, child_hash, child_dn)
+                elif child_pn < second:
+                    second = child_pn
+            if best is None:
+                pn, dn = INF, 0
+            self.table[(position_hash, depth)] = (pn, dn)
+            if pn >= thpn or dn >= thdn or pn == 0:
+                return
+            move, child_hash, child_dn = best
+            f, t = move
+            board[t] = p
+            board[f] = 0
+            try:
+                self.mid(board, child_hash, depth - 1, min(thpn, second + 1), thdn - dn + child_dn)
+            finally:
+                board[f] = p
+                board[t] = 0
+
+    def principal_line(self, board, position_hash, depth):
+        """沿证明数为 0 的子节点取出完成序列"""
+        board = board.copy()
+        p = self.player_id
+        line = []
+        while not self.geometry.is_finished(board, p):
+            for move in get_all_moves(board, p, geometry=self.geometry):
+                f, t = move
+                board[t] = p
+                board[f] = 0
+                child_hash = self.geometry.hash_after_move(position_hash, move, p, p)
+                if self.child_numbers(board, child_hash, depth - 1)[0] == 0:
+                    line.append(move)
+                    position_hash = child_hash
+                    depth -= 1
+                    break
+                board[f] = p
+                board[t] = 0
+            else:
+                raise RuntimeError("证明树不完整")
+        return line
+
+
+class EndgameSolver:
+    def __init__(self, player_id, geometry=None, max_pieces=3, max_moves=10, node_budget=20000):
+        """
+        供各 AI 在残局调用：目标区外的己方棋子不超过 max_pieces 颗时尝试证明 max_moves 步内完成。
+        证明成功后按序列走子，每步先检查剩余序列在当前局面中是否仍然合法，合法就直接走（不再搜索），
+        不合法（被对手挡住）时重新证明；证明失败或超出预算时返回 None，由 AI 照常搜索，
+        并且直到下界（还需的最少步数）比失败时更小才再次尝试，避免每步都把预算花在同一个做不到的局面上。
+        离开残局（applies 为假，包括新的一局开局）时这些记录全部清除。
+        """
+        self.player_id = player_id
+        self.geometry = geometry or DEFAULT_GEOMETRY
+        self.max_pieces = max_pieces
+        self.max_moves = max_moves
+        self.solver = PNSolver(player_id, self.geometry, node_budget)
+        self.line = []
+        self.failed_bound = None
+        # 最近一次调用的结果：PROVEN / DISPROVEN / UNKNOWN，'replayed'（沿用已证明的序列），None（未到残局）
+        self.last_status = None
+        self.last_nodes = 0
+
+    def reset(self):
+        """清除已证明的序列与失败记录"""
+        self.line = []
+        self.failed_bound = None
+
+    def applies(self, board):
+        outside = np.count_nonzero((board == self.player_id) & ~self.solver.target_mask)
+        return outside <= self.max_pieces
+
+    def line_still_valid(self, board):
+        board = board.copy()
+        p = self.player_id
+        for f, t in self.line:
+            if board[f] != p or board[t] != 0 or (f, t) not in get_all_moves(board, p, geometry=self.geometry):
+                return False
+            board[t] = p
+            board[f] = 0
+        return self.geometry.is_finished(board, p)
+
+    def choose_move(self, board):
+        self.last_status = None
+        self.last_nodes = 0
+        if not self.applies(board) or self.geometry.is_finished(board, self.player_id):
+            self.reset()
+            return None
+        if self.line and self.line_still_valid(board):
+            self.last_status = 'replayed'
+            return self.line.pop(0)
+        self.line = []
+        bound = self.solver.lower_bound(board)
+        if self.failed_bound is not None and bound >= self.failed_bound:
+            return None
+        self.last_status, line = self.solver.solve(board, self.max_moves)
+        self.last_nodes = self.solver.nodes
+        if self.last_status != PROVEN:
+            self.failed_bound = bound
+            return None
+        self.failed_bound = None
+        self.line = line[1:]
+        return line[0]
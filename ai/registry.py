@@ -0,0 +1,167 @@
+# ai/registry.py
+"""
+AI 注册表：按名字登记各个 AI 的实现位置与可配置的构造参数。
+
+实现模块只在第一次创建该 AI 时才导入，因此 GUI、模拟器和命令行只需导入本模块，
+无需在启动时加载所有 AI；新增 AI 时只要在这里登记，不必修改各个脚本。
+"""
+import importlib
+
+
+class AgentSpec:
+    def __init__(self, name, module, class_name, label=None, params=None, presets=None, deterministic=False):
+        """
+        :param name: 注册名（命令行、配置中使用）
+        :param module: 实现所在模块（相对 ai 包，如 '.greedy_ai'）
+        :param class_name: 实现类名
+        :param label: 界面上显示的名字，默认同 name
+        :param params: 可配置的构造参数及默认值 {参数名: 默认值}（不含 player_id、geometry）
+        :param presets: 该注册项固定传入的参数，用于登记同一实现的不同变体
+        :param deterministic: 相同局面是否总是给出相同走法；也可以是按参数判断的函数 f(参数字典) -> bool
+        """
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self.label = label or name
+        self.params = dict(params or {})
+        self.presets = dict(presets or {})
+        self.deterministic = deterministic
+
+    def full_params(self, params):
+        """登记的默认值、固定参数与给出的参数合并后的完整参数"""
+        full = dict(self.params)
+        full.update(self.presets)
+        full.update(params)
+        return full
+
+    def is_deterministic(self, params=None):
+        if callable(self.deterministic):
+            return self.deterministic(self.full_params(params or {}))
+        return self.deterministic
+
+    def load(self):
+        """导入并返回实现类（模块只在第一次调用时导入）"""
+        module = importlib.import_module(self.module, package=__package__)
+        return getattr(module, self.class_name)
+
+    def create(self, player_id, geometry=None, **params):
+        unknown = set(params) - set(self.params)
+        if unknown:
+            raise ValueError(f"{self.name} 不支持参数: {', '.join(sorted(unknown))}")
+        kwargs = dict(self.presets)
+        kwargs.update(params)
+        if geometry is not None:
+            kwargs['geometry'] = geometry
+        return self.load()(player_id, **kwargs)
+
+    def __repr__(self):
+        return f"AgentSpec({self.name!r}, {self.module}.{self.class_name})"
+
+
+AGENTS = {}
+
+
+def register(name, module, class_name, **kwargs):
+    AGENTS[name] = AgentSpec(name, module, class_name, **kwargs)
+    return AGENTS[name]
+
+
+def get_spec(name):
+    """按注册名或界面显示名查找"""
+    if name in AGENTS:
+        return AGENTS[name]
+    for spec in AGENTS.values():
+        if spec.label == name:
+            return spec
+    raise KeyError(f"未知的 AI: {name}（可选: {', '.join(AGENTS)}）")
+
+
+def agent_names():
+    return list(AGENTS)
+
+
+def agent_labels():
+    return [spec.label for spec in AGENTS.values()]
+
+
+def create_agent(name, player_id, geometry=None, **params):
+    return get_spec(name).create(player_id, geometry=geometry, **params)
+
+
+def parse_value(text, default):
+    """按默认值的类型解析命令行中的参数值"""
+    if isinstance(default, bool):
+        return text.lower() in ('1', 'true', 'yes', 'on')
+    if isinstance(default, int):
+        return int(text)
+    if isinstance(default, float):
+        return float(text)
+    if default is None:
+        for cast in (int, float):
+            try:
+                return cast(text)
+            except ValueError:
+                pass
+        return None if text.lower() == 'none' else text
+    return text
+
+
+def parse_agent(text):
+    """
+    解析形如 'MCTS:time_limit=0.5,rave=true' 的描述，返回 (注册名, 参数字典)。
+    参数值按登记的默认值类型转换。
+    """
+    name, _, rest = text.partition(':')
+    spec = get_spec(name)
+    params = {}
+    for item in filter(None, rest.split(',')):
+        key, _, value = item.partition('=')
+        if key not in spec.params:
+            raise ValueError(f"{spec.name} 不支持参数: {key}")
+        params[key] = parse_value(value, spec.params[key])
+    return spec.name, params
+
+
+def build_agents(lineup, geometry=None, decision_cache=None):
+    """
+    按阵容创建四个 AI。lineup: {玩家ID: 注册名 或 (注册名, 参数字典)}
+    decision_cache 为 decision_cache.DecisionCache 时，确定性的 AI 包装为 CachedAgent，走法存入磁盘缓存
+    """
+    agents = {}
+    for player_id, entry in lineup.items():
+        name, params = (entry, {}) if isinstance(entry, str) else entry
+        spec = get_spec(name)
+        agent = spec.create(player_id, geometry=geometry, **params)
+        if decision_cache is not None and spec.is_deterministic(params):
+            from .decision_cache import CachedAgent
+            from .geometry import DEFAULT_GEOMETRY
+            agent = CachedAgent(agent, decision_cache, spec.name, spec.full_params(params),
+                                geometry or DEFAULT_GEOMETRY)
+        agents[player_id] = agent
+    return agents
+
+
+register('Greedy', '.greedy_ai', 'GreedyAI',
+         params={'vectorized': True, 'avoid_repetition': False, 'target_bonus': 20, 'last_piece_bonus': 100,
+                 'cache': False, 'cache_size': None})
+register('AStar', '.astar_ai', 'AStarAI', label='A* 算法', params={'seed': None},
+         deterministic=lambda params: params['seed'] is not None)
+register('MCTS', '.mcts_ai', 'MCTSAI',
+         params={'time_limit': 1.0, 'ponder': False, 'ponder_limit': None, 'rollout_policies': None,
+                 'rave': False, 'rave_k': 100, 'reward': None,
+                 'widening': False, 'widening_c': 1.0, 'widening_alpha': 0.5, 'prune_backward': False,
+                 'exploration': 1.4, 'rollout_depth': 15, 'cache': False, 'cache_size': None,
+                 'max_nodes': None, 'max_tree_bytes': None, 'on_budget': 'prune', 'game_time': None,
+                 'endgame': False, 'endgame_nodes': 20000, 'graph': False})
+register('MCTS-Ponder', '.mcts_ai', 'MCTSAI', label='MCTS (后台思考)',
+         params={'time_limit': 1.0, 'ponder_limit': None, 'exploration': 1.4, 'rollout_depth': 15,
+                 'max_nodes': None, 'max_tree_bytes': None, 'on_budget': 'prune', 'game_time': None,
+                 'endgame': False, 'endgame_nodes': 20000, 'graph': False},
+         presets={'ponder': True})
+register('Minimax', '.minimax_ai', 'MinimaxAI', params={'depth': 2, 'cache': False, 'cache_size': None, 'cache_values': False,
+                 'workers': 0, 'cache_canonical': False,
+                 'incremental': True, 'game_time': None, 'endgame': False, 'endgame_nodes': 20000},
+         # 按对局时钟分配时间时搜索深度取决于耗时；残局求解会沿用之前证明的序列，都与历史有关
+         deterministic=lambda params: params['game_time'] is None and not params['endgame'])
+register('BFS', '.bfs_ai', 'BFSAgent', label='BFS', params={'max_depth': 8, 'seed': None},
+         deterministic=lambda params: params['seed'] is not None)
@@ -0,0 +1,140 @@
+# ai/rollout_policies.py
+"""
+MCTS 模拟（rollout）阶段的走子策略。
+
+所有策略都只根据棋盘几何中预先计算好的「每个格子到目标角的曼哈顿距离」表来给走法打分：
+走法 (f, t) 的改善量 = dist[f] - dist[t]，无需复制棋盘、也无需重新评估整盘。
+每个策略都会统计自己参与的模拟次数与耗时，用 playouts_per_sec() 报告吞吐量。
+"""
+import math
+import random
+from .geometry import DEFAULT_GEOMETRY
+
+
+def distance_table(player_id, geometry=None):
+    """该玩家的每格距离表（由棋盘几何预先计算）"""
+    return (geometry or DEFAULT_GEOMETRY).distance_tables[player_id]
+
+
+def move_delta(move, player_id, geometry=None):
+    """走法带来的距离改善量（正数表示向目标角前进）"""
+    dist = distance_table(player_id, geometry)
+    f, t = move
+    return int(dist[f] - dist[t])
+
+
+def is_jump(move):
+    f, t = move
+    return max(abs(f[0] - t[0]), abs(f[1] - t[1])) == 2
+
+
+class RolloutPolicy:
+    """模拟策略基类：子类实现 select(board, moves, player_id, geometry=None)"""
+    name = "base"
+
+    def __init__(self):
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    def select(self, board, moves, player_id, geometry=None):
+        raise NotImplementedError
+
+    def record_playout(self, elapsed):
+        self.playouts += 1
+        self.elapsed += elapsed
+
+    def playouts_per_sec(self):
+        return self.playouts / self.elapsed if self.elapsed > 0 else 0.0
+
+    def reset_stats(self):
+        self.playouts = 0
+        self.elapsed = 0.0
+
+
+class UniformRandomPolicy(RolloutPolicy):
+    """均匀随机选择走法"""
+    name = "random"
+
+    def select(self, board, moves, player_id, geometry=None):
+        return random.choice(moves)
+
+
+class EpsilonGreedyPolicy(RolloutPolicy):
+    """
+    以概率 epsilon 随机走子，否则选距离改善量最大的走法（并列时取第一个）。
+    epsilon=0 时即为原来的纯贪心模拟。
+    """
+    name = "epsilon-greedy"
+
+    def __init__(self, epsilon=0.1):
+        super().__init__()
+        self.epsilon = epsilon
+
+    def select(self, board, moves, player_id, geometry=None):
+        if self.epsilon > 0 and random.random() < self.epsilon:
+            return random.choice(moves)
+        dist = distance_table(player_id, geometry)
+        best_move = None
+        best_delta = -float('inf')
+        for m in moves:
+            delta = dist[m[0]] - dist[m[1]]
+            if delta > best_delta:
+                best_delta = delta
+                best_move = m
+        return best_move
+
+
+class SoftmaxPolicy(RolloutPolicy):
+    """按距离改善量做 softmax 采样，temperature 越小越接近贪心"""
+    name = "softmax"
+
+    def __init__(self, temperature=1.0):
+        super().__init__()
+        self.temperature = temperature
+
+    def select(self, board, moves, player_id, geometry=None):
+        dist = distance_table(player_id, geometry)
+        deltas = [dist[m[0]] - dist[m[1]] for m in moves]
+        top = max(deltas)
+        weights = [math.exp((d - top) / self.temperature) for d in deltas]
+        return random.choices(moves, weights=weights)[0]
+
+
+class JumpFirstPolicy(RolloutPolicy):
+    """
+    优先向前跳跃：有前进的跳跃时选改善量最大的跳跃，
+    否则选改善量最大的前进单步，都没有时随机走子。
+    """
+    name = "jump-first"
+
+    def select(self, board, moves, player_id, geometry=None):
+        dist = distance_table(player_id, geometry)
+        best_jump, best_jump_delta = None, 0
+        best_step, best_step_delta = None, 0
+        for m in moves:
+            delta = dist[m[0]] - dist[m[1]]
+            if is_jump(m):
+                if delta > best_jump_delta:
+                    best_jump, best_jump_delta = m, delta
+            elif delta > best_step_delta:
+                best_step, best_step_delta = m, delta
+        if best_jump is not None:
+            return best_jump
+        if best_step is not None:
+            return best_step
+        return random.choice(moves)
+
+
+POLICIES = {
+    UniformRandomPolicy.name: UniformRandomPolicy,
+    EpsilonGreedyPolicy.name: EpsilonGreedyPolicy,
+    SoftmaxPolicy.name: SoftmaxPolicy,
+    JumpFirstPolicy.name: JumpFirstPolicy,
+}
+
+
+def make_policy(spec):
+    """spec 可以是策略实例，或 POLICIES 中的名字"""
+    if isinstance(spec, RolloutPolicy):
+        return spec
+    return POLICIES[spec]()
@@ -0,0 +1,115 @@
+# ai/symmetry.py
+"""
+座位对称：四个玩家的布局互为镜像，任意 (局面, 玩家) 都可以通过翻转棋盘并重新编号棋子，
+变换到玩家 1（左上 -> 右下）的视角，走法也可以逐一映射回去。
+
+  - 玩家 2（右上 -> 左下）：左右翻转，棋子编号 1<->2、3<->4；
+  - 玩家 3（左下 -> 右上）：上下翻转，棋子编号 1<->3、2<->4；
+  - 玩家 4（右下 -> 左上）：旋转 180 度，棋子编号 1<->4、2<->3。
+方形棋盘上玩家 1 的视角还关于主对角线对称（转置，棋子编号 2<->3），canonicalize 的 diagonal=True
+在转置前后取字节串较小的一个，同一局面最多 8 种写法归为一种。
+
+单步与跳跃的方向集合在这些变换下不变，所以合法走法、距离评估、终局判断都与视角无关：
+缓存与各种表按规范局面存放，同一条目可以被四个座位共用。
+注意走法的生成顺序会随变换改变，依赖生成顺序打破平局的结果（如走法列表本身、Minimax 的首个最大值）
+不能直接按规范局面缓存。
+"""
+from functools import lru_cache
+import numpy as np
+from .geometry import START_CORNERS, PLAYERS
+
+CORNER_PLAYERS = {corner: p for p, corner in START_CORNERS.items()}
+# 玩家 1 视角下关于主对角线的转置：2、3 号棋子互换（按 棋子编号 + 1 索引）
+DIAGONAL_RELABEL = np.array([-1, 0, 1, 3, 2, 4], dtype=np.int8)
+
+
+class Symmetry:
+    """先按需翻转行、列，再按需转置；同时把棋子编号换成变换后所在角对应的玩家"""
+    def __init__(self, shape, flip_rows=False, flip_cols=False, transpose=False):
+        self.shape = shape
+        self.flip_rows = flip_rows
+        self.flip_cols = flip_cols
+        self.transpose = transpose
+        self.players = {}
+        for p, (bottom, right) in START_CORNERS.items():
+            corner = (bottom != flip_rows, right != flip_cols)
+            if transpose:
+                corner = corner[::-1]
+            self.players[p] = CORNER_PLAYERS[corner]
+        self.inverse_players = {q: p for p, q in self.players.items()}
+        # 按 棋子编号 + 1 索引的换号表（-1 为无效格，0 为空格）
+        self.relabel = np.array([-1, 0] + [self.players[p] for p in PLAYERS], dtype=np.int8)
+
+    def apply_board(self, board):
+        b = board
+        if self.flip_rows:
+            b = b[::-1]
+        if self.flip_cols:
+            b = b[:, ::-1]
+        if self.transpose:
+            b = b.T
+        return self.relabel[b + 1]
+
+    def apply_pos(self, pos):
+        r, c = int(pos[0]), int(pos[1])
+        if self.flip_rows:
+            r = self.shape[0] - 1 - r
+        if self.flip_cols:
+            c = self.shape[1] - 1 - c
+        return (c, r) if self.transpose else (r, c)
+
+    def invert_pos(self, pos):
+        r, c = int(pos[0]), int(pos[1])
+        if self.transpose:
+            r, c = c, r
+        if self.flip_rows:
+            r = self.shape[0] - 1 - r
+        if self.flip_cols:
+            c = self.shape[1] - 1 - c
+        return (r, c)
+
+    def apply_move(self, move):
+        return None if move is None else (self.apply_pos(move[0]), self.apply_pos(move[1]))
+
+    def invert_move(self, move):
+        return None if move is None else (self.invert_pos(move[0]), self.invert_pos(move[1]))
+
+    def apply_player(self, player_id):
+        return self.players[player_id]
+
+    def invert_player(self, player_id):
+        return self.inverse_players[player_id]
+
+    def __repr__(self):
+        return (f"Symmetry(flip_rows={self.flip_rows}, flip_cols={self.flip_cols}, "
+                f"transpose={self.transpose})")
+
+
+@lru_cache(maxsize=None)
+def seat_symmetry(player_id, shape, transpose=False):
+    """把该玩家变换为玩家 1 的对称变换（transpose 为 True 时再转置；变换对象按参数共享）"""
+    bottom, right = START_CORNERS[player_id]
+    return Symmetry(shape, flip_rows=bottom, flip_cols=right, transpose=transpose)
+
+
+def canonicalize(board, player_id, diagonal=False):
+    """
+    返回 (规范局面, 变换)：规范局面中走子方为玩家 1，棋盘为 int8。
+    diagonal 为 True 且棋盘为方形时，再在转置与否之间取字节串较小者。
+    """
+    symmetry = seat_symmetry(player_id, board.shape)
+    canonical = symmetry.apply_board(board)
+    if diagonal and board.shape[0] == board.shape[1]:
+        # 直接由规范局面转置并交换 2、3 号棋子得到，不必从原局面再翻转一次
+        other = DIAGONAL_RELABEL[canonical.T + 1]
+        if other.tobytes() < canonical.tobytes():
+            return other, seat_symmetry(player_id, board.shape, True)
+    return canonical, symmetry
+
+
+def is_symmetric(geometry):
+    """几何的有效格掩码在左右、上下翻转（方形时还有转置）下是否不变；不变时规范化才保持评估值"""
+    mask = geometry.mask
+    if not (np.array_equal(mask, mask[::-1]) and np.array_equal(mask, mask[:, ::-1])):
+        return False
+    return mask.shape[0] != mask.shape[1] or np.array_equal(mask, mask.T)
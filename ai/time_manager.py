@@ -0,0 +1,109 @@
+# ai/time_manager.py
+"""
+对局时钟管理：AI 在每步开始时向 TimeManager 申请本步的时间（MoveClock），结束后交回实际用时。
+
+  - 本步的基本时间 = 剩余时钟 / 预计剩余步数。预计剩余步数按己方棋子到目标区还差的距离估计
+    （距离和减去目标区填满时的最小距离和，平均每步缩短 progress_per_move），
+    知道对局的步数上限（max_moves）时不超过上限内己方还能走的步数；
+  - 本步的上限 = min(基本时间 * extension, 剩余时钟 * max_share)，根节点统计不稳定时可以延长到上限；
+  - 只有一个合法走法时不搜索；领先优势在剩余时间内已不可能被追上时（由 AI 判断）提前结束。
+时钟按局计算：每局开始时调用 reset（各 AI 的 new_game 会调用），否则上一局用掉的时间会一直扣下去。
+"""
+import math
+import time
+from .geometry import DEFAULT_GEOMETRY, PLAYERS
+
+
+class MoveClock:
+    """一步的时间预算：soft 为基本时间，hard 为允许延长到的上限（秒）"""
+    def __init__(self, soft, hard):
+        self.soft = soft
+        self.hard = hard
+        self.start = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def past_soft(self):
+        return self.elapsed() >= self.soft
+
+    def past_hard(self):
+        return self.elapsed() >= self.hard
+
+    def remaining(self, limit=None):
+        return max(0.0, (self.hard if limit is None else limit) - self.elapsed())
+
+
+class TimeManager:
+    def __init__(self, total_time, geometry=None, min_time=0.01, max_share=0.2, extension=2.0,
+                 progress_per_move=2.0, min_moves=5, max_moves=None):
+        """
+        :param total_time: 整局可用的思考时间（秒）
+        :param max_moves: 对局的步数上限（四个玩家合计，从玩家 1 开始），None 表示不限
+        :param min_time: 每步至少给的时间
+        :param max_share: 单步最多占用剩余时钟的比例
+        :param extension: 统计不稳定时基本时间最多延长的倍数
+        :param progress_per_move: 估计剩余步数时，平均每步缩短的距离
+        :param min_moves: 预计剩余步数的下限（留出余量）
+        """
+        self.total_time = total_time
+        self.remaining = total_time
+        self.geometry = geometry or DEFAULT_GEOMETRY
+        self.min_time = min_time
+        self.max_share = max_share
+        self.extension = extension
+        self.progress_per_move = progress_per_move
+        self.min_moves = min_moves
+        self.max_moves = max_moves
+        self.moves_played = 0
+        # 各玩家目标区填满时的最小距离和
+        self._best_sums = {}
+
+    def best_distance_sum(self, player_id):
+        if player_id not in self._best_sums:
+            dist = self.geometry.distance_tables[player_id]
+            self._best_sums[player_id] = int(dist[self.geometry.target_masks[player_id]].sum())
+        return self._best_sums[player_id]
+
+    def expected_moves(self, board, player_id):
+        """预计己方还要走的步数"""
+        remaining = self.geometry.distance_sum(board, player_id) - self.best_distance_sum(player_id)
+        expected = max(self.min_moves, math.ceil(remaining / self.progress_per_move))
+        if self.max_moves is not None:
+            expected = max(1, min(expected, self.moves_left(player_id)))
+        return expected
+
+    def moves_left(self, player_id):
+        """步数上限内己方还能走的步数（本局已走 moves_played 步）"""
+        offset = player_id - 1
+        total = (self.max_moves - offset + len(PLAYERS) - 1) // len(PLAYERS) if self.max_moves > offset else 0
+        return total - self.moves_played
+
+    def start(self, board, player_id):
+        """开始一步，返回本步的 MoveClock"""
+        soft = max(self.min_time, self.remaining / self.expected_moves(board, player_id))
+        hard = max(soft, min(soft * self.extension, self.remaining * self.max_share))
+        return MoveClock(soft, hard)
+
+    def finish(self, clock):
+        """结束一步，从剩余时钟中扣除实际用时，返回用时"""
+        used = clock.elapsed()
+        self.remaining = max(0.0, self.remaining - used)
+        self.moves_played += 1
+        return used
+
+    def reset(self, total_time=None, max_moves=None):
+        """开始新的一局：时钟恢复为 total_time（默认沿用原值），max_moves 给出时更新步数上限"""
+        self.total_time = self.total_time if total_time is None else total_time
+        self.max_moves = self.max_moves if max_moves is None else max_moves
+        self.remaining = self.total_time
+        self.moves_played = 0
+
+
+def resolve_time_manager(time_manager, game_time, geometry=None):
+    """AI 构造参数的约定：直接传入 TimeManager，或给出整局时间 game_time（秒），都没有时返回 None"""
+    if time_manager is not None:
+        return time_manager
+    if game_time is not None:
+        return TimeManager(game_time, geometry)
+    return None
@@ -1,62 +1,91 @@
-import numpy as np
 from colorama import Fore, Style
 
+from ai.geometry import DEFAULT_GEOMETRY, PLAYERS
+from ai.move_utils import get_valid_moves, get_jump_moves
+from ai.movegen import MoveList
+
 class Board:
-    def __init__(self):
-        # 初始化 12x12 棋盘，全为 0 表示空位
-        self.board = np.zeros((12, 12), dtype=int)
+    def __init__(self, geometry=None):
+        # 棋盘几何（尺寸、起始区/目标区、走子表），默认 12x12、3x3 角区
+        self.geometry = geometry or DEFAULT_GEOMETRY
+        # 初始化棋盘，0 表示空位，-1 表示不属于棋盘的格子
+        self.board = self.geometry.empty_board()
         self.init_pieces()
+        # 增量走法表，第一次检查合法性时创建，之后随 move_piece 更新
+        self._move_list = None
 
     def init_pieces(self):
         """
-        四人中国跳棋起始布局：  
+        四人中国跳棋起始布局（以默认 12x12 棋盘为例）：  
           - 玩家1起始区域：左上角（board[0:3, 0:3]），目标区域：右下角  
           - 玩家2起始区域：右上角（board[0:3, 9:12]），目标区域：左下角  
           - 玩家3起始区域：左下角（board[9:12, 0:3]），目标区域：右上角  
           - 玩家4起始区域：右下角（board[9:12, 9:12]），目标区域：左上角
+        其它尺寸按 geometry.camp_size 放在四个角上。
+        """
+        for p in PLAYERS:
+            self.board[self.geometry.camp_masks[p]] = p
+
+    def move_piece(self, from_pos, to_pos, validate=False, player_id=None):
+        """
+        移动棋子，如果目标位置为空则移动成功。
+        validate 为 True 时只接受合法的单步或跳跃走法，以及 free_up_target_entry 在目标区内的挪动
+        （见 is_free_up_move），否则不走并返回 False；player_id 不为 None 时还要求是该玩家的棋子。
         """
-        # 玩家1的棋子（编号1）放在左上角
-        self.board[0:3, 0:3] = 1
-        # 玩家2的棋子（编号2）放在右上角
-        self.board[0:3, 9:12] = 2
-        # 玩家3的棋子（编号3）放在左下角
-        self.board[9:12, 0:3] = 3
-        # 玩家4的棋子（编号4）放在右下角
-        self.board[9:12, 9:12] = 4
-
-    def move_piece(self, from_pos, to_pos):
-        """移动棋子，如果目标位置为空则移动成功"""
-        if self.board[to_pos] == 0:
-            self.board[to_pos] = self.board[from_pos]
-            self.board[from_pos] = 0
+        if validate and not (self.is_legal_move(from_pos, to_pos, player_id)
+                             or self.is_free_up_move(from_pos, to_pos, player_id)):
+            return False
+        if self.board[to_pos] == 0 and self.board[from_pos] > 0:
+            if self._move_list is not None:
+                self._move_list.apply((from_pos, to_pos))
+            else:
+                self.board[to_pos] = self.board[from_pos]
+                self.board[from_pos] = 0
             return True
         return False
 
+    @property
+    def move_list(self):
+        """与本棋盘共用数组的增量走法表（只能通过 move_piece 修改棋盘，否则走法表会过期）"""
+        if self._move_list is None:
+            # 棋盘只前进不撤销，不记录撤销信息
+            self._move_list = MoveList(self.board, self.geometry, copy=False, record=False)
+        return self._move_list
+
+    def is_legal_move(self, from_pos, to_pos, player_id=None):
+        """O(1) 查表判断走法是否合法（player_id 不为 None 时还要求是该玩家的棋子）"""
+        return self.move_list.is_legal((from_pos, to_pos), player_id)
+
+    def is_free_up_move(self, from_pos, to_pos, player_id=None):
+        """
+        目标区内向相邻（含斜向）空格的挪动：free_up_target_entry 为最后一颗棋子腾出入口时使用，
+        斜向挪动不是单步走法，但在目标区内允许
+        """
+        from_pos, to_pos = (tuple(int(v) for v in pos) for pos in (from_pos, to_pos))
+        if not (self.geometry.is_cell(from_pos) and self.geometry.is_cell(to_pos)):
+            return False
+        owner = int(self.board[from_pos])
+        if owner <= 0 or (player_id is not None and owner != player_id) or self.board[to_pos] != 0:
+            return False
+        target = self.geometry.target_masks[owner]
+        return (bool(target[from_pos] and target[to_pos])
+                and max(abs(from_pos[0] - to_pos[0]), abs(from_pos[1] - to_pos[1])) == 1)
+
+    def legal_moves(self, player_id):
+        """该玩家的全部合法走法（顺序同 get_all_moves）"""
+        return self.move_list.moves(player_id)
+
     def get_valid_moves(self, pos):
         """获取指定位置的所有基本（上下左右）合法移动"""
-        x, y = pos
-        moves = []
-        directions = [(-1,0), (1,0), (0,-1), (0,1)]
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < 12 and 0 <= ny < 12 and self.board[nx, ny] == 0:
-                moves.append((nx, ny))
-        return moves
+        return get_valid_moves(pos, self.board, self.geometry)
 
     def get_jump_moves(self, pos):
         """获取指定位置的所有跳跃移动（检查8个方向）"""
-        x, y = pos
-        jumps = []
-        directions = [(-1, -1), (-1, 0), (-1, 1),
-                      (0, -1),           (0, 1),
-                      (1, -1),  (1, 0),  (1, 1)]
-        for dx, dy in directions:
-            midx, midy = x + dx, y + dy
-            landingx, landingy = x + 2*dx, y + 2*dy
-            if (0 <= midx < 12 and 0 <= midy < 12 and self.board[midx, midy] != 0 and
-                0 <= landingx < 12 and 0 <= landingy < 12 and self.board[landingx, landingy] == 0):
-                jumps.append((landingx, landingy))
-        return jumps
+        return get_jump_moves(pos, self.board, self.geometry)
+
+    def scores(self):
+        """各玩家目标区域内的棋子数"""
+        return self.geometry.scores(self.board)
 
     def is_game_over(self):
         """
@@ -64,19 +93,12 @@ class Board:
         当某一玩家的目标区域（按 main.py 分数统计区域）被填满时（例如9个棋子），返回 True  
         注意：实际游戏中胜利条件可更复杂。
         """
-        if np.count_nonzero(self.board[9:12, 9:12] == 1) == 9:
-            return True
-        if np.count_nonzero(self.board[9:12, 0:3] == 2) == 9:
-            return True
-        if np.count_nonzero(self.board[0:3, 9:12] == 3) == 9:
-            return True
-        if np.count_nonzero(self.board[0:3, 0:3] == 4) == 9:
-            return True
-        return False
+        return any(self.geometry.is_finished(self.board, p) for p in PLAYERS)
 
     def render(self):
         """彩色渲染棋盘至终端"""
         symbols = {
+            -1: ' ',
             0: Fore.WHITE + '.' + Style.RESET_ALL,
             1: Fore.RED + '●' + Style.RESET_ALL,
             2: Fore.BLUE + '●' + Style.RESET_ALL,
@@ -87,3 +109,65 @@ class Board:
         for row in self.board:
             print(' '.join([symbols[cell] for cell in row]))
         print("\n" + "=" * 33 + "\n")
+
+
+class PositionHistory:
+    """
+    对局历史：按 Zobrist 哈希记录每个出现过的局面（含轮到谁走）及出现次数，
+    用于检测重复局面与循环；AI 也可以查询某步走法是否会回到已出现过的局面。
+    另外单独记录每个玩家自己棋子分布的出现次数，用于发现「某玩家来回挪动棋子」的循环。
+    """
+    def __init__(self, geometry=None):
+        self.geometry = geometry or DEFAULT_GEOMETRY
+        self.hashes = []
+        self.counts = {}
+        self.last_seen = {}
+        self.previous_index = None
+        self.player_counts = {p: {} for p in PLAYERS}
+        self.player_latest = {p: None for p in PLAYERS}
+
+    def push(self, board, player_to_move, moved_player=None):
+        """记录当前局面（moved_player 为刚走完的玩家），返回其哈希"""
+        h = self.geometry.position_hash(board, player_to_move)
+        self.previous_index = self.last_seen.get(h)
+        self.last_seen[h] = len(self.hashes)
+        self.hashes.append(h)
+        self.counts[h] = self.counts.get(h, 0) + 1
+        if moved_player is not None:
+            own = self.geometry.pieces_hash(board, moved_player)
+            counts = self.player_counts[moved_player]
+            counts[own] = counts.get(own, 0) + 1
+            self.player_latest[moved_player] = own
+        return h
+
+    def count(self, position_hash):
+        return self.counts.get(position_hash, 0)
+
+    def repetitions(self):
+        """最新局面已出现的次数（1 表示首次出现）"""
+        return self.counts[self.hashes[-1]] if self.hashes else 0
+
+    def player_repetitions(self, player_id):
+        """该玩家当前的棋子分布已出现的次数"""
+        own = self.player_latest[player_id]
+        return self.player_counts[player_id].get(own, 0) if own is not None else 0
+
+    def all_players_cycling(self, limit):
+        """所有玩家当前的棋子分布都已重复出现 limit 次，即没有任何玩家还在推进"""
+        return all(self.player_repetitions(p) >= limit for p in PLAYERS)
+
+    def cycle_length(self):
+        """最新局面距上一次出现相隔的步数，没有重复时返回 None"""
+        if not self.hashes or self.previous_index is None:
+            return None
+        return len(self.hashes) - 1 - self.previous_index
+
+    def would_repeat(self, board, move, player_id, next_player=None):
+        """player_id 走 move 后（轮到 next_player）的局面此前出现过的次数"""
+        if next_player is None:
+            next_player = (player_id % len(PLAYERS)) + 1
+        h = self.geometry.hash_after_move(self.geometry.position_hash(board, player_id), move, player_id, next_player)
+        return self.count(h)
+
+    def __len__(self):
+        return len(self.hashes)
@@ -0,0 +1,509 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+命令行入口（所有 AI 通过 ai/registry.py 按名字创建，只导入用到的 AI 模块）：
+
+  python cli.py list                                  列出可用 AI 及其参数
+  python cli.py play Greedy AStar MCTS:time_limit=0.5 Minimax --max-moves 120
+                                                      无界面下一局，打印结果与各玩家决策耗时
+  python cli.py simulate --rounds 10 --minutes 1 --parallel
+                                                      批量模拟并打印结果表
+  python cli.py simulate --rounds 10 --parallel --profile prof --no-memory
+                                                      同时采样分析，按 AI 输出火焰图用的折叠栈
+  python cli.py simulate Minimax AStar:seed=1 MCTS BFS:seed=1 --parallel --decision-cache cache/decisions.db
+                                                      确定性 AI 的走法存入磁盘缓存，重复模拟时跳过计算
+  python cli.py match MCTS:time_limit=0.2 Greedy --elo1 50
+                                                      两个 AI 对抗，SPRT 得出结论即停止
+  python cli.py tune MCTS --opponent Greedy --configs 16 --eta 2
+                                                      逐次减半搜索 AI 参数
+  python cli.py bench-minimax --depth 3 --workers 1 2 4
+                                                      比较 Minimax 串行与根分裂并行搜索的耗时
+  python cli.py bench-cache MCTS:time_limit=0.2 Minimax:depth=3,cache_values=true
+                                                      比较局面缓存开关时的速度与命中率，命中率过低时报告不通过
+  python cli.py analyze positions.npy --agent Minimax:depth=3 --player 1 --workers 4 --out moves.npz
+                                                      批量求一组局面 (N, 行, 列) 的走法与评估值
+  python cli.py serve --port 8765 --workers 4          启动本机 AI 走子服务（见 agent_service.py）
+  python cli.py bench-service --clients 8 --agent Greedy
+                                                      对走子服务做并发压测，报告吞吐量与延迟
+  python cli.py coordinate --minutes 1 2 --rounds 100 --host 0.0.0.0
+                                                      分布式模拟的协调进程，等待工作进程连接（见 distributed.py）
+  python cli.py worker --host 192.168.1.10 --processes 8
+                                                      分布式模拟的工作进程
+  python cli.py gui                                   启动图形界面
+
+AI 描述写作 名字[:参数=值,参数=值]，名字为注册名或界面显示名。
+"""
+import argparse
+import sys
+
+
+def parse_lineup(descriptions):
+    from ai.registry import parse_agent
+    if len(descriptions) != 4:
+        raise SystemExit("需要为 4 个玩家各指定一个 AI")
+    return {p: parse_agent(text) for p, text in zip((1, 2, 3, 4), descriptions)}
+
+
+def make_decision_cache(args):
+    if not args.decision_cache:
+        return None
+    from ai.decision_cache import DecisionCache
+    return DecisionCache(args.decision_cache, args.decision_cache_size)
+
+
+def make_geometry(args):
+    if args.board_size is None and args.camp_size is None:
+        return None
+    from ai.geometry import get_geometry
+    return get_geometry(args.board_size or 12, None, args.camp_size or 3)
+
+
+def cmd_list(args):
+    from ai.registry import AGENTS
+    for spec in AGENTS.values():
+        params = ", ".join(f"{k}={v}" for k, v in spec.params.items()) or "-"
+        label = f" ({spec.label})" if spec.label != spec.name else ""
+        print(f"{spec.name:<12}{label}")
+        print(f"    实现: ai{spec.module}.{spec.class_name}    参数: {params}")
+
+
+def cmd_play(args):
+    from simulate_stats import simulate_lineup_game, lineup_names, describe_result
+    lineup = parse_lineup(args.agents)
+    result = simulate_lineup_game(args.max_moves, lineup, make_geometry(args),
+                                  args.repetition_limit, args.adjudicate)
+    names = lineup_names(lineup)
+    print(describe_result(result, names))
+    for p in (1, 2, 3, 4):
+        t = result['stats'].seat(p)['time'].summary()
+        print(f"  玩家{p} {names[p]:<12} 决策 {t['count']:4d} 次, 平均 {t['mean'] * 1000:8.1f} ms, "
+              f"p95 {t['p95'] * 1000:8.1f} ms")
+    for p, ponder in result.get('ponder', {}).items():
+        print(f"  玩家{p} 后台思考: {ponder['decisions']} 次决策中复用 {ponder['exact'] + ponder['warm']} 次"
+              f"（整树 {ponder['exact']}，热启动 {ponder['warm']}），平均每次复用 {ponder['visits_per_decision']:.1f} 次访问，"
+              f"后台迭代共 {ponder['iterations']} 次")
+    from ai.move_utils import shared_cache_stats
+    cache = shared_cache_stats()
+    if cache is not None:
+        print(f"  局面缓存: 命中 {cache['hits']} / 未命中 {cache['misses']} (命中率 {cache['hit_rate'] * 100:.1f}%), "
+              f"{cache['entries']}/{cache['max_entries']} 条, 淘汰 {cache['evictions']}, "
+              f"约 {cache['memory_bytes'] / (1024 * 1024):.1f} MB")
+
+
+def cmd_simulate(args):
+    lineup = parse_lineup(args.agents) if args.agents else None
+    geometry = make_geometry(args)
+    profile_interval = args.profile_interval / 1000 if args.profile else None
+    decision_cache = make_decision_cache(args)
+    if args.parallel:
+        from simulate_paralell import simulate_battles
+        from simulate_stats import print_results_table
+        results = simulate_battles(args.minutes, args.rounds, geometry, args.repetition_limit,
+                                   args.adjudicate, lineup=lineup, workers=args.workers,
+                                   profile_interval=profile_interval, track_memory=args.track_memory,
+                                   decision_cache=decision_cache)
+    else:
+        from simulate_stats import simulate_battles, print_results_table
+        results = simulate_battles(args.minutes, args.rounds, geometry, args.repetition_limit,
+                                   args.adjudicate, lineup=lineup,
+                                   profile_interval=profile_interval, track_memory=args.track_memory,
+                                   decision_cache=decision_cache)
+    print_results_table(args.minutes, results)
+    if args.profile:
+        paths = results['profiler'].write(args.profile)
+        print("折叠栈文件（可用 flamegraph.pl / speedscope 查看）：")
+        for path in paths:
+            print(f"  {path}")
+
+
+def cmd_match(args):
+    from ai.registry import parse_agent
+    from match import SPRT, run_match, print_match_result
+    agent_a = parse_agent(args.agent_a)
+    agent_b = parse_agent(args.agent_b)
+    sprt = SPRT(args.elo0, args.elo1, args.alpha, args.beta, args.min_games)
+    result = run_match(agent_a, agent_b, args.max_moves, sprt, args.max_games, args.workers,
+                       make_geometry(args), args.repetition_limit, args.adjudicate, verbose=not args.quiet,
+                       seed=args.seed)
+    print_match_result(agent_a, agent_b, sprt, result)
+
+
+def cmd_tune(args):
+    from ai.registry import get_spec, parse_agent, parse_value
+    from tune import SEARCH_SPACES, successive_halving, print_tuning_result
+    spec = get_spec(args.agent)
+    space = dict(SEARCH_SPACES.get(spec.name, {}))
+    for item in args.param:
+        key, _, values = item.partition('=')
+        if key not in spec.params:
+            raise SystemExit(f"{spec.name} 不支持参数: {key}")
+        space[key] = [parse_value(v, spec.params[key]) for v in values.split(',')]
+    if not space:
+        raise SystemExit(f"{spec.name} 没有默认搜索空间，请用 --param 指定")
+    if args.eta < 2:
+        raise SystemExit("--eta 至少为 2")
+    opponent = parse_agent(args.opponent)
+    best, trials = successive_halving(spec.name, space, opponent, args.configs, args.eta, args.min_games,
+                                      args.max_moves, args.latency_weight, args.workers, args.seed,
+                                      make_geometry(args), args.repetition_limit, args.adjudicate,
+                                      verbose=not args.quiet)
+    print_tuning_result(spec.name, opponent, best, trials, args.latency_weight)
+
+
+def cmd_bench_minimax(args):
+    import time
+    from ai.minimax_ai import MinimaxAI
+    from simulate_stats import sample_positions
+    geometry = make_geometry(args)
+    positions = sample_positions(args.positions, args.max_moves, geometry, args.seed, every=3)
+
+    def run(workers):
+        agents = {p: MinimaxAI(p, args.depth, geometry, workers=workers) for p in (1, 2, 3, 4)}
+        try:
+            if workers:
+                # 预热进程池，不计入进程启动时间
+                for board, player in positions[:1]:
+                    agents[player].choose_move(board)
+            start = time.perf_counter()
+            moves = [agents[player].choose_move(board) for board, player in positions]
+            return moves, time.perf_counter() - start
+        finally:
+            for agent in agents.values():
+                agent.close()
+
+    serial_moves, serial_time = run(0)
+    print(f"Minimax depth={args.depth}，{len(positions)} 个局面")
+    print(f"{'Workers':>8}{'Time(s)':>10}{'ms/move':>10}{'Speedup':>10}{'Same moves':>12}")
+    print(f"{'serial':>8}{serial_time:10.2f}{serial_time / len(positions) * 1000:10.1f}{1.0:10.2f}{'-':>12}")
+    for workers in args.workers:
+        moves, elapsed = run(workers)
+        same = sum(a == b for a, b in zip(moves, serial_moves))
+        print(f"{workers:8d}{elapsed:10.2f}{elapsed / len(positions) * 1000:10.1f}"
+              f"{serial_time / elapsed:10.2f}{f'{same}/{len(positions)}':>12}")
+
+
+def cmd_bench_cache(args):
+    import random
+    import time
+    from ai.registry import parse_agent, create_agent, get_spec
+    from ai.move_utils import PositionCache
+    from simulate_stats import sample_positions, close_agents
+    geometry = make_geometry(args)
+    positions = sample_positions(args.positions, args.max_moves, geometry, args.seed, every=3)
+
+    def run(name, params, cache):
+        # 每个配置用独立的缓存实例，命中统计不受其他配置影响；每个局面前重设随机种子，开关缓存时可比
+        agents = {p: create_agent(name, p, geometry=geometry, **dict(params, cache=cache)) for p in (1, 2, 3, 4)}
+        moves = []
+        iterations = 0
+        try:
+            start = time.perf_counter()
+            for i, (board, player) in enumerate(positions):
+                random.seed(args.seed + i)
+                moves.append(agents[player].choose_move(board))
+                iterations += getattr(agents[player], 'last_iterations', 0)
+            elapsed = time.perf_counter() - start
+        finally:
+            close_agents(agents)
+        return moves, elapsed, iterations
+
+    failed = False
+    width = max(36, max(len(d) for d in args.agents) + 2)
+    print(f"{len(positions)} 个局面，命中率下限 {args.min_hit_rate * 100:.0f}%")
+    print(f"{'Agent':<{width}}{'Cache':>6}{'ms/move':>10}{'Iter/s':>10}{'Hit rate':>10}{'Entries':>9}"
+          f"{'Evict':>8}{'MB':>7}{'Same moves':>12}")
+    for description in args.agents:
+        name, params = parse_agent(description)
+        if 'cache' not in get_spec(name).params:
+            print(f"{description:<{width}}  不支持局面缓存")
+            continue
+        base_moves, base_time, base_iterations = run(name, params, False)
+        cache = PositionCache(args.cache_size)
+        moves, elapsed, iterations = run(name, params, cache)
+        stats = cache.stats()
+        same = sum(a == b for a, b in zip(moves, base_moves))
+        for label, t, its in ((description, base_time, base_iterations), ('', elapsed, iterations)):
+            rate = f"{its / t:10.0f}" if its else f"{'-':>10}"
+            line = f"{label:<{width}}{'on' if not label else 'off':>6}{t / len(positions) * 1000:10.1f}{rate}"
+            if label:
+                print(line + f"{'-':>10}{'-':>9}{'-':>8}{'-':>7}{'-':>12}")
+            else:
+                print(line + f"{stats['hit_rate'] * 100:9.1f}%{stats['entries']:9d}{stats['evictions']:8d}"
+                      f"{stats['memory_bytes'] / (1024 * 1024):7.1f}{f'{same}/{len(positions)}':>12}")
+        # 限时搜索（MCTS）按迭代速度比较，其余按每步耗时比较
+        speedup = (iterations / elapsed) / (base_iterations / base_time) if base_iterations else base_time / elapsed
+        if stats['hit_rate'] < args.min_hit_rate:
+            failed = True
+            print(f"{'':<{width}}  不通过：命中率 {stats['hit_rate'] * 100:.1f}% 低于下限，缓存只增加开销，不宜开启")
+        elif speedup < 1.0:
+            failed = True
+            print(f"{'':<{width}}  不通过：命中率达到下限，但速度只有关闭缓存时的 {speedup:.2f} 倍（查找比重新计算更贵）")
+        else:
+            print(f"{'':<{width}}  通过：速度为关闭缓存时的 {speedup:.2f} 倍")
+    return 1 if failed else 0
+
+
+def cmd_analyze(args):
+    import time
+    import numpy as np
+    from ai.registry import parse_agent, create_agent
+    from ai.geometry import get_geometry
+    from ai.batch import stack_boards, choose_moves, evaluate_positions, NO_MOVE
+    boards = stack_boards(np.load(args.positions))
+    geometry = get_geometry(boards.shape[1], boards.shape[2], args.camp_size or 3)
+    name, params = parse_agent(args.agent)
+    agent = create_agent(name, args.player, geometry=geometry, **params)
+    start = time.perf_counter()
+    moves = choose_moves(agent, boards, args.workers, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    values = evaluate_positions(boards, args.player, geometry)
+    np.savez(args.out, moves=moves, values=values)
+    found = int((moves[:, 0, 0] != NO_MOVE).sum())
+    print(f"{len(boards)} 个局面，{found} 个有走法，耗时 {elapsed:.2f} s "
+          f"({elapsed / max(len(boards), 1) * 1000:.1f} ms/局面)，结果写入 {args.out}")
+
+
+def cmd_serve(args):
+    from agent_service import AgentServer
+    server = AgentServer(args.host, args.port, args.workers, args.batch_size, args.max_queue)
+    print(f"AI 服务监听 {args.host}:{server.port}，{server.service.workers} 个工作进程")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def cmd_bench_service(args):
+    from agent_service import AgentServer, run_load_test, print_load_header, print_load_result
+    server = None
+    port = args.port
+    if port is None:
+        # 未指定端口时在本进程内启动一个服务（随机端口）
+        server = AgentServer('127.0.0.1', 0, args.workers, args.batch_size, args.max_queue)
+        server.start()
+        port = server.port
+    try:
+        print_load_header()
+        for agent in args.agent:
+            for clients in args.clients:
+                result = run_load_test(args.host, port, agent, clients, args.requests, args.pipeline, args.seed)
+                print_load_result(agent, clients, args.pipeline, result)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+def cmd_coordinate(args):
+    import time
+    from distributed import Coordinator, simulate_battles, start_local_workers, DEFAULT_AUTHKEY
+    from simulate_stats import print_results_table
+    lineup = parse_lineup(args.agents) if args.agents else None
+    geometry = make_geometry(args)
+    authkey = args.authkey.encode() if args.authkey else None
+    try:
+        coordinator = Coordinator(args.host, args.port, authkey, args.batch_size, args.heartbeat_timeout).start()
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(f"协调进程监听 {coordinator.address[0]}:{coordinator.address[1]}")
+    if authkey is None and coordinator.authkey != DEFAULT_AUTHKEY:
+        print(f"认证密钥: {coordinator.authkey.decode()}（工作进程用 --authkey 指定）")
+    local = (start_local_workers(args.local_workers, coordinator.address[1], coordinator.authkey)
+             if args.local_workers else [])
+    try:
+        for minutes in args.minutes:
+            start = time.perf_counter()
+            results = simulate_battles(coordinator, minutes, args.rounds, geometry, args.repetition_limit,
+                                       args.adjudicate, lineup=lineup, track_memory=args.track_memory,
+                                       decision_cache=make_decision_cache(args))
+            elapsed = time.perf_counter() - start
+            print_results_table(minutes, results)
+            print(f"{results['rounds']} 局用时 {elapsed:.1f} s（{results['rounds'] / elapsed:.2f} 局/秒），"
+                  f"因工作进程断开重下 {results['requeued']} 局")
+    finally:
+        coordinator.close()
+        for process in local:
+            process.join()
+
+
+def cmd_worker(args):
+    from distributed import run_worker
+    try:
+        completed = run_worker(args.host, args.port, args.authkey.encode() if args.authkey else None,
+                               args.processes, retry=args.retry)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(f"工作进程退出，共下完 {completed} 局")
+
+
+def cmd_gui(args):
+    import main
+    main.main()
+
+
+def add_game_options(parser):
+    parser.add_argument('--board-size', type=int, default=None, help="棋盘边长（默认 12）")
+    parser.add_argument('--camp-size', type=int, default=None, help="起始区边长（默认 3）")
+    parser.add_argument('--repetition-limit', type=int, default=0,
+                        help="同一局面出现该次数即判定循环并提前结束（默认 0，不检测）")
+    parser.add_argument('--adjudicate', action='store_true', help="胜负已成定局时提前结束（默认下满步数）")
+
+
+def add_decision_cache_options(parser):
+    parser.add_argument('--decision-cache', metavar='PATH', default=None,
+                        help="确定性 AI（Minimax、指定 seed 的 AStar / BFS）的走法存入该 SQLite 文件，重复模拟时直接取出")
+    parser.add_argument('--decision-cache-size', type=int, default=200000, help="决策缓存的条目数上限")
+
+
+def add_service_options(parser):
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help="服务端口（压测时默认在本进程内启动服务）")
+    parser.add_argument('--workers', type=int, default=None, help="工作进程数（默认 CPU 核数）")
+    parser.add_argument('--batch-size', type=int, default=8, help="每批提交给工作进程的最多请求数")
+    parser.add_argument('--max-queue', type=int, default=256, help="等待队列长度上限，满时阻塞读取（背压）")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="中国跳棋 AI 对战命令行")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('list', help="列出可用 AI")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser('play', help="无界面下一局")
+    p.add_argument('agents', nargs=4, help="4 个玩家的 AI 描述")
+    p.add_argument('--max-moves', type=int, default=60)
+    add_game_options(p)
+    p.set_defaults(func=cmd_play)
+
+    p = sub.add_parser('simulate', help="批量模拟并统计")
+    p.add_argument('agents', nargs='*', help="4 个玩家的 AI 描述（默认 Greedy AStar MCTS Minimax）")
+    p.add_argument('--minutes', type=int, default=1, help="游戏时长（分钟，1 分钟 = 60 步）")
+    p.add_argument('--rounds', type=int, default=10)
+    p.add_argument('--parallel', action='store_true', help="多进程并行模拟")
+    p.add_argument('--workers', type=int, default=None, help="并行进程数（默认 CPU 核数）")
+    p.add_argument('--profile', metavar='DIR', default=None,
+                   help="开启采样分析，把每个 AI 的折叠栈写入 DIR/<AI>.folded")
+    p.add_argument('--profile-interval', type=float, default=5.0, help="采样间隔（毫秒）")
+    p.add_argument('--no-memory', dest='track_memory', action='store_false',
+                   help="不用 tracemalloc 统计内存峰值（它会拖慢决策、扭曲耗时）")
+    add_game_options(p)
+    add_decision_cache_options(p)
+    p.set_defaults(func=cmd_simulate)
+
+    p = sub.add_parser('match', help="两个 AI 对抗，用 SPRT 提前停止")
+    p.add_argument('agent_a', help="被检验的 AI 描述")
+    p.add_argument('agent_b', help="作为基准的 AI 描述")
+    p.add_argument('--elo0', type=float, default=0.0, help="H0 下 A 相对 B 的 Elo 差")
+    p.add_argument('--elo1', type=float, default=30.0, help="H1 下 A 相对 B 的 Elo 差")
+    p.add_argument('--alpha', type=float, default=0.05)
+    p.add_argument('--beta', type=float, default=0.05)
+    p.add_argument('--min-games', type=int, default=20, help="得出结论前至少进行的局数")
+    p.add_argument('--max-games', type=int, default=1000)
+    p.add_argument('--max-moves', type=int, default=60)
+    p.add_argument('--workers', type=int, default=None, help="并行进程数（默认 CPU 核数）")
+    p.add_argument('--quiet', action='store_true', help="不逐局打印")
+    p.add_argument('--seed', type=int, default=None, help="随机种子（固定后对局可复现）")
+    add_game_options(p)
+    p.set_defaults(func=cmd_match)
+
+    p = sub.add_parser('tune', help="用逐次减半搜索 AI 参数")
+    p.add_argument('agent', help="要调参的 AI 注册名")
+    p.add_argument('--opponent', default='Greedy', help="对手的 AI 描述")
+    p.add_argument('--param', action='append', default=[],
+                   help="覆盖搜索空间中的一个参数，如 --param exploration=0.7,1.4,2.8（可重复）")
+    p.add_argument('--configs', type=int, default=16, help="抽取的参数组数")
+    p.add_argument('--eta', type=int, default=2, help="每轮保留前 1/eta")
+    p.add_argument('--min-games', type=int, default=4, help="第一轮每组的局数")
+    p.add_argument('--latency-weight', type=float, default=0.0, help="目标值中每秒平均耗时的扣分")
+    p.add_argument('--max-moves', type=int, default=60)
+    p.add_argument('--workers', type=int, default=None, help="并行进程数（默认 CPU 核数）")
+    p.add_argument('--seed', type=int, default=None)
+    p.add_argument('--quiet', action='store_true', help="不打印每轮结果")
+    add_game_options(p)
+    p.set_defaults(func=cmd_tune)
+
+    p = sub.add_parser('bench-minimax', help="比较 Minimax 串行与并行搜索")
+    p.add_argument('--depth', type=int, default=3)
+    p.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="要测试的进程数")
+    p.add_argument('--positions', type=int, default=20, help="测试局面数")
+    p.add_argument('--max-moves', type=int, default=120, help="收集局面时自对弈的最大步数")
+    p.add_argument('--seed', type=int, default=0)
+    add_game_options(p)
+    p.set_defaults(func=cmd_bench_minimax)
+
+    p = sub.add_parser('bench-cache', help="比较局面缓存开关时的速度与命中率")
+    p.add_argument('agents', nargs='+', help="要测试的 AI 描述（须支持 cache 参数）")
+    p.add_argument('--positions', type=int, default=30, help="测试局面数")
+    p.add_argument('--max-moves', type=int, default=120, help="收集局面时自对弈的最大步数")
+    p.add_argument('--cache-size', type=int, default=20000, help="缓存容量（条目数）")
+    p.add_argument('--min-hit-rate', type=float, default=0.1, help="命中率低于该值时报告不通过（退出码 1）")
+    p.add_argument('--seed', type=int, default=0)
+    add_game_options(p)
+    p.set_defaults(func=cmd_bench_cache)
+
+    p = sub.add_parser('analyze', help="批量求一组局面的走法与评估值")
+    p.add_argument('positions', help="np.save 保存的局面数组 (N, 行, 列)")
+    p.add_argument('--agent', default='Greedy', help="AI 描述")
+    p.add_argument('--player', type=int, default=1, help="走子的玩家")
+    p.add_argument('--camp-size', type=int, default=None, help="起始区边长（默认 3）")
+    p.add_argument('--workers', type=int, default=0, help="并行进程数，0 表示在本进程内计算")
+    p.add_argument('--seed', type=int, default=None, help="随机种子（固定后结果与进程数无关）")
+    p.add_argument('--out', default='analysis.npz', help="输出文件（moves: (N, 2, 2)，values: (N,)）")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser('serve', help="启动本机 AI 走子服务")
+    add_service_options(p)
+    p.set_defaults(func=cmd_serve, port=8765)
+
+    p = sub.add_parser('bench-service', help="对 AI 走子服务做并发压测")
+    p.add_argument('--agent', nargs='+', default=['Greedy'], help="请求使用的 AI 描述")
+    p.add_argument('--clients', type=int, nargs='+', default=[1, 4, 8], help="并发连接数")
+    p.add_argument('--requests', type=int, default=50, help="每个连接的请求数")
+    p.add_argument('--pipeline', type=int, default=1, help="每个连接一次连续发送的请求数")
+    p.add_argument('--seed', type=int, default=0)
+    add_service_options(p)
+    p.set_defaults(func=cmd_bench_service)
+
+    p = sub.add_parser('coordinate', help="分布式模拟：协调进程")
+    p.add_argument('agents', nargs='*', help="4 个玩家的 AI 描述（默认 Greedy AStar MCTS Minimax）")
+    p.add_argument('--minutes', type=int, nargs='+', default=[1], help="依次模拟的游戏时长（分钟）")
+    p.add_argument('--rounds', type=int, default=10, help="每个时长的局数")
+    p.add_argument('--host', default='127.0.0.1', help="监听地址，跨机器时用 0.0.0.0")
+    p.add_argument('--port', type=int, default=8766)
+    p.add_argument('--authkey', default=None,
+                   help="连接认证密钥，工作进程须一致（默认：本机地址用公开的默认密钥，其他地址生成随机密钥）")
+    p.add_argument('--batch-size', type=int, default=4, help="每次发给一个工作进程的最多局数")
+    p.add_argument('--heartbeat-timeout', type=float, default=15.0,
+                   help="超过这么多秒没有消息即认为工作进程已死，重新分配它的对局")
+    p.add_argument('--local-workers', type=int, default=0, help="在本机启动的工作进程数（测试用）")
+    p.add_argument('--no-memory', dest='track_memory', action='store_false',
+                   help="不用 tracemalloc 统计内存峰值")
+    add_game_options(p)
+    add_decision_cache_options(p)
+    p.set_defaults(func=cmd_coordinate)
+
+    p = sub.add_parser('worker', help="分布式模拟：工作进程")
+    p.add_argument('--host', default='127.0.0.1', help="协调进程地址")
+    p.add_argument('--port', type=int, default=8766)
+    p.add_argument('--authkey', default=None, help="协调进程的认证密钥（连接本机以外的地址时必须指定）")
+    p.add_argument('--processes', type=int, default=None, help="本机并行下棋的进程数（默认 CPU 核数）")
+    p.add_argument('--retry', type=float, default=10.0, help="连接不上时重试的秒数")
+    p.set_defaults(func=cmd_worker)
+
+    p = sub.add_parser('gui', help="启动图形界面")
+    p.set_defaults(func=cmd_gui)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, 'repetition_limit', None) == 0:
+        args.repetition_limit = None
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
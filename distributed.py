@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多机分布式模拟：一个协调进程（Coordinator）持有待下的对局，多台机器上的工作进程（run_worker）
+通过 TCP 连接到协调进程，按批领取对局、在本机的进程池中下完，逐局把结果传回。
+
+连接使用 multiprocessing.connection（带 authkey 认证，消息为 pickle），每条消息是一个元组：
+  工作进程 -> 协调进程
+    ('hello', 主机名, 进程数)
+    ('request', n)                  最多再要 n 局
+    ('result', 局号, 结果)           结果即 simulate_lineup_game 的返回值（约 4 KB）
+    ('error', 局号, 异常信息)
+    ('heartbeat',)                  空闲或长时间下棋时每隔 heartbeat_interval 秒发送一次
+  协调进程 -> 工作进程
+    ('jobs', [(局号, 参数元组), ...])  参数元组按 simulate_lineup_game 的位置参数排列
+    ('wait', 秒数)                   暂时没有对局，稍后再要
+    ('done',)                       协调进程关闭，工作进程退出
+
+工作进程始终保持本机进程池中有 2 * 进程数 局在途（领到的对局先在本地排队），所以吞吐量随工作进程
+（及其核数）增加而增加，协调进程只做分发与汇总。连接断开、或超过 heartbeat_timeout 秒没有收到
+任何消息时，认为该工作进程已死，它领走但没有交回结果的对局重新放回队首，由其他工作进程再下一次；
+同一局先后交回两次时只取第一份结果。
+
+注意 pickle 消息可以执行任意代码，知道 authkey 就能在对方机器上执行代码。公开的 DEFAULT_AUTHKEY
+只用于回环地址；监听或连接其他地址时必须使用自己的密钥：协调进程没有指定时生成随机密钥并打印出来，
+工作进程没有指定时拒绝连接。跨机器使用时仍应只在可信网络中监听。
+
+  python cli.py coordinate Greedy AStar MCTS Minimax --minutes 1 2 --rounds 100 --host 0.0.0.0 --port 8766
+      （打印「认证密钥: <密钥>」）
+  python cli.py worker --host 192.168.1.10 --port 8766 --authkey <密钥> --processes 8
+  python cli.py coordinate --rounds 20 --local-workers 2      在本机启动 2 个工作进程测试
+"""
+import os
+import socket
+import secrets
+import ipaddress
+import threading
+import time
+import itertools
+import collections
+import multiprocessing
+import concurrent.futures
+from multiprocessing.connection import Listener, Client
+
+from simulate_stats import (simulate_lineup_game, new_summary, add_result, finish_summary,
+                            DEFAULT_LINEUP, describe_result)
+
+DEFAULT_PORT = 8766
+DEFAULT_AUTHKEY = b'chinese-checkers'
+
+
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def check_authkey(host, authkey):
+    """公开的 DEFAULT_AUTHKEY 只允许用于回环地址"""
+    if authkey == DEFAULT_AUTHKEY and not is_loopback(host):
+        raise ValueError(f"{host} 不是本机回环地址，不能使用公开的默认 authkey，请指定自己的密钥")
+
+
+class Coordinator:
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, authkey=None, batch_size=4,
+                 heartbeat_timeout=15.0):
+        """
+        :param authkey: 连接认证密钥；None 时回环地址用 DEFAULT_AUTHKEY，其他地址生成随机密钥（见 self.authkey）
+        :param batch_size: 每次最多发给一个工作进程的对局数
+        :param heartbeat_timeout: 超过这么多秒收不到工作进程的任何消息即认为它已死
+        """
+        if authkey is None:
+            authkey = DEFAULT_AUTHKEY if is_loopback(host) else secrets.token_hex(16).encode()
+        check_authkey(host, authkey)
+        self.authkey = authkey
+        self.listener = Listener((host, port), authkey=authkey)
+        self.batch_size = batch_size
+        self.heartbeat_timeout = heartbeat_timeout
+        self.lock = threading.Condition()
+        self.jobs = {}              # 局号 -> 参数元组（完成后删除）
+        self.pending = collections.deque()
+        self.assigned = {}          # 工作进程编号 -> 已领走未交回的局号集合
+        self.results = collections.deque()
+        self.workers = {}           # 工作进程编号 -> (主机名, 进程数)
+        self.requeued = 0
+        self.closed = False
+        self._job_ids = itertools.count()
+        self._worker_ids = itertools.count(1)
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.listener.address
+
+    def start(self):
+        """在后台线程中接受连接，每个工作进程一个处理线程"""
+        self._thread = threading.Thread(target=self.accept_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def accept_loop(self):
+        while not self.closed:
+            try:
+                conn = self.listener.accept()
+            except Exception:
+                # 监听关闭（close），或认证失败
+                continue
+            worker_id = next(self._worker_ids)
+            threading.Thread(target=self.handle, args=(worker_id, conn), daemon=True).start()
+
+    def handle(self, worker_id, conn):
+        with self.lock:
+            self.assigned[worker_id] = set()
+        try:
+            while conn.poll(self.heartbeat_timeout):
+                message = conn.recv()
+                kind = message[0]
+                if kind == 'hello':
+                    with self.lock:
+                        self.workers[worker_id] = (message[1], message[2])
+                elif kind == 'request':
+                    conn.send(self.take(worker_id, message[1]))
+                elif kind in ('result', 'error'):
+                    self.complete(worker_id, message[1], message[2] if kind == 'result' else None,
+                                  message[2] if kind == 'error' else None)
+            # 超时：工作进程卡死或网络中断
+        except (EOFError, OSError):
+            pass
+        finally:
+            self.drop(worker_id)
+            conn.close()
+
+    def take(self, worker_id, n):
+        """给工作进程分配最多 n 局，返回要发送的消息"""
+        with self.lock:
+            if self.closed:
+                return ('done',)
+            batch = []
+            while self.pending and len(batch) < min(n, self.batch_size):
+                job_id = self.pending.popleft()
+                if job_id in self.jobs:
+                    batch.append((job_id, self.jobs[job_id]))
+                    self.assigned[worker_id].add(job_id)
+            return ('jobs', batch) if batch else ('wait', 0.5)
+
+    def complete(self, worker_id, job_id, result, error):
+        with self.lock:
+            self.assigned[worker_id].discard(job_id)
+            if job_id not in self.jobs:
+                # 已由其他工作进程完成（重新分配后两边都下完了）
+                return
+            del self.jobs[job_id]
+            self.results.append((job_id, result, error))
+            self.lock.notify_all()
+
+    def drop(self, worker_id):
+        """工作进程断开：把它没有交回的对局放回队首"""
+        with self.lock:
+            lost = [job_id for job_id in self.assigned.pop(worker_id, ()) if job_id in self.jobs]
+            self.pending.extendleft(sorted(lost, reverse=True))
+            self.requeued += len(lost)
+            self.workers.pop(worker_id, None)
+
+    def run(self, jobs):
+        """
+        提交一组对局（simulate_lineup_game 的参数元组），按完成顺序逐个产生 (局号, 结果, 异常信息)，
+        全部完成后返回。局号从 0 开始按提交顺序编号（多次调用时继续递增）。
+        """
+        with self.lock:
+            waiting = set()
+            for args in jobs:
+                job_id = next(self._job_ids)
+                self.jobs[job_id] = args
+                self.pending.append(job_id)
+                waiting.add(job_id)
+        while waiting:
+            with self.lock:
+                while not self.results:
+                    self.lock.wait()
+                job_id, result, error = self.results.popleft()
+            waiting.discard(job_id)
+            yield job_id, result, error
+
+    def close(self):
+        """通知工作进程退出（在它们下次要对局时）并停止监听"""
+        with self.lock:
+            self.closed = True
+        self.listener.close()
+
+
+def run_worker(host='127.0.0.1', port=DEFAULT_PORT, authkey=None, processes=None,
+               heartbeat_interval=2.0, retry=10.0):
+    """
+    连接协调进程并一直下棋，直到协调进程发来 'done' 或连接断开。返回本进程下完的局数。
+    retry 秒内连接不上（协调进程尚未启动）时每隔 0.2 秒重试。
+    authkey 为 None 时只能连接回环地址（使用 DEFAULT_AUTHKEY）。
+    """
+    authkey = DEFAULT_AUTHKEY if authkey is None else authkey
+    check_authkey(host, authkey)
+    processes = processes or os.cpu_count()
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=processes)
+    # 先启动进程池再连接：否则 fork 出的子进程会继承连接的套接字，本进程被杀死后
+    # 连接不会断开，协调进程要等到心跳超时才发现
+    executor.submit(os.getpid).result()
+    deadline = time.time() + retry
+    while True:
+        try:
+            conn = Client((host, port), authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.time() > deadline:
+                executor.shutdown()
+                raise
+            threading.Event().wait(0.2)
+
+    completed = 0
+    in_flight = {}              # future -> 局号
+    queued = collections.deque()
+    finished = False
+    requested = False
+    next_request = 0.0
+    last_sent = time.time()
+    conn.send(('hello', socket.gethostname(), processes))
+    with executor:
+        try:
+            while not (finished and not in_flight and not queued):
+                now = time.time()
+                # 本机保持 processes 局在下、processes 局排队，不够时向协调进程要
+                wanted = 2 * processes - len(in_flight) - len(queued)
+                if not finished and not requested and wanted > 0 and now >= next_request:
+                    conn.send(('request', wanted))
+                    requested = True
+                    last_sent = now
+                if conn.poll(0.05 if in_flight else 0.2):
+                    message = conn.recv()
+                    requested = False
+                    if message[0] == 'jobs':
+                        queued.extend(message[1])
+                    elif message[0] == 'wait':
+                        next_request = time.time() + message[1]
+                    elif message[0] == 'done':
+                        # 协调进程已不需要结果，排队中的对局不再下
+                        finished = True
+                        queued.clear()
+                while queued and len(in_flight) < processes:
+                    job_id, args = queued.popleft()
+                    in_flight[executor.submit(simulate_lineup_game, *args)] = job_id
+                if in_flight:
+                    done, _ = concurrent.futures.wait(in_flight, timeout=0,
+                                                      return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        job_id = in_flight.pop(future)
+                        try:
+                            conn.send(('result', job_id, future.result()))
+                            completed += 1
+                        except Exception as e:
+                            conn.send(('error', job_id, f"{type(e).__name__}: {e}"))
+                        last_sent = time.time()
+                if time.time() - last_sent > heartbeat_interval:
+                    conn.send(('heartbeat',))
+                    last_sent = time.time()
+        except (EOFError, OSError):
+            # 协调进程已关闭
+            for future in in_flight:
+                future.cancel()
+        finally:
+            conn.close()
+    return completed
+
+
+def start_local_workers(count, port, authkey=DEFAULT_AUTHKEY, processes=1):
+    """
+    在本机启动 count 个工作进程（测试用），返回 Process 列表。
+    工作进程自己还要创建进程池，所以不能是 daemon 进程；协调进程关闭或退出后它们会自行结束。
+    """
+    workers = []
+    for _ in range(count):
+        process = multiprocessing.Process(target=run_worker, args=('127.0.0.1', port, authkey, processes))
+        process.start()
+        workers.append(process)
+    return workers
+
+
+def simulate_battles(coordinator, time_limit_minutes, rounds=10, geometry=None, repetition_limit=None,
+                     adjudicate=False, lineup=None, profile_interval=None, track_memory=True, decision_cache=None):
+    """
+    与 simulate_paralell.simulate_battles 相同，但对局交给连接到 coordinator 的工作进程。
+    decision_cache 的路径在各工作进程所在的机器上打开（同一台机器上的工作进程共用一个文件）。
+    返回同样的汇总（见 simulate_stats.finish_summary），另有 'requeued'：因工作进程断开而重下的局数。
+    """
+    max_moves = time_limit_minutes * 60
+    print(f"\n开始分布式模拟：游戏时长 {time_limit_minutes} 分钟（最多走 {max_moves} 步），共 {rounds} 盘。")
+    lineup = lineup or DEFAULT_LINEUP
+    summary = new_summary(lineup)
+    if profile_interval is not None:
+        from profiler import SamplingProfiler
+        summary['profiler'] = SamplingProfiler(profile_interval)
+    requeued = coordinator.requeued
+    args = (max_moves, lineup, geometry, repetition_limit, adjudicate, None, profile_interval, track_memory,
+            decision_cache)
+    for _, result, error in coordinator.run(args for _ in range(rounds)):
+        if error is not None:
+            print(f"模拟过程中发生异常：{error}")
+            continue
+        add_result(summary, result)
+        print(f"局结果: {describe_result(result)}")
+    summary['requeued'] = coordinator.requeued - requeued
+    return finish_summary(summary)
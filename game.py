@@ -2,8 +2,8 @@ import time
 from board import Board
 
 class Game:
-    def __init__(self, player1_ai, player2_ai, player3_ai, player4_ai):
-        self.board = Board()
+    def __init__(self, player1_ai, player2_ai, player3_ai, player4_ai, geometry=None):
+        self.board = Board(geometry)
         self.players = {1: player1_ai, 2: player2_ai, 3: player3_ai, 4: player4_ai}
         self.current_player = 1
         
@@ -19,7 +19,8 @@ class Game:
             if move:
                 from_pos, to_pos = move
                 print(f"移动棋子：{from_pos} -> {to_pos}")
-                self.board.move_piece(from_pos, to_pos)
+                if not self.board.move_piece(from_pos, to_pos, validate=True, player_id=self.current_player):
+                    print("走法不合法，跳过！")
             else:
                 print("没有合法移动！")
             
@@ -2,18 +2,13 @@ import tkinter as tk
 from tkinter import ttk
 import time
 import tracemalloc
-import psutil
 import os
-import numpy as np
 
 from game import Game  # 请确保你的 game.py 已经修改为支持4玩家，并且初始布局采用对角起始布局
-from ai.greedy_ai import GreedyAI
-from ai.astar_ai import AStarAI
-from ai.mcts_ai import MCTSAI
-from ai.minimax_ai import MinimaxAI
+from ai.registry import agent_labels, create_agent
 
 class GameGUI:
-    def __init__(self, root, p1_ai, p2_ai, p3_ai, p4_ai, game_duration):
+    def __init__(self, root, p1_ai, p2_ai, p3_ai, p4_ai, game_duration, geometry=None, clocked=False):
         self.root = root
         self.game_duration = game_duration  # 游戏总时长（秒）
         
@@ -21,7 +16,15 @@ class GameGUI:
         self.agents = {1: p1_ai, 2: p2_ai, 3: p3_ai, 4: p4_ai}
         
         # 创建游戏实例（修改后的 Game 支持 4 玩家）
-        self.game = Game(p1_ai, p2_ai, p3_ai, p4_ai)
+        self.game = Game(p1_ai, p2_ai, p3_ai, p4_ai, geometry)
+        
+        # 新的一局：每步另有 1 秒的显示间隔，最多走 game_duration / 2 步。
+        # 只有选择按对局时钟思考（clocked）时才把时长分给支持对局时钟的 AI（MCTS、Minimax）：
+        # 时长的一半留给显示，另一半平分给四个玩家思考；否则各 AI 保持原来的固定预算
+        game_time = game_duration / 2 / len(self.agents) if clocked else None
+        for agent in self.agents.values():
+            if hasattr(agent, 'new_game'):
+                agent.new_game(max_moves=int(game_duration // 2), game_time=game_time)
         
         # 定义棋子颜色与目标区域颜色的映射（与 update_board 中对应）
         self.piece_colors = {1: "red", 2: "blue", 3: "green", 4: "magenta"}
@@ -36,11 +39,13 @@ class GameGUI:
         self.info_frame.grid(row=0, column=1, sticky="n", padx=10, pady=10)
         self.create_scrollable_info_panel()
         
-        self.cell_size = 600 // 12
+        self.geometry = self.game.board.geometry
+        self.cell_size = 600 // max(self.geometry.rows, self.geometry.cols)
         
         # 记录每个玩家决策统计数据
         self.stats = {i: {'decision_time': 0.0, 'cumulative_time': 0.0, 'decision_count': 0, 'latest_mem': 0} for i in range(1,5)}
         self.start_time = time.perf_counter()
+        import psutil  # 只有界面运行时才需要读取进程内存
         self.process = psutil.Process(os.getpid())
         
         self.update_board()
@@ -100,33 +105,27 @@ class GameGUI:
         self.total_mem_label.config(text=f"总内存消耗: {total_mem / (1024*1024):.1f} MB")
         self.elapsed_label.config(text=f"游戏运行时间: {elapsed:.1f} s")
         
-        board = self.game.board.board
-        p1_score = np.count_nonzero(board[9:12,9:12] == 1)
-        p2_score = np.count_nonzero(board[9:12,0:3] == 2)
-        p3_score = np.count_nonzero(board[0:3,9:12] == 3)
-        p4_score = np.count_nonzero(board[0:3,0:3] == 4)
-        score_text = f"分数：\n玩家1: {p1_score}\n玩家2: {p2_score}\n玩家3: {p3_score}\n玩家4: {p4_score}"
+        scores = self.game.board.scores()
+        score_text = "分数：\n" + "\n".join(f"玩家{p}: {scores[p]}" for p in range(1, 5))
         self.score_label.config(text=score_text)
 
     def update_board(self):
         self.canvas.delete("all")
         board = self.game.board.board
-        for i in range(12):
-            for j in range(12):
+        # 目标区域底色：玩家1右下、玩家2左下、玩家3右上、玩家4左上
+        zone_colors = {1: "lightcoral", 2: "khaki", 3: "lightgreen", 4: "skyblue"}
+        for i in range(self.geometry.rows):
+            for j in range(self.geometry.cols):
                 x1 = j * self.cell_size
                 y1 = i * self.cell_size
                 x2 = x1 + self.cell_size
                 y2 = y1 + self.cell_size
-                if i < 3 and j < 3:
-                    fill_color = "skyblue"       # 玩家4目标区域：左上
-                elif i < 3 and j >= 9:
-                    fill_color = "lightgreen"    # 玩家3目标区域：右上
-                elif i >= 9 and j < 3:
-                    fill_color = "khaki"         # 玩家2目标区域：左下
-                elif i >= 9 and j >= 9:
-                    fill_color = "lightcoral"    # 玩家1目标区域：右下
-                else:
-                    fill_color = "white"
+                if not self.geometry.mask[i, j]:
+                    continue
+                fill_color = "white"
+                for p, color in zone_colors.items():
+                    if self.geometry.target_masks[p][i, j]:
+                        fill_color = color
                 self.canvas.create_rectangle(x1, y1, x2, y2, fill=fill_color, outline="black")
                 
                 if board[i, j] == 1:
@@ -143,12 +142,11 @@ class GameGUI:
         total_mem = self.process.memory_info().rss
         
         if elapsed >= self.game_duration:
-            board = self.game.board.board
-            p1_score = np.count_nonzero(board[9:12,9:12] == 1)
-            p2_score = np.count_nonzero(board[9:12,0:3] == 2)
-            p3_score = np.count_nonzero(board[0:3,9:12] == 3)
-            p4_score = np.count_nonzero(board[0:3,0:3] == 4)
-            scores = {1: p1_score, 2: p2_score, 3: p3_score, 4: p4_score}
+            for agent in self.agents.values():
+                # 对局结束，后台思考的 AI 停止搜索
+                if hasattr(agent, 'stop_pondering'):
+                    agent.stop_pondering()
+            scores = self.game.board.scores()
             winner = max(scores, key=scores.get)
             self.canvas.create_text(300, 300, text=f"玩家 {winner} 胜利", font=("Arial", 36, "bold"), fill="purple")
             return
@@ -170,7 +168,8 @@ class GameGUI:
         
         if move:
             from_pos, to_pos = move
-            self.game.board.move_piece(from_pos, to_pos)
+            if not self.game.board.move_piece(from_pos, to_pos, validate=True, player_id=current_player):
+                print(f"玩家 {current_player} 的走法 {from_pos} -> {to_pos} 不合法，跳过！")
         else:
             print(f"玩家 {current_player} 没有合法移动！")
         
@@ -179,59 +178,58 @@ class GameGUI:
         self.game.current_player = (self.game.current_player % 4) + 1
         self.root.after(1000, self.game_step)
 
-def start_game(p1_type, p2_type, p3_type, p4_type, game_duration, root, selection_frame):
-    def create_ai(ai_type, player_id):
-        if ai_type == "Greedy":
-            return GreedyAI(player_id)
-        elif ai_type == "A* 算法":
-            return AStarAI(player_id)
-        elif ai_type == "MCTS":
-            return MCTSAI(player_id)
-        elif ai_type == "Minimax":
-            return MinimaxAI(player_id)
-        else:
-            return GreedyAI(player_id)
-    p1_ai = create_ai(p1_type, 1)
-    p2_ai = create_ai(p2_type, 2)
-    p3_ai = create_ai(p3_type, 3)
-    p4_ai = create_ai(p4_type, 4)
+def start_game(p1_type, p2_type, p3_type, p4_type, game_duration, root, selection_frame, clocked=False):
+    # 菜单中的名字即注册表中的显示名，AI 模块在这里才被导入
+    p1_ai = create_agent(p1_type, 1)
+    p2_ai = create_agent(p2_type, 2)
+    p3_ai = create_agent(p3_type, 3)
+    p4_ai = create_agent(p4_type, 4)
     selection_frame.destroy()
-    GameGUI(root, p1_ai, p2_ai, p3_ai, p4_ai, game_duration)
-
-root = tk.Tk()
-root.title("中国跳棋 AI 对战 - 4人对抗")
-selection_frame = tk.Frame(root)
-selection_frame.pack(padx=10, pady=10)
-
-options = ["Greedy", "A* 算法", "MCTS", "Minimax"]
-
-tk.Label(selection_frame, text="选择玩家1的AI:").grid(row=0, column=0, padx=5, pady=5)
-tk.Label(selection_frame, text="选择玩家2的AI:").grid(row=1, column=0, padx=5, pady=5)
-tk.Label(selection_frame, text="选择玩家3的AI:").grid(row=2, column=0, padx=5, pady=5)
-tk.Label(selection_frame, text="选择玩家4的AI:").grid(row=3, column=0, padx=5, pady=5)
-tk.Label(selection_frame, text="选择游戏时长:").grid(row=4, column=0, padx=5, pady=5)
-
-p1_var = tk.StringVar(value="Greedy")
-p2_var = tk.StringVar(value="A* 算法")  # 例如选择 A* 算法
-p3_var = tk.StringVar(value="MCTS")
-p4_var = tk.StringVar(value="Minimax")
-time_var = tk.StringVar(value="1分钟")  # 默认1分钟
-
-p1_menu = ttk.Combobox(selection_frame, textvariable=p1_var, values=options, state="readonly")
-p1_menu.grid(row=0, column=1, padx=5, pady=5)
-p2_menu = ttk.Combobox(selection_frame, textvariable=p2_var, values=options, state="readonly")
-p2_menu.grid(row=1, column=1, padx=5, pady=5)
-p3_menu = ttk.Combobox(selection_frame, textvariable=p3_var, values=options, state="readonly")
-p3_menu.grid(row=2, column=1, padx=5, pady=5)
-p4_menu = ttk.Combobox(selection_frame, textvariable=p4_var, values=options, state="readonly")
-p4_menu.grid(row=3, column=1, padx=5, pady=5)
-time_options = ["1分钟", "2分钟", "3分钟", "4分钟", "5分钟"]
-time_menu = ttk.Combobox(selection_frame, textvariable=time_var, values=time_options, state="readonly")
-time_menu.grid(row=4, column=1, padx=5, pady=5)
-
-start_button = tk.Button(selection_frame, text="开始游戏",
-                         command=lambda: start_game(p1_var.get(), p2_var.get(), p3_var.get(), p4_var.get(),
-                                                     int(time_var.get()[0]) * 60, root, selection_frame))
-start_button.grid(row=5, column=0, columnspan=2, pady=10)
-
-root.mainloop()
+    GameGUI(root, p1_ai, p2_ai, p3_ai, p4_ai, game_duration, clocked=clocked)
+
+def main():
+    root = tk.Tk()
+    root.title("中国跳棋 AI 对战 - 4人对抗")
+    selection_frame = tk.Frame(root)
+    selection_frame.pack(padx=10, pady=10)
+
+    options = agent_labels()
+
+    tk.Label(selection_frame, text="选择玩家1的AI:").grid(row=0, column=0, padx=5, pady=5)
+    tk.Label(selection_frame, text="选择玩家2的AI:").grid(row=1, column=0, padx=5, pady=5)
+    tk.Label(selection_frame, text="选择玩家3的AI:").grid(row=2, column=0, padx=5, pady=5)
+    tk.Label(selection_frame, text="选择玩家4的AI:").grid(row=3, column=0, padx=5, pady=5)
+    tk.Label(selection_frame, text="选择游戏时长:").grid(row=4, column=0, padx=5, pady=5)
+
+    p1_var = tk.StringVar(value="Greedy")
+    p2_var = tk.StringVar(value="A* 算法")  # 例如选择 A* 算法
+    p3_var = tk.StringVar(value="MCTS")
+    p4_var = tk.StringVar(value="Minimax")
+    time_var = tk.StringVar(value="1分钟")  # 默认1分钟
+
+    p1_menu = ttk.Combobox(selection_frame, textvariable=p1_var, values=options, state="readonly")
+    p1_menu.grid(row=0, column=1, padx=5, pady=5)
+    p2_menu = ttk.Combobox(selection_frame, textvariable=p2_var, values=options, state="readonly")
+    p2_menu.grid(row=1, column=1, padx=5, pady=5)
+    p3_menu = ttk.Combobox(selection_frame, textvariable=p3_var, values=options, state="readonly")
+    p3_menu.grid(row=2, column=1, padx=5, pady=5)
+    p4_menu = ttk.Combobox(selection_frame, textvariable=p4_var, values=options, state="readonly")
+    p4_menu.grid(row=3, column=1, padx=5, pady=5)
+    time_options = ["1分钟", "2分钟", "3分钟", "4分钟", "5分钟"]
+    time_menu = ttk.Combobox(selection_frame, textvariable=time_var, values=time_options, state="readonly")
+    time_menu.grid(row=4, column=1, padx=5, pady=5)
+    # 默认各 AI 按固定预算思考；勾选后 MCTS、Minimax 按游戏时长分配的对局时钟思考
+    clock_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(selection_frame, text="MCTS / Minimax 按游戏时长分配思考时间",
+                   variable=clock_var).grid(row=5, column=0, columnspan=2, padx=5, pady=5)
+
+    start_button = tk.Button(selection_frame, text="开始游戏",
+                             command=lambda: start_game(p1_var.get(), p2_var.get(), p3_var.get(), p4_var.get(),
+                                                         int(time_var.get()[0]) * 60, root, selection_frame,
+                                                         clock_var.get()))
+    start_button.grid(row=6, column=0, columnspan=2, pady=10)
+
+    root.mainloop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+两个 AI 之间的对抗赛，用序贯概率比检验（SPRT）决定何时停止。
+
+每局 A、B 各占两个相对的座位（玩家1、4 与玩家2、3 为两组对角），逐局交换座位以抵消先手与方位的影响。
+一局的结果按两队目标区域内棋子总数比较：A 多为胜，B 多为负，相等为和。
+
+检验采用广义 SPRT（GSPRT）：
+  H0: A 比 B 强 elo0，H1: A 比 B 强 elo1，把期望得分 s = 1 / (1 + 10^(-elo/400)) 作为参数，
+  用胜/和/负的样本均值与方差做正态近似，对数似然比
+      LLR = N * (s1 - s0) * (2 * s - s0 - s1) / (2 * var)
+  LLR >= ln((1 - beta) / alpha) 时接受 H1，LLR <= ln(beta / (1 - alpha)) 时接受 H0。
+每局结束后更新一次，结论一出就停止派发新对局，并取消进程池中尚未完成的对局。
+"""
+import math
+import time
+import random
+import functools
+import multiprocessing
+import concurrent.futures
+
+# 为了加快模拟速度，取消 sleep 延时
+time.sleep = lambda x: None
+
+from simulate_stats import simulate_lineup_game
+from adjudication import settled_team_result
+
+# 两组相对的座位，逐局交换
+SEATS = ((1, 4), (2, 3))
+
+
+def expected_score(elo):
+    return 1.0 / (1.0 + 10 ** (-elo / 400.0))
+
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+
+class SPRT:
+    def __init__(self, elo0=0.0, elo1=30.0, alpha=0.05, beta=0.05, min_games=20):
+        """
+        :param elo0, elo1: 原假设与备择假设下 A 相对 B 的 Elo 差（elo1 - elo0 即要分辨的效应量）
+        :param alpha: 第一类错误率（H0 成立却接受 H1）
+        :param beta: 第二类错误率（H1 成立却接受 H0）
+        :param min_games: 至少下满这么多局才允许得出结论（样本太少时正态近似的方差估计不可靠）
+        """
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.min_games = min_games
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def update(self, outcome):
+        """outcome: A 的得分，1 / 0.5 / 0"""
+        if outcome == 1:
+            self.wins += 1
+        elif outcome == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    def score(self):
+        return (self.wins + 0.5 * self.draws) / self.games if self.games else 0.5
+
+    def llr(self):
+        n = self.games
+        if n == 0:
+            return 0.0
+        s = self.score()
+        var = (self.wins * (1 - s) ** 2 + self.draws * (0.5 - s) ** 2 + self.losses * s ** 2) / n
+        if var <= 0:
+            # 全胜、全负或全和时方差为 0，这时还无法判断，继续比赛
+            return 0.0
+        s0 = expected_score(self.elo0)
+        s1 = expected_score(self.elo1)
+        return n * (s1 - s0) * (2 * s - s0 - s1) / (2 * var)
+
+    def status(self):
+        """'H1'（A 至少强 elo1）、'H0'（A 至多强 elo0）或 None（尚无结论）"""
+        if self.games < self.min_games:
+            return None
+        llr = self.llr()
+        if llr >= self.upper:
+            return 'H1'
+        if llr <= self.lower:
+            return 'H0'
+        return None
+
+    def elo(self):
+        """A 相对 B 的 Elo 差估计及约 95% 置信区间的半宽"""
+        n = self.games
+        s = self.score()
+        if n < 2:
+            return elo_from_score(s), float('inf')
+        var = (self.wins * (1 - s) ** 2 + self.draws * (0.5 - s) ** 2 + self.losses * s ** 2) / n
+        margin = 1.96 * math.sqrt(var / n)
+        return elo_from_score(s), (elo_from_score(s + margin) - elo_from_score(s - margin)) / 2
+
+
+def game_outcome(result, seats_a, seats_b):
+    """按两队目标区域内棋子总数给出 A 的得分"""
+    score_a = sum(result['scores'][p] for p in seats_a)
+    score_b = sum(result['scores'][p] for p in seats_b)
+    if score_a > score_b:
+        return 1
+    if score_a < score_b:
+        return 0
+    return 0.5
+
+
+# 工作进程中的全局停止事件（由进程池的 initializer 设置）
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def play_match_game(index, agent_a, agent_b, max_moves, geometry=None, repetition_limit=None, adjudicate=False,
+                    seed=0):
+    """
+    第 index 局：偶数局 A 坐 (1, 4)，奇数局交换。返回 (A 的得分, 对局结果)，被取消时得分为 None。
+    每局按 (seed, index) 重新设置随机种子：fork 出的工作进程继承同一个随机状态，不重设会下出重复的对局。
+    adjudicate 时按两队得分之和判断是否定局（settled_team_result），与 game_outcome 的计分一致。
+    """
+    random.seed(seed * 1000003 + index)
+    seats_a, seats_b = SEATS if index % 2 == 0 else SEATS[::-1]
+    lineup = {p: agent_a for p in seats_a}
+    lineup.update({p: agent_b for p in seats_b})
+    if adjudicate:
+        adjudicate = functools.partial(settled_team_result, teams=(seats_a, seats_b))
+    result = simulate_lineup_game(max_moves, lineup, geometry, repetition_limit, adjudicate, _stop_event)
+    if result['termination'] == 'cancelled':
+        return None, result
+    return game_outcome(result, seats_a, seats_b), result
+
+
+def run_match(agent_a, agent_b, max_moves=60, sprt=None, max_games=1000, workers=None,
+              geometry=None, repetition_limit=None, adjudicate=False, verbose=True, seed=None):
+    """
+    A、B 对抗直到 SPRT 得出结论或下满 max_games 局。
+    agent_a / agent_b: 注册名或 (注册名, 参数字典)，见 ai/registry.py。
+    进程池中始终保持 workers 局在进行，出结论后不再派发，并通知进行中的对局立即中止。
+    seed 固定时各局的随机种子可复现（默认随机）。
+    返回字典：{'decision': 'H1' / 'H0' / None, 'wins', 'draws', 'losses', 'games', 'llr',
+              'bounds': (下界, 上界), 'elo': (估计, 置信区间半宽), 'cancelled': 被取消的对局数, 'elapsed': 秒}
+    """
+    sprt = sprt or SPRT()
+    seed = random.randrange(2 ** 31) if seed is None else seed
+    workers = workers or multiprocessing.cpu_count()
+    context = multiprocessing.get_context()
+    stop_event = context.Event()
+    start = time.perf_counter()
+    submitted = 0
+    cancelled = 0
+    decision = None
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                                initializer=_init_worker, initargs=(stop_event,)) as executor:
+        pending = set()
+
+        def submit():
+            nonlocal submitted
+            pending.add(executor.submit(play_match_game, submitted, agent_a, agent_b, max_moves,
+                                        geometry, repetition_limit, adjudicate, seed))
+            submitted += 1
+
+        while submitted < min(workers, max_games):
+            submit()
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    cancelled += 1
+                    continue
+                outcome, result = future.result()
+                if outcome is None:
+                    cancelled += 1
+                    continue
+                if decision is not None or sprt.games >= max_games:
+                    # 结论已出之后才下完的对局不再计入
+                    continue
+                sprt.update(outcome)
+                decision = sprt.status()
+                if verbose:
+                    print(f"局 {sprt.games:4d}: A 得分 {outcome}  "
+                          f"(+{sprt.wins} ={sprt.draws} -{sprt.losses})  LLR = {sprt.llr():.2f} "
+                          f"[{sprt.lower:.2f}, {sprt.upper:.2f}]")
+            if decision is not None or sprt.games >= max_games:
+                stop_event.set()
+                for future in pending:
+                    future.cancel()
+            else:
+                while submitted < max_games and len(pending) < workers:
+                    submit()
+
+    elo, margin = sprt.elo()
+    return {'decision': decision, 'wins': sprt.wins, 'draws': sprt.draws, 'losses': sprt.losses,
+            'games': sprt.games, 'llr': sprt.llr(), 'bounds': (sprt.lower, sprt.upper),
+            'elo': (elo, margin), 'cancelled': cancelled, 'elapsed': time.perf_counter() - start}
+
+
+def print_match_result(agent_a, agent_b, sprt, result):
+    name_a = agent_a if isinstance(agent_a, str) else agent_a[0]
+    name_b = agent_b if isinstance(agent_b, str) else agent_b[0]
+    verdicts = {'H1': f"{name_a} 至少强 {sprt.elo1:g} Elo（接受 H1）",
+                'H0': f"{name_a} 相对 {name_b} 至多 {sprt.elo0:+g} Elo（接受 H0）",
+                None: "未得出结论（已达到最大局数）"}
+    elo, margin = result['elo']
+    print("\n========================================")
+    print(f"{name_a} vs {name_b}   SPRT elo0={sprt.elo0:g} elo1={sprt.elo1:g} "
+          f"alpha={sprt.alpha:g} beta={sprt.beta:g}")
+    print("------------------------------------------------")
+    print(f"对局数: {result['games']}  (+{result['wins']} ={result['draws']} -{result['losses']})  "
+          f"取消: {result['cancelled']}  耗时: {result['elapsed']:.1f} s")
+    print(f"LLR = {result['llr']:.2f}  [{result['bounds'][0]:.2f}, {result['bounds'][1]:.2f}]")
+    print(f"Elo 差估计: {elo:+.1f} ± {margin:.1f}")
+    print(f"结论: {verdicts[result['decision']]}")
+    print("========================================\n")
+
+
+if __name__ == '__main__':
+    # 示例：MCTS 与 Greedy 对抗，分辨 0 与 50 Elo 的差距
+    sprt = SPRT(elo0=0, elo1=50, alpha=0.05, beta=0.05)
+    res = run_match(("MCTS", {"time_limit": 0.2}), "Greedy", max_moves=60, sprt=sprt, max_games=400)
+    print_match_result(("MCTS", {"time_limit": 0.2}), "Greedy", sprt, res)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+模拟用的采样分析器：后台线程每隔 interval 秒读取一次对局线程的调用栈，
+按当前正在决策的 AI 归类计数，输出火焰图工具（flamegraph.pl、speedscope、inferno 等）
+使用的折叠栈格式（collapsed stacks）：每行 "外层函数;...;内层函数 样本数"。
+
+只在 decide(tag) 包住的决策期间采样，栈从 decide 的调用处往内截取，不包含对局循环本身。
+不修改被测代码、不设置跟踪钩子，开销只有采样线程每次取栈的时间（默认 5 ms 一次，实测约 2%），
+可以在正式的批量模拟中一直开着。
+注意只采样调用 start() 的线程：MCTS 后台思考线程中的计算不计入。
+
+工作进程中各自采样，结果（{标签: {栈: 样本数}}）随对局结果返回，在父进程中 merge 后写文件。
+"""
+import os
+import re
+import sys
+import threading
+from contextlib import contextmanager
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, max_depth=100):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = {}      # {标签: {折叠栈: 样本数}}
+        self.sample_count = 0
+        self._tag = None
+        self._base = None      # decide 调用处的栈帧，采样时截到这里为止
+        self._thread_id = None
+        self._thread = None
+        self._stop = None
+
+    def start(self):
+        """开始采样当前线程"""
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    @contextmanager
+    def decide(self, tag):
+        """在此上下文中的采样归入 tag（通常为 AI 名称）"""
+        # 0：本生成器，1：contextmanager 的 __enter__，2：with 语句所在的函数
+        self._base = sys._getframe(2)
+        self._tag = tag
+        try:
+            yield
+        finally:
+            self._tag = None
+            self._base = None
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            tag, base = self._tag, self._base
+            if tag is None:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None and frame is not base and len(stack) < self.max_depth:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if frame is not base or not stack:
+                # 取栈时决策已经结束（或栈太深）
+                continue
+            # 最外层为 with 块中直接调用的函数（如 choose_move）
+            key = ";".join(reversed(stack))
+            counts = self.samples.setdefault(tag, {})
+            counts[key] = counts.get(key, 0) + 1
+            self.sample_count += 1
+
+    def merge(self, samples):
+        """并入另一个分析器的 samples"""
+        for tag, counts in samples.items():
+            mine = self.samples.setdefault(tag, {})
+            for key, n in counts.items():
+                mine[key] = mine.get(key, 0) + n
+        self.sample_count += sum(sum(counts.values()) for counts in samples.values())
+        return self
+
+    def write(self, directory):
+        """每个标签写一个 <标签>.folded 文件，返回文件路径列表"""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for tag, counts in sorted(self.samples.items()):
+            path = os.path.join(directory, re.sub(r'[^\w.-]+', '_', str(tag)) + ".folded")
+            with open(path, 'w', encoding='utf-8') as f:
+                for key, n in sorted(counts.items(), key=lambda kv: -kv[1]):
+                    f.write(f"{key} {n}\n")
+            paths.append(path)
+        return paths
+
+    def top_functions(self, tag, limit=10):
+        """该标签下自身耗时（栈顶）最多的函数：[(函数, 样本占比), ...]"""
+        counts = self.samples.get(tag, {})
+        total = sum(counts.values())
+        leaves = {}
+        for key, n in counts.items():
+            leaf = key.rsplit(";", 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + n
+        ranked = sorted(leaves.items(), key=lambda kv: -kv[1])[:limit]
+        return [(name, n / total) for name, n in ranked] if total else []
+
+
+def print_profile(profiler, limit=5):
+    print("------------------------------------------------")
+    print(f"采样分析（间隔 {profiler.interval * 1000:g} ms，共 {profiler.sample_count} 个样本），各 AI 自身耗时最多的函数：")
+    for tag in sorted(profiler.samples):
+        total = sum(profiler.samples[tag].values())
+        print(f"  {tag}（{total} 个样本）")
+        for name, share in profiler.top_functions(tag, limit):
+            print(f"    {share * 100:5.1f}%  {name}")
@@ -3,150 +3,347 @@
 
 import sys
 import time
-import psutil
-import os
-import numpy as np
 import random
 import tracemalloc
 
 # 为了加快模拟速度，取消 sleep 延时
 time.sleep = lambda x: None
 
-# 导入棋盘和 AI 模块（请确保路径和文件名正确）
-from board import Board
-from ai.greedy_ai import GreedyAI
-from ai.astar_ai import AStarAI
-from ai.mcts_ai import MCTSAI
-from ai.minimax_ai import MinimaxAI
+# 导入棋盘与 AI 注册表（各 AI 的实现模块在创建时才导入）
+from board import Board, PositionHistory
+from adjudication import settled_result
+from ai.registry import build_agents
+from ai.decision_cache import collect_cache_stats
+from stream_stats import DecisionStats, RunningStats, game_phase, print_breakdown
 
-def simulate_game_with_stats(max_moves, agents):
+# 默认对战阵容：玩家1：Greedy，玩家2：A* 算法，玩家3：MCTS，玩家4：Minimax
+# 值为注册名，或 (注册名, 参数字典)，如 ("MCTS", {"time_limit": 0.5})
+DEFAULT_LINEUP = {1: "Greedy", 2: "AStar", 3: "MCTS", 4: "Minimax"}
+
+# 提前结束的对局在结果行后附加的说明
+EARLY_ENDINGS = {
+    'repetition': " (重复局面提前结束)",
+    'cycle': " (重复局面提前结束)",
+    'adjudicated': " (胜负已定提前结束)",
+}
+
+def describe_result(result, names=None):
+    """
+    一局结果的文字说明。提前裁决的胜者写作 Adjudicated，与下完的胜局（Winner）区分；
+    names 为座位到 AI 名称的映射，给出时附在座位号后。
+    """
+    winner = result['winner']
+    ending = EARLY_ENDINGS.get(result['termination'], "")
+    if winner == 0:
+        return f"平局, Moves = {result['moves']}{ending}"
+    label = 'Adjudicated' if result['termination'] == 'adjudicated' else 'Winner'
+    seat = f"{winner} ({names[winner]})" if names else f"{winner}"
+    return f"{label} = {seat}, Moves = {result['moves']}{ending}"
+
+def simulate_game_with_stats(max_moves, agents, geometry=None, repetition_limit=None, adjudicate=False,
+                             stop_event=None, names=None, profiler=None, track_memory=True):
     """
     模拟一局游戏：
       - max_moves: 最大走子步数（例如 1分钟=60步）
       - agents: 字典 {1: agent1, 2: agent2, 3: agent3, 4: agent4}
+      - geometry: 棋盘几何（默认 12x12），需与 agents 使用的几何一致
+      - repetition_limit: 同一局面（含轮到谁走）出现达到该次数，或四个玩家各自的棋子分布
+        都已重复出现该次数（所有人都在来回挪动）时，提前结束并按当前得分判定；None 表示不检测
+      - adjudicate: 每步之前检查剩余步数内胜负（或平局）是否已成定局，是则提前结束，
+        termination 记为 'adjudicated'。也可以传入与 adjudication.settled_result 同样签名的函数
+        （如两队对抗时的 settled_team_result），返回的胜者为 None 时按当前得分判定
+      - stop_event: 可选的事件对象（threading / multiprocessing Event），被置位后在下一步之前中止对局，
+        termination 记为 'cancelled'（用于取消已无需进行的对局）
+      - names: {玩家ID: AI 名称}，用于按 AI 分组统计，默认取类名
+      - profiler: 可选的 profiler.SamplingProfiler（已 start），每步决策的采样归入该 AI 名称
+      - track_memory: 是否用 tracemalloc 统计每步的内存峰值。tracemalloc 会显著拖慢决策、扭曲耗时，
+        只关心耗时或做采样分析时可关闭（内存峰值记为 0）
     游戏结束或达到最大步数后，统计目标区域中各玩家的棋子数，
     若全部为0则返回 winner = 0（表示平局），否则取得分最高者为胜者。
-    同时记录每步决策的耗时和内存峰值。
+    同时在线汇总每步决策的耗时和内存峰值（按 AI、座位、对局阶段分组，见 stream_stats.DecisionStats），
+    不保留逐步记录。
+    每步走法都经过 Board 的合法性检查（走法表查表），非法走法不执行、按放弃这一步处理并计数。
+    设置了 avoid_repetition 的 AI 会得到对局历史（agent.history），可据此避免走回重复局面；
+    有 new_game 方法的 AI 在开局前被调用一次（重置对局时钟等按局的状态，并告知步数上限）。
     返回字典，格式：
-      {'winner': winner, 'moves': 实际走步, 'stats': {p: {'times': [...], 'mems': [...]}}}
+      {'winner': winner, 'moves': 实际走步, 'stats': DecisionStats,
+       'termination': 'game_over' / 'max_moves' / 'repetition' / 'cycle' / 'adjudicated' / 'cancelled',
+       'cycle_length': 重复局面的循环长度, 'scores': {p: 目标区域内棋子数}, 'illegal_moves': 被拒绝的走法数}
     """
-    board_instance = Board()  # 初始棋盘（要求初始布局采用对角起始，使目标区域为空）
+    board_instance = Board(geometry)  # 初始棋盘（要求初始布局采用对角起始，使目标区域为空）
     current_player = 1
     moves_count = 0
-    process = psutil.Process(os.getpid())
+    history = PositionHistory(board_instance.geometry)
+    history.push(board_instance.board, current_player)
+    for agent in agents.values():
+        if getattr(agent, 'avoid_repetition', False):
+            agent.history = history
+        if hasattr(agent, 'new_game'):
+            agent.new_game(max_moves)
+    termination = 'max_moves'
+    cycle_length = None
+    illegal_moves = 0
     
-    # 初始化每个玩家决策统计
-    stats = {1: {'times': [], 'mems': []},
-             2: {'times': [], 'mems': []},
-             3: {'times': [], 'mems': []},
-             4: {'times': [], 'mems': []}}
+    # 每个玩家决策统计（在线汇总）
+    stats = DecisionStats()
+    names = names or {p: agent.__class__.__name__ for p, agent in agents.items()}
+    settle = settled_result if adjudicate is True else adjudicate
     
-    while moves_count < max_moves and not board_instance.is_game_over():
+    while moves_count < max_moves:
+        if stop_event is not None and stop_event.is_set():
+            termination = 'cancelled'
+            break
+        if board_instance.is_game_over():
+            termination = 'game_over'
+            break
+        if adjudicate:
+            settled, settled_winner = settle(board_instance.board, max_moves - moves_count,
+                                             current_player, board_instance.geometry)
+            if settled:
+                termination = 'adjudicated'
+                break
         agent = agents[current_player]
-        tracemalloc.start()
+        phase = game_phase(board_instance.board, current_player, board_instance.geometry)
+        if track_memory:
+            tracemalloc.start()
         start_time = time.time()
-        move = agent.choose_move(board_instance.board)
+        if profiler is not None:
+            with profiler.decide(names[current_player]):
+                move = agent.choose_move(board_instance.board)
+        else:
+            move = agent.choose_move(board_instance.board)
         step_time = time.time() - start_time
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
+        peak = 0
+        if track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
         
-        stats[current_player]['times'].append(step_time)
-        stats[current_player]['mems'].append(peak)
+        stats.record(current_player, names[current_player], phase, step_time, peak)
         
         if move:
             from_pos, to_pos = move
-            board_instance.move_piece(from_pos, to_pos)
+            if not board_instance.move_piece(from_pos, to_pos, validate=True, player_id=current_player):
+                illegal_moves += 1
         moves_count += 1
+        moved_player = current_player
         current_player = (current_player % 4) + 1
+        history.push(board_instance.board, current_player, moved_player)
+        if repetition_limit and history.repetitions() >= repetition_limit:
+            termination = 'repetition'
+            cycle_length = history.cycle_length()
+            break
+        if repetition_limit and history.all_players_cycling(repetition_limit):
+            termination = 'cycle'
+            break
+    else:
+        if board_instance.is_game_over():
+            termination = 'game_over'
+    for agent in agents.values():
+        # 后台思考的 AI 不在对局之间继续搜索
+        if hasattr(agent, 'stop_pondering'):
+            agent.stop_pondering()
 
-    board_arr = board_instance.board
-    # 目标区域得分统计
-    p1_score = np.count_nonzero(board_arr[9:12, 9:12] == 1)  # 玩家1目标区域：右下
-    p2_score = np.count_nonzero(board_arr[9:12, 0:3] == 2)     # 玩家2目标区域：左下
-    p3_score = np.count_nonzero(board_arr[0:3, 9:12] == 3)     # 玩家3目标区域：右上
-    p4_score = np.count_nonzero(board_arr[0:3, 0:3] == 4)      # 玩家4目标区域：左上
-    scores = {1: p1_score, 2: p2_score, 3: p3_score, 4: p4_score}
+    # 目标区域得分统计（各玩家目标区域由棋盘几何给出）
+    scores = board_instance.scores()
     # 如果所有玩家的得分都为 0，则返回 winner = 0 表示平局
     if all(score == 0 for score in scores.values()):
         winner = 0
     else:
         winner = max(scores, key=scores.get)
     
-    return {'winner': winner, 'moves': moves_count, 'stats': stats}
+    if termination == 'adjudicated' and settled_winner is not None:
+        # 定局时按当前得分判定的胜者与裁决结果一致，这里直接采用裁决结果
+        winner = settled_winner
 
-def simulate_battles(time_limit_minutes, rounds=10):
+    return {'winner': winner, 'moves': moves_count, 'stats': stats,
+            'termination': termination, 'cycle_length': cycle_length, 'scores': scores,
+            'illegal_moves': illegal_moves}
+
+def simulate_lineup_game(max_moves, lineup, geometry=None, repetition_limit=None, adjudicate=False,
+                         stop_event=None, profile_interval=None, track_memory=True, decision_cache=None):
+    """
+    按阵容（见 DEFAULT_LINEUP）新建四个 AI 并模拟一局。
+    只传阵容而不传 AI 实例，工作进程只需导入阵容中用到的 AI 模块。
+    profile_interval 不为 None 时以该间隔（秒）采样分析，样本放在结果的 'profile' 中
+    （{AI 名称: {折叠栈: 样本数}}）。
+    decision_cache 为 ai.decision_cache.DecisionCache 时确定性的 AI 使用磁盘决策缓存，
+    命中统计放在结果的 'decision_cache' 中（{AI 名称: [命中, 未命中]}）。
+    开启后台思考的 AI 的复用统计放在结果的 'ponder' 中（{玩家ID: MCTSAI.ponder_stats()}）。
+    对局结束后关闭各 AI（见 close_agents）。
+    """
+    agents = build_agents(lineup, geometry, decision_cache)
+    profiler = None
+    if profile_interval is not None:
+        from profiler import SamplingProfiler
+        profiler = SamplingProfiler(profile_interval).start()
+    try:
+        result = simulate_game_with_stats(max_moves, agents, geometry, repetition_limit, adjudicate, stop_event,
+                                          lineup_names(lineup), profiler, track_memory)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        close_agents(agents)
+    if profiler is not None:
+        result['profile'] = profiler.samples
+    ponder = {p: agent.ponder_stats() for p, agent in agents.items() if getattr(agent, 'ponder', False)}
+    if ponder:
+        result['ponder'] = ponder
+    if decision_cache is not None:
+        # 每局结束时写入，其他工作进程之后的对局即可用上
+        decision_cache.flush()
+        cache_stats = collect_cache_stats(agents, lineup_names(lineup))
+        if cache_stats:
+            result['decision_cache'] = cache_stats
+    return result
+
+def sample_positions(count, max_moves=120, geometry=None, seed=0, every=1):
+    """
+    用 Greedy 自对弈收集 count 个 (局面, 玩家) 样本（每 every 步取一个），覆盖开局到中局，
+    供压测与基准测试使用。调用前后全局随机状态不变。
+    """
+    from ai.greedy_ai import GreedyAI
+    rng_state = random.getstate()
+    random.seed(seed)
+    positions = []
+    while len(positions) < count:
+        board = Board(geometry)
+        agents = {p: GreedyAI(p, geometry=geometry) for p in (1, 2, 3, 4)}
+        for ply in range(max_moves):
+            if board.is_game_over() or len(positions) >= count:
+                break
+            player = ply % 4 + 1
+            if ply % every == 0:
+                positions.append((board.board.copy(), player))
+            move = agents[player].choose_move(board.board)
+            if move:
+                board.move_piece(*move)
+    random.setstate(rng_state)
+    return positions
+
+def close_agents(agents):
+    """释放 AI 持有的资源（如并行 Minimax 的进程池），否则其进程要到程序退出才结束"""
+    for agent in agents.values():
+        if hasattr(agent, 'close'):
+            agent.close()
+
+def lineup_names(lineup):
+    """阵容中各玩家的 AI 名称（用于结果表）"""
+    return {p: entry if isinstance(entry, str) else entry[0] for p, entry in lineup.items()}
+
+def new_summary(lineup):
+    """多局结果的累计汇总（只保存计数与流式统计，内存占用与局数无关）"""
+    return {'names': lineup_names(lineup), 'rounds': 0, 'win_counts': {1: 0, 2: 0, 3: 0, 4: 0},
+            'adjudicated_wins': {1: 0, 2: 0, 3: 0, 4: 0}, 'decisions': DecisionStats(), 'moves': RunningStats(), 'terminations': {}}
+
+def add_result(summary, result):
+    """把一局的结果并入汇总"""
+    summary['rounds'] += 1
+    # 如果为平局（winner=0）则不计入任何玩家胜局；提前裁决的胜者单独计数，不并入下完的胜局
+    wins = summary['adjudicated_wins'] if result['termination'] == 'adjudicated' else summary['win_counts']
+    if result['winner'] in wins:
+        wins[result['winner']] += 1
+    summary['decisions'].merge(result['stats'])
+    summary['moves'].add(result['moves'])
+    summary['terminations'][result['termination']] = summary['terminations'].get(result['termination'], 0) + 1
+    if 'profile' in result:
+        if 'profiler' not in summary:
+            from profiler import SamplingProfiler
+            summary['profiler'] = SamplingProfiler()
+        summary['profiler'].merge(result['profile'])
+    for name, (hits, misses) in result.get('decision_cache', {}).items():
+        entry = summary.setdefault('decision_cache', {}).setdefault(name, [0, 0])
+        entry[0] += hits
+        entry[1] += misses
+
+def finish_summary(summary):
+    """补充胜率与各座位的耗时、内存统计（与原来的 avg_times / avg_mems 字段兼容）"""
+    rounds = summary['rounds']
+    summary['win_rates'] = {p: (summary['win_counts'][p] / rounds * 100 if rounds else 0) for p in [1,2,3,4]}
+    seats = {p: summary['decisions'].seat(p) for p in [1,2,3,4]}
+    summary['avg_times'] = {p: seats[p]['time'].mean for p in [1,2,3,4]}
+    summary['avg_mems'] = {p: seats[p]['mem'].mean for p in [1,2,3,4]}
+    summary['time_summaries'] = {p: seats[p]['time'].summary() for p in [1,2,3,4]}
+    return summary
+
+def simulate_battles(time_limit_minutes, rounds=10, geometry=None, repetition_limit=None, adjudicate=False,
+                     lineup=None, profile_interval=None, track_memory=True, decision_cache=None):
     """
     针对指定游戏时长（分钟），进行 rounds 盘模拟。
     时长以走子步数表示（例如 1分钟=60步）。
-    返回统计数据：包括每个玩家的胜局数、胜率、平均每步决策时间和平均每步内存使用（字节）。
+    repetition_limit、adjudicate、track_memory 见 simulate_game_with_stats；lineup 默认为 DEFAULT_LINEUP。
+    profile_interval 不为 None 时开启采样分析，合并后的 SamplingProfiler 放在结果的 'profiler' 中。
+    decision_cache 见 simulate_lineup_game，各 AI 的命中统计放在结果的 'decision_cache' 中。
+    返回统计数据：包括每个玩家的胜局数、胜率、平均每步决策时间和平均每步内存使用（字节），
+    以及决策耗时的分位数和按 AI / 座位 / 阶段分组的汇总（'decisions'）。
     """
     max_moves = time_limit_minutes * 60
     print(f"\n开始模拟：游戏时长 {time_limit_minutes} 分钟（最多 {max_moves} 步），共 {rounds} 盘。")
     
-    # 固定 Agent 分配：玩家1：Greedy，玩家2：A* 算法，玩家3：MCTS，玩家4：Minimax
-    agents_template = {
-        1: GreedyAI(1),
-        2: AStarAI(2),
-        3: MCTSAI(3),
-        4: MinimaxAI(4)
-    }
+    lineup = lineup or DEFAULT_LINEUP
+    agents_template = build_agents(lineup, geometry, decision_cache)
+    names = lineup_names(lineup)
     
-    round_results = []
-    for i in range(rounds):
-        result = simulate_game_with_stats(max_moves, agents_template)
-        round_results.append(result)
-        # 输出每局结果
-        if result['winner'] == 0:
-            print(f"局 {i+1:2d}: 平局, Moves = {result['moves']}")
-        else:
-            print(f"局 {i+1:2d}: Winner = {result['winner']}, Moves = {result['moves']}")
-    
-    win_counts = {1: 0, 2: 0, 3: 0, 4: 0}
-    total_times = {1: 0.0, 2: 0.0, 3: 0.0, 4: 0.0}
-    total_mems = {1: 0, 2: 0, 3: 0, 4: 0}
-    total_steps = {1: 0, 2: 0, 3: 0, 4: 0}
-    
-    # 统计所有局中各玩家的决策数据与胜局
-    for res in round_results:
-        # 如果为平局（winner=0）则不计入任何玩家胜局
-        if res['winner'] in win_counts:
-            win_counts[res['winner']] += 1
-        stats = res['stats']
-        for p in [1,2,3,4]:
-            total_times[p] += sum(stats[p]['times'])
-            total_mems[p] += sum(stats[p]['mems'])
-            total_steps[p] += len(stats[p]['times'])
+    summary = new_summary(lineup)
+    profiler = None
+    if profile_interval is not None:
+        from profiler import SamplingProfiler
+        profiler = summary['profiler'] = SamplingProfiler(profile_interval).start()
+    try:
+        for i in range(rounds):
+            result = simulate_game_with_stats(max_moves, agents_template, geometry, repetition_limit, adjudicate,
+                                              names=names, profiler=profiler, track_memory=track_memory)
+            cache_stats = collect_cache_stats(agents_template, names)
+            if cache_stats:
+                result['decision_cache'] = cache_stats
+            add_result(summary, result)
+            # 输出每局结果
+            print(f"局 {i+1:2d}: {describe_result(result)}")
+    finally:
+        # 各局共用同一组 AI，全部下完后再关闭
+        close_agents(agents_template)
+    if profiler is not None:
+        profiler.stop()
+    if decision_cache is not None:
+        decision_cache.flush()
     
-    avg_times = {p: (total_times[p] / total_steps[p] if total_steps[p]>0 else 0) for p in [1,2,3,4]}
-    avg_mems = {p: (total_mems[p] / total_steps[p] if total_steps[p]>0 else 0) for p in [1,2,3,4]}
-    win_rates = {p: (win_counts[p] / rounds * 100) for p in [1,2,3,4]}
-    
-    results = {
-        'win_counts': win_counts,
-        'win_rates': win_rates,
-        'avg_times': avg_times,
-        'avg_mems': avg_mems
-    }
-    return results
+    return finish_summary(summary)
 
 def print_results_table(time_limit, results):
     print("\n========================================")
-    print(f"游戏时长：约 {time_limit} 分钟   (10 盘模拟)")
+    print(f"游戏时长：约 {time_limit} 分钟   ({results['rounds']} 盘模拟)")
     print("------------------------------------------------")
-    print(f"{'Algorithm':<12}{'Wins':>8}{'Win Rate':>10}{'Avg Time/Step(s)':>20}{'Avg Mem/Step(MB)':>22}")
+    print(f"{'Algorithm':<12}{'Wins':>8}{'Win Rate':>10}{'Adj. Wins':>11}{'Avg Time/Step(s)':>20}"
+          f"{'Avg Mem/Step(MB)':>22}{'p50(s)':>10}{'p95(s)':>10}{'p99(s)':>10}")
     print("------------------------------------------------")
-    # 固定对应：玩家1：Greedy, 玩家2：A* 算法, 玩家3：MCTS, 玩家4：Minimax
-    algo_names = {1: "Greedy", 2: "A star", 3: "MCTS", 4: "Minimax"}
+    algo_names = results['names']
     for p in [1, 2, 3, 4]:
         wins = results['win_counts'][p]
         rate = results['win_rates'][p]
+        adjudicated = results['adjudicated_wins'][p]
         avg_time = results['avg_times'][p]
         avg_mem = results['avg_mems'][p] / (1024*1024)  # 转为 MB
-        print(f"{algo_names[p]:<12}{wins:8d}{rate:9.1f}%{avg_time:20.3f}{avg_mem:22.2f}")
+        tails = results['time_summaries'][p]
+        print(f"{algo_names[p]:<12}{wins:8d}{rate:9.1f}%{adjudicated:11d}{avg_time:20.3f}{avg_mem:22.2f}"
+              f"{tails['p50']:10.3f}{tails['p95']:10.3f}{tails['p99']:10.3f}")
+    print("------------------------------------------------")
+    print("Wins / Win Rate 不含提前裁决的对局，这些对局的胜者计入 Adj. Wins")
+    print("------------------------------------------------")
+    print("按 AI 与对局阶段（耗时单位 ms）：")
+    print_breakdown(results['decisions'], 'agent_phase')
+    if 'decision_cache' in results:
+        print("------------------------------------------------")
+        print("决策缓存命中率：")
+        for name, (hits, misses) in sorted(results['decision_cache'].items()):
+            total = hits + misses
+            print(f"  {name:<12}{hits:8d} / {total:<8d}{hits / total * 100 if total else 0:6.1f}%")
+    if 'profiler' in results:
+        from profiler import print_profile
+        print_profile(results['profiler'])
     print("========================================\n")
 
 if __name__ == '__main__':
-    # 模拟不同游戏时长：1～5分钟分别进行 10 局模拟
+    # 模拟不同游戏时长：1～5分钟分别进行 10 局模拟；每局下满步数，不做循环检测与提前裁决
+    # （需要时向 simulate_battles 传入 repetition_limit / adjudicate，或使用 cli.py 的对应选项）
     durations = [1, 2, 3, 4, 5]
     rounds = 10
     for t in durations:
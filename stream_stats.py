@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+流式统计：对局中每步决策的耗时与内存峰值只做在线汇总，不保留逐步记录，内存占用与对局数无关。
+
+  - RunningStats：Welford 在线均值/方差，带最小值、最大值，可合并（Chan 的并行合并公式）；
+  - QuantileSketch：对数分桶的分位数草图（相对误差 relative_accuracy），桶数只与数值的量级范围有关，
+    相同参数的草图按桶计数直接相加即可合并，用于报告 p50/p95/p99；
+  - MetricSummary：二者的组合；
+  - DecisionStats：按 AI、座位（玩家）、对局阶段以及 AI x 阶段分组的耗时与内存汇总。
+    工作进程返回各自的 DecisionStats，在父进程中 merge。
+"""
+import math
+
+PHASES = ('opening', 'middle', 'endgame')
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def std(self):
+        return math.sqrt(self.variance())
+
+    @property
+    def total(self):
+        return self.mean * self.count
+
+
+class QuantileSketch:
+    """
+    对数分桶分位数草图：正数 x 落入编号 ceil(log(x) / log(gamma)) 的桶，gamma = (1 + a) / (1 - a)，
+    用桶的代表值估计分位数，相对误差不超过 a。<= min_value 的数单独计数（视为 0）。
+    """
+    def __init__(self, relative_accuracy=0.01, min_value=1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, x):
+        self.count += 1
+        if x <= self.min_value:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(x) / self.log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("只能合并相对误差相同的分位数草图")
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                # 桶 (gamma^(k-1), gamma^k] 的代表值，使相对误差不超过 relative_accuracy
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def __len__(self):
+        return len(self.buckets)
+
+
+class MetricSummary:
+    """一个指标的在线均值/方差与分位数"""
+    def __init__(self, relative_accuracy=0.01):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, x):
+        self.stats.add(x)
+        self.sketch.add(x)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def count(self):
+        return self.stats.count
+
+    @property
+    def mean(self):
+        return self.stats.mean
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def summary(self):
+        result = {'count': self.stats.count, 'mean': self.stats.mean, 'std': self.stats.std(),
+                  'max': self.stats.max if self.stats.count else 0.0}
+        for q in PERCENTILES:
+            result[f"p{round(q * 100)}"] = self.quantile(q)
+        return result
+
+
+def game_phase(board, player_id, geometry):
+    """
+    该玩家所处的对局阶段：起始区里还剩一半以上棋子为 'opening'，
+    目标区里已有一半以上棋子为 'endgame'，否则为 'middle'
+    """
+    own = board == player_id
+    half = geometry.target_sizes[player_id] / 2
+    if (own & geometry.camp_masks[player_id]).sum() > half:
+        return 'opening'
+    if (own & geometry.target_masks[player_id]).sum() >= half:
+        return 'endgame'
+    return 'middle'
+
+
+class DecisionStats:
+    """
+    每步决策的耗时（秒）与内存峰值（字节）汇总，分组键：
+      ('seat', 玩家ID)、('agent', AI 名称)、('phase', 阶段)、('agent_phase', (AI 名称, 阶段))
+    """
+    def __init__(self):
+        self.groups = {}
+
+    def group(self, key):
+        if key not in self.groups:
+            self.groups[key] = {'time': MetricSummary(), 'mem': MetricSummary()}
+        return self.groups[key]
+
+    def record(self, player_id, agent_name, phase, step_time, peak_mem):
+        for key in (('seat', player_id), ('agent', agent_name), ('phase', phase), ('agent_phase', (agent_name, phase))):
+            group = self.group(key)
+            group['time'].add(step_time)
+            group['mem'].add(peak_mem)
+
+    def merge(self, other):
+        for key, group in other.groups.items():
+            mine = self.group(key)
+            mine['time'].merge(group['time'])
+            mine['mem'].merge(group['mem'])
+        return self
+
+    def seat(self, player_id):
+        return self.group(('seat', player_id))
+
+    def agent(self, agent_name):
+        return self.group(('agent', agent_name))
+
+    def keys(self, kind):
+        return sorted(k[1] for k in self.groups if k[0] == kind)
+
+
+def print_breakdown(decision_stats, kind='agent_phase'):
+    """按分组打印决策耗时（ms）与内存峰值（KB）的均值和分位数"""
+    print(f"{'Group':<26}{'Steps':>8}{'Mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'Max':>10}{'p95 Mem(KB)':>13}")
+    for name in decision_stats.keys(kind):
+        group = decision_stats.group((kind, name))
+        t = group['time'].summary()
+        m = group['mem'].summary()
+        label = " / ".join(str(v) for v in name) if isinstance(name, tuple) else str(name)
+        print(f"{label:<26}{t['count']:8d}{t['mean'] * 1000:10.2f}{t['p50'] * 1000:10.2f}"
+              f"{t['p95'] * 1000:10.2f}{t['p99'] * 1000:10.2f}{t['max'] * 1000:10.2f}{m['p95'] / 1024:13.1f}")
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""测试公用的夹具：仓库根目录加入 sys.path，并提供 Greedy 自对弈采样的局面"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def positions():
+    """开局到中局的 40 个 (局面, 玩家) 样本（12x12，固定种子）"""
+    from simulate_stats import sample_positions
+    return sample_positions(40, max_moves=160, seed=1, every=4)
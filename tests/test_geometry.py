@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+棋盘几何的预计算表与走法生成：默认 12x12 几何须与原来写死坐标的实现给出相同结果。
+下面的 baseline_* 函数即原 move_utils / AStarAI / BFSAgent / GreedyAI 中按坐标计算的版本。
+"""
+import random
+
+import numpy as np
+import pytest
+
+import ai.bfs_ai
+from ai.astar_ai import AStarAI
+from ai.bfs_ai import BFSAgent
+from ai.geometry import DEFAULT_GEOMETRY, get_geometry
+from ai.move_utils import get_all_moves, get_jump_moves, get_valid_moves
+
+STEPS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+JUMPS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def baseline_valid_moves(pos, board, geometry=None):
+    x, y = pos
+    return [(x + dx, y + dy) for dx, dy in STEPS
+            if 0 <= x + dx < board.shape[0] and 0 <= y + dy < board.shape[1] and board[x + dx, y + dy] == 0]
+
+
+def baseline_jump_moves(pos, board, geometry=None):
+    x, y = pos
+    moves = []
+    for dx, dy in JUMPS:
+        mx, my, lx, ly = x + dx, y + dy, x + 2 * dx, y + 2 * dy
+        if 0 <= mx < board.shape[0] and 0 <= my < board.shape[1] and board[mx, my] != 0:
+            if 0 <= lx < board.shape[0] and 0 <= ly < board.shape[1] and board[lx, ly] == 0:
+                moves.append((lx, ly))
+    return moves
+
+
+def baseline_all_moves(board, player_id):
+    moves = []
+    for pos in np.argwhere(board == player_id):
+        pos = tuple(int(v) for v in pos)
+        moves.extend((pos, m) for m in baseline_valid_moves(pos, board) + baseline_jump_moves(pos, board))
+    return moves
+
+
+def baseline_in_target(player_id, pos):
+    return {1: pos[0] >= 9 and pos[1] >= 9, 2: pos[0] >= 9 and pos[1] < 3,
+            3: pos[0] < 3 and pos[1] >= 9, 4: pos[0] < 3 and pos[1] < 3}[player_id]
+
+
+def baseline_in_stable(player_id, pos):
+    return {1: pos[0] >= 10 and pos[1] >= 10, 2: pos[0] >= 10 and pos[1] <= 1,
+            3: pos[0] <= 1 and pos[1] >= 10, 4: pos[0] <= 1 and pos[1] <= 1}[player_id]
+
+
+DEEP_TARGETS = {1: (11, 11), 2: (11, 0), 3: (0, 11), 4: (0, 0)}
+ASTAR_TARGETS = {1: (9, 9), 2: (9, 0), 3: (0, 9), 4: (0, 0)}
+
+
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+class BaselineAStar(AStarAI):
+    def heuristic(self, pos):
+        return manhattan(pos, ASTAR_TARGETS[self.player_id])
+
+    def in_target_area(self, pos):
+        return baseline_in_target(self.player_id, pos)
+
+    def get_neighbors(self, pos, board):
+        return baseline_valid_moves(pos, board) + baseline_jump_moves(pos, board)
+
+
+class BaselineBFS(BFSAgent):
+    def in_target_area(self, pos):
+        return baseline_in_target(self.player_id, pos)
+
+    def calculate_distance_to_target(self, pos):
+        return manhattan(pos, DEEP_TARGETS[self.player_id])
+
+
+def test_default_tables_match_fixed_coordinates():
+    g = DEFAULT_GEOMETRY
+    for p in (1, 2, 3, 4):
+        assert g.deep_targets[p] == DEEP_TARGETS[p]
+        assert g.entry_targets[p] == ASTAR_TARGETS[p]
+        for cell in g.cells:
+            assert g.in_target(p, cell) == baseline_in_target(p, cell)
+            assert g.in_stable(p, cell) == baseline_in_stable(p, cell)
+            assert g.distance_tables[p][cell] == manhattan(cell, DEEP_TARGETS[p])
+
+
+def test_move_generation_matches_baseline(positions):
+    for board, _ in positions:
+        for p in (1, 2, 3, 4):
+            assert get_all_moves(board, p) == baseline_all_moves(board, p)
+            for pos in map(tuple, np.argwhere(board == p).tolist()):
+                assert get_valid_moves(pos, board) == baseline_valid_moves(pos, board)
+                assert get_jump_moves(pos, board) == baseline_jump_moves(pos, board)
+
+
+def test_get_all_moves_positions_only(positions):
+    board, player = positions[-1]
+    assert get_all_moves(board, player, as_move_tuple=False) == [m for _, m in get_all_moves(board, player)]
+
+
+def test_astar_matches_baseline(positions):
+    for i, (board, player) in enumerate(positions):
+        random.seed(i)
+        expected = BaselineAStar(player).choose_move(board)
+        random.seed(i)
+        assert AStarAI(player).choose_move(board) == expected
+
+
+def test_bfs_matches_baseline(positions, monkeypatch):
+    agents = {p: BFSAgent(p, max_depth=4) for p in (1, 2, 3, 4)}
+    actual = []
+    for i, (board, player) in enumerate(positions):
+        random.seed(i)
+        actual.append(agents[player].choose_move(board))
+    # 基线版本的走法生成按坐标判断边界
+    monkeypatch.setattr(ai.bfs_ai, 'get_valid_moves', baseline_valid_moves)
+    monkeypatch.setattr(ai.bfs_ai, 'get_jump_moves', baseline_jump_moves)
+    for i, (board, player) in enumerate(positions):
+        random.seed(i)
+        assert BaselineBFS(player, max_depth=4).choose_move(board) == actual[i]
+
+
+@pytest.mark.parametrize('rows, cols, camp_size', [(10, 10, 3), (16, 16, 4), (12, 14, 3)])
+def test_tables_on_other_sizes(rows, cols, camp_size):
+    g = get_geometry(rows, cols, camp_size)
+    board = g.initial_board()
+    for p in (1, 2, 3, 4):
+        assert int(np.count_nonzero(board == p)) == camp_size * camp_size
+        # 目标区是对角玩家的起始区，开局时得分为 0，走法与按坐标计算的结果一致
+        assert g.target_score(board, p) == 0
+        assert get_all_moves(board, p, geometry=g) == baseline_all_moves(board, p)
+        deep = g.deep_targets[p]
+        assert g.in_target(p, deep)
+        assert g.distance_tables[p][deep] == 0
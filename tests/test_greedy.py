@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""GreedyAI 向量化打分与逐个循环实现的一致性"""
+import random
+
+import numpy as np
+
+from ai.geometry import get_geometry
+from ai.greedy_ai import GreedyAI
+from board import Board
+
+
+def test_vectorized_matches_loop(positions):
+    agents = {p: GreedyAI(p) for p in (1, 2, 3, 4)}
+    for i, (board, _) in enumerate(positions):
+        for p, agent in agents.items():
+            random.seed(i)
+            expected = agent.choose_move_loop(board)
+            random.seed(i)
+            assert agent.choose_move_vectorized(board) == expected
+
+
+def test_vectorized_matches_loop_on_other_geometry():
+    geometry = get_geometry(10, 10, 3)
+    board = Board(geometry)
+    agents = {p: GreedyAI(p, geometry=geometry) for p in (1, 2, 3, 4)}
+    loop_agents = {p: GreedyAI(p, vectorized=False, geometry=geometry) for p in (1, 2, 3, 4)}
+    player = 1
+    for i in range(60):
+        random.seed(i)
+        move = agents[player].choose_move(board.board)
+        random.seed(i)
+        assert loop_agents[player].choose_move(board.board) == move
+        if move is not None:
+            board.move_piece(*move)
+        player = player % 4 + 1
+
+
+def test_no_pieces_returns_none():
+    board = get_geometry(12, 12, 3).empty_board()
+    assert GreedyAI(1).choose_move_vectorized(board) is None
+    assert GreedyAI(1).choose_move_loop(np.zeros((12, 12), dtype=int)) is None
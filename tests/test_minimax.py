@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""根分裂并行搜索与串行搜索的结果一致"""
+import pytest
+
+from ai.geometry import get_geometry
+from ai.minimax_ai import MinimaxAI
+from ai.move_utils import get_all_moves
+from simulate_stats import sample_positions
+
+
+@pytest.fixture(scope='module')
+def parallel_agents():
+    agents = {}
+    yield agents
+    for agent in agents.values():
+        agent.close()
+
+
+def parallel_agent(agents, player, depth, geometry=None):
+    key = (player, depth, geometry)
+    if key not in agents:
+        agents[key] = MinimaxAI(player, depth=depth, geometry=geometry, workers=2)
+    return agents[key]
+
+
+def test_root_split_matches_serial_search(positions, parallel_agents):
+    for board, player in positions[::4]:
+        moves = get_all_moves(board, player)
+        if not moves:
+            continue
+        serial = MinimaxAI(player, depth=2).search_root(board, moves, 2)
+        parallel = parallel_agent(parallel_agents, player, 2).choose_root_parallel(board, moves)
+        assert parallel == serial
+
+
+def test_root_split_depth3_small_board(parallel_agents):
+    geometry = get_geometry(8, 8, 3)
+    for board, player in sample_positions(6, max_moves=60, geometry=geometry, seed=2, every=10):
+        serial = MinimaxAI(player, depth=3, geometry=geometry).choose_move(board)
+        parallel = parallel_agent(parallel_agents, player, 3, geometry).choose_move(board)
+        assert parallel == serial
+
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""增量走法表与完整重算的 get_all_moves 一致"""
+import random
+
+from ai.geometry import DEFAULT_GEOMETRY, get_geometry
+from ai.minimax_ai import MinimaxAI
+from ai.move_utils import get_all_moves
+from ai.movegen import MoveList
+from board import Board
+
+PLAYERS = (1, 2, 3, 4)
+
+
+def assert_matches(movelist, geometry):
+    for p in PLAYERS:
+        assert movelist.moves(p) == get_all_moves(movelist.board, p, geometry=geometry)
+
+
+def random_walk(movelist, geometry, rng, plies):
+    player = 1
+    for _ in range(plies):
+        moves = movelist.moves(player)
+        if moves:
+            movelist.apply(rng.choice(moves))
+            assert_matches(movelist, geometry)
+        player = player % 4 + 1
+
+
+def test_apply_and_undo_match_full_generation(positions):
+    rng = random.Random(3)
+    for board, _ in positions[::5]:
+        movelist = MoveList(board)
+        assert_matches(movelist, DEFAULT_GEOMETRY)
+        random_walk(movelist, DEFAULT_GEOMETRY, rng, 24)
+        assert movelist.history
+        while movelist.history:
+            movelist.undo()
+            assert_matches(movelist, DEFAULT_GEOMETRY)
+        assert (movelist.board == board).all()
+        assert {p: dict(movelist.pieces[p]) for p in PLAYERS} == {p: dict(MoveList(board).pieces[p]) for p in PLAYERS}
+
+
+def test_other_board_sizes():
+    rng = random.Random(4)
+    for geometry in (get_geometry(8, 8, 3), get_geometry(10, 10, 3), get_geometry(12, 12, 4)):
+        movelist = MoveList(geometry.initial_board(), geometry)
+        random_walk(movelist, geometry, rng, 60)
+
+
+def test_copy_and_record_flags():
+    board = DEFAULT_GEOMETRY.initial_board()
+    copied = MoveList(board)
+    copied.apply(copied.moves(1)[0])
+    assert (board == DEFAULT_GEOMETRY.initial_board()).all()
+    shared = MoveList(board, copy=False, record=False)
+    move = shared.moves(1)[0]
+    shared.apply(move)
+    assert board[move[1]] == 1 and board[move[0]] == 0
+    assert shared.history == []
+
+
+def test_is_legal():
+    movelist = MoveList(DEFAULT_GEOMETRY.initial_board())
+    assert movelist.is_legal(((2, 0), (3, 0)), 1)
+    assert movelist.is_legal(((2, 0), (3, 0)))
+    assert not movelist.is_legal(((2, 0), (3, 0)), 2)
+    assert movelist.is_legal(((1, 0), (3, 0)), 1)       # 跳过 (2, 0)
+    assert not movelist.is_legal(((2, 0), (5, 0)), 1)
+    assert not movelist.is_legal(((4, 4), (5, 4)))      # 空格
+    assert not movelist.is_legal(((2, 0), (2, -1)), 1)  # 棋盘外
+    assert not movelist.is_legal(((20, 0), (21, 0)))
+
+
+def test_board_keeps_move_list_in_sync():
+    board = Board()
+    rng = random.Random(5)
+    player = 1
+    for _ in range(80):
+        moves = board.legal_moves(player)
+        assert moves == get_all_moves(board.board, player)
+        from_pos, to_pos = rng.choice(moves)
+        assert board.move_piece(from_pos, to_pos, validate=True, player_id=player)
+        player = player % 4 + 1
+    assert board.move_list.history == []
+
+
+def test_incremental_minimax_matches_copying_search(positions):
+    for board, player in positions[::3]:
+        before = board.copy()
+        fast = MinimaxAI(player, depth=2, incremental=True).choose_move(board)
+        slow = MinimaxAI(player, depth=2, incremental=False).choose_move(board)
+        assert fast == slow
+        assert (board == before).all()
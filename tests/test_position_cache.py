@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""局面缓存的键、命中统计与 LRU 淘汰"""
+import numpy as np
+
+from ai.geometry import DEFAULT_GEOMETRY, get_geometry
+from ai.move_utils import PositionCache, free_up_target_entry, get_all_moves
+
+
+def test_keys_distinguish_kind_player_and_geometry():
+    cache = PositionCache()
+    small, large = get_geometry(12, 12, 3), get_geometry(12, 12, 4)
+    board = np.zeros((12, 12), dtype=np.int8)
+    keys = {cache.key('moves', board, 1, small), cache.key('free_up', board, 1, small),
+            cache.key('moves', board, 2, small), cache.key('moves', board, 1, large)}
+    assert len(keys) == 4
+    # 其他整数类型的棋盘与 int8 棋盘共用同一个键
+    assert cache.key('moves', board.astype(np.int64), 1, small) == cache.key('moves', board, 1, small)
+    moved = board.copy()
+    moved[0, 0] = 1
+    assert cache.key('moves', moved, 1, small) != cache.key('moves', board, 1, small)
+
+
+def test_moves_hit_and_return_copies(positions):
+    cache = PositionCache()
+    for board, player in positions[:10]:
+        expected = get_all_moves(board, player)
+        first = cache.moves(board, player)
+        first.append(None)
+        assert cache.moves(board, player) == expected
+        assert cache.free_up_move(board, player) == free_up_target_entry(board, player)
+    stats = cache.stats()
+    assert stats['misses'] == 20 and stats['hits'] == 10
+    assert stats['hit_rate'] == 10 / 30
+    assert stats['entries'] == 20 and stats['memory_bytes'] > 0
+
+
+def test_lru_eviction():
+    cache = PositionCache(max_entries=2)
+    boards = [np.full((12, 12), i, dtype=np.int8) for i in range(3)]
+    calls = []
+
+    def compute(i):
+        calls.append(i)
+        return i
+
+    cache.lookup('v', boards[0], 1, lambda: compute(0))
+    cache.lookup('v', boards[1], 1, lambda: compute(1))
+    cache.lookup('v', boards[0], 1, lambda: compute(0))  # 0 变为最近使用
+    cache.lookup('v', boards[2], 1, lambda: compute(2))  # 淘汰 1
+    assert calls == [0, 1, 2]
+    assert cache.lookup('v', boards[0], 1, lambda: compute(0)) == 0
+    assert cache.lookup('v', boards[1], 1, lambda: compute(1)) == 1
+    assert calls == [0, 1, 2, 1]
+    assert cache.evictions == 2 and len(cache) == 2
+    memory = cache.memory_bytes
+    cache.resize(1)
+    assert len(cache) == 1 and cache.evictions == 3 and cache.memory_bytes < memory
+    cache.clear()
+    assert len(cache) == 0 and cache.memory_bytes == 0
+
+
+def test_canonical_values_shared_between_seats():
+    cache = PositionCache()
+    board = DEFAULT_GEOMETRY.initial_board()
+    assert cache.value('dist', board, 1, lambda: 1.5, canonical=True) == 1.5
+    # 初始局面对四个座位对称，其他座位命中玩家 1 的条目
+    for player in (2, 3, 4):
+        assert cache.value('dist', board, player, lambda: None, canonical=True) == 1.5
+    assert cache.hits == 3 and cache.misses == 1
+    assert cache.value('dist', board, 2, lambda: 2.0) == 2.0
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""流式统计与精确计算结果对比"""
+import random
+
+import numpy as np
+import pytest
+
+from stream_stats import DecisionStats, MetricSummary, QuantileSketch, RunningStats
+
+
+def sample(seed, n=5000):
+    rng = random.Random(seed)
+    # 决策耗时近似对数正态，夹杂少量 0（如直接走目标区内的着法）
+    return [0.0 if rng.random() < 0.02 else rng.lognormvariate(-4, 1.5) for _ in range(n)]
+
+
+def exact_quantile(values, q):
+    """与草图相同的取法：排序后第 floor(q * (n - 1)) 个数"""
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+@pytest.mark.parametrize('accuracy', [0.01, 0.05])
+def test_sketch_quantiles_within_relative_accuracy(accuracy):
+    values = sample(1)
+    sketch = QuantileSketch(accuracy)
+    for x in values:
+        sketch.add(x)
+    assert sketch.count == len(values)
+    for q in (0.0, 0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 1.0):
+        exact = exact_quantile(values, q)
+        estimate = sketch.quantile(q)
+        if exact == 0.0:
+            assert estimate == 0.0
+        else:
+            assert abs(estimate - exact) <= accuracy * exact * (1 + 1e-9)
+
+
+def test_sketch_merge_equals_single_sketch():
+    values = sample(2)
+    whole = QuantileSketch()
+    parts = [QuantileSketch() for _ in range(4)]
+    for i, x in enumerate(values):
+        whole.add(x)
+        parts[i % 4].add(x)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert merged.buckets == whole.buckets
+    assert merged.zero_count == whole.zero_count
+    assert merged.count == whole.count
+    for q in (0.5, 0.95, 0.99):
+        assert merged.quantile(q) == whole.quantile(q)
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(0.05))
+
+
+def test_empty_sketch():
+    assert QuantileSketch().quantile(0.5) == 0.0
+
+
+def test_running_stats_merge_matches_numpy():
+    values = sample(3)
+    parts = [RunningStats() for _ in range(3)]
+    for i, x in enumerate(values):
+        parts[min(i // 1000, 2)].add(x)
+    merged = RunningStats().merge(parts[0]).merge(parts[1]).merge(parts[2])
+    assert merged.count == len(values)
+    assert merged.mean == pytest.approx(np.mean(values), rel=1e-9)
+    assert merged.variance() == pytest.approx(np.var(values, ddof=1), rel=1e-9)
+    assert merged.min == min(values) and merged.max == max(values)
+    assert merged.total == pytest.approx(sum(values), rel=1e-9)
+
+
+def test_decision_stats_merge():
+    values = sample(4, n=400)
+    whole, left, right = DecisionStats(), DecisionStats(), DecisionStats()
+    for i, x in enumerate(values):
+        args = (i % 4 + 1, 'greedy' if i % 3 else 'mcts', ('opening', 'middle', 'endgame')[i % 3], x, i * 100)
+        whole.record(*args)
+        (left if i % 2 else right).record(*args)
+    merged = left.merge(right)
+    assert merged.keys('agent') == ['greedy', 'mcts']
+    for key, group in whole.groups.items():
+        for metric in ('time', 'mem'):
+            expected, actual = group[metric].summary(), merged.group(key)[metric].summary()
+            assert actual['count'] == expected['count']
+            for field in ('mean', 'std', 'max', 'p50', 'p95', 'p99'):
+                assert actual[field] == pytest.approx(expected[field], rel=1e-9)
+
+
+def test_metric_summary_fields():
+    summary = MetricSummary()
+    for x in range(1, 101):
+        summary.add(x / 1000)
+    result = summary.summary()
+    assert result['count'] == 100
+    assert result['mean'] == pytest.approx(0.0505)
+    assert result['p50'] == pytest.approx(0.050, rel=0.01)
+    assert result['p99'] == pytest.approx(0.099, rel=0.01)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Zobrist 局面哈希与重复局面检测"""
+import random
+
+from ai.geometry import DEFAULT_GEOMETRY, get_geometry
+from ai.move_utils import get_all_moves
+from board import Board, PositionHistory
+from simulate_stats import simulate_game_with_stats
+
+
+def test_incremental_hash_matches_full_hash():
+    g = DEFAULT_GEOMETRY
+    board = Board()
+    rng = random.Random(7)
+    player = 1
+    h = g.position_hash(board.board, player)
+    for _ in range(80):
+        move = rng.choice(get_all_moves(board.board, player))
+        next_player = player % 4 + 1
+        h = g.hash_after_move(h, move, player, next_player)
+        board.move_piece(*move)
+        assert h == g.position_hash(board.board, next_player)
+        player = next_player
+
+
+def test_hash_depends_on_player_to_move_and_pieces():
+    g = DEFAULT_GEOMETRY
+    board = g.initial_board()
+    hashes = {g.position_hash(board, p) for p in (1, 2, 3, 4)}
+    assert len(hashes) == 4
+    moved = board.copy()
+    moved[3, 0], moved[2, 0] = 1, 0
+    assert g.position_hash(moved, 1) != g.position_hash(board, 1)
+    # 同一颗棋子换成另一玩家的棋子，哈希也不同
+    swapped = board.copy()
+    swapped[0, 0] = 2
+    assert g.position_hash(swapped, 1) != g.position_hash(board, 1)
+
+
+def test_history_counts_repetitions():
+    g = get_geometry(10, 10, 3)
+    board = g.initial_board()
+    history = PositionHistory(g)
+    history.push(board, 1)
+    forward, other = ((2, 0), (3, 0)), ((2, 1), (3, 1))
+    assert history.would_repeat(board, forward, 1) == 0
+    for i in range(2):
+        board[3, 0], board[2, 0] = 1, 0
+        history.push(board, 1, moved_player=1)
+        board[2, 0], board[3, 0] = 1, 0
+        history.push(board, 1, moved_player=1)
+    assert history.repetitions() == 3
+    assert history.cycle_length() == 2
+    # 初始局面没有 moved_player，不计入该玩家的棋子分布
+    assert history.player_repetitions(1) == 2
+    assert history.would_repeat(board, forward, 1, next_player=1) == 2
+    assert history.would_repeat(board, other, 1, next_player=1) == 0
+
+
+class Shuttle:
+    """来回挪动同一颗棋子的 AI"""
+    def __init__(self, forward):
+        self.forward = forward
+        self.reverse = (forward[1], forward[0])
+        self.count = 0
+
+    def choose_move(self, board):
+        self.count += 1
+        return self.forward if self.count % 2 else self.reverse
+
+
+def test_simulation_stops_on_repetition():
+    g = DEFAULT_GEOMETRY
+    agents = {1: Shuttle(((2, 0), (3, 0))), 2: Shuttle(((2, 11), (3, 11))),
+              3: Shuttle(((9, 0), (8, 0))), 4: Shuttle(((9, 11), (8, 11)))}
+    result = simulate_game_with_stats(200, agents, g, repetition_limit=3, track_memory=False)
+    assert result['termination'] in ('repetition', 'cycle')
+    assert result['moves'] < 40
+    assert result['cycle_length'] == 8
+    # 默认不检测重复，下满步数
+    agents = {p: Shuttle(a.forward) for p, a in agents.items()}
+    result = simulate_game_with_stats(40, agents, g, track_memory=False)
+    assert result['termination'] == 'max_moves'
+    assert result['moves'] == 40
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+AI 参数调优：在搜索空间中抽取若干组参数，用逐次减半（successive halving）在模拟对局上筛选。
+
+每组参数作为 A 与固定的对手 B 对抗（座位安排与计分同 match.py：A、B 各占一组对角座位、逐局交换，
+按两队目标区域内棋子总数判胜负和），记录得分与 A 每步决策的平均耗时。
+第 0 轮每组下 min_games 局，之后每轮只保留目标值排名前 1/eta 的参数组，并把局数补到上一轮的 eta 倍，
+直到只剩一组。所有对局提交到同一个进程池并行进行；同一编号的对局对所有参数组使用相同的随机种子，
+减小组间比较的方差。
+
+目标值 = 得分率 - latency_weight * 平均每步耗时（秒），latency_weight 为 0 时只看强度。
+结果同时给出「得分率-耗时」的 Pareto 前沿，便于在强度与速度之间取舍。
+"""
+import math
+import time
+import random
+import itertools
+import multiprocessing
+import concurrent.futures
+
+# 为了加快模拟速度，取消 sleep 延时
+time.sleep = lambda x: None
+
+from match import play_match_game, SEATS
+from stream_stats import MetricSummary
+
+# 各 AI 的默认搜索空间：{参数名: 候选值列表}，参数名需在 ai/registry.py 中登记
+SEARCH_SPACES = {
+    'MCTS': {'exploration': [0.5, 1.0, 1.4, 2.0],
+             'rollout_depth': [5, 10, 15, 25],
+             'time_limit': [0.1, 0.25, 0.5]},
+    'Greedy': {'target_bonus': [0, 10, 20, 50],
+               'last_piece_bonus': [20, 50, 100, 200]},
+    'Minimax': {'depth': [1, 2, 3]},
+    'BFS': {'max_depth': [4, 6, 8, 10]},
+}
+
+
+class Trial:
+    """一组参数的累计结果"""
+    def __init__(self, params):
+        self.params = params
+        self.outcomes = []
+        self.move_times = MetricSummary()
+
+    @property
+    def games(self):
+        return len(self.outcomes)
+
+    def score(self):
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def latency(self):
+        return self.move_times.mean
+
+    def objective(self, latency_weight):
+        return self.score() - latency_weight * self.latency()
+
+    def label(self):
+        return ",".join(f"{k}={v}" for k, v in self.params.items()) or "(默认参数)"
+
+
+def sample_configs(space, n_configs, rng):
+    """网格不超过 n_configs 组时全部使用，否则随机抽取 n_configs 组不重复的参数"""
+    keys = list(space)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+    if len(grid) <= n_configs:
+        return grid
+    return rng.sample(grid, n_configs)
+
+
+def pareto_front(trials):
+    """得分率更高且耗时更短两方面都不被其他参数组同时超过的参数组，按耗时排序"""
+    front = [t for t in trials
+             if not any(o.score() >= t.score() and o.latency() <= t.latency()
+                        and (o.score() > t.score() or o.latency() < t.latency()) for o in trials)]
+    return sorted(front, key=lambda t: t.latency())
+
+
+def successive_halving(agent, space=None, opponent='Greedy', n_configs=16, eta=2, min_games=4,
+                       max_moves=60, latency_weight=0.0, workers=None, seed=None,
+                       geometry=None, repetition_limit=None, adjudicate=False, verbose=True):
+    """
+    :param agent: 要调参的 AI 注册名
+    :param space: 搜索空间，默认 SEARCH_SPACES[agent]
+    :param opponent: 对手，注册名或 (注册名, 参数字典)
+    :param n_configs: 抽取的参数组数
+    :param eta: 每轮保留前 1/eta，局数乘以 eta
+    :param min_games: 第 0 轮每组的局数（取偶数使座位均衡）
+    :param latency_weight: 目标值中每秒平均耗时的扣分
+    :param adjudicate: 按两队得分之和判断是否定局并提前结束（见 match.play_match_game）
+    返回 (最佳 Trial, 全部 Trial 列表)
+    """
+    if eta < 2:
+        raise ValueError(f"eta 至少为 2，实际为 {eta}")
+    space = space if space is not None else SEARCH_SPACES[agent]
+    seed = random.randrange(2 ** 31) if seed is None else seed
+    rng = random.Random(seed)
+    trials = [Trial(params) for params in sample_configs(space, n_configs, rng)]
+    workers = workers or multiprocessing.cpu_count()
+    min_games += min_games % 2
+    survivors = trials
+    games = min_games
+    rung = 0
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            futures = {}
+            for trial in survivors:
+                for index in range(trial.games, games):
+                    future = executor.submit(play_match_game, index, (agent, trial.params), opponent, max_moves,
+                                             geometry, repetition_limit, adjudicate, seed)
+                    futures[future] = (trial, index)
+            for future in concurrent.futures.as_completed(futures):
+                trial, index = futures[future]
+                outcome, result = future.result()
+                seats_a = SEATS[index % 2]
+                trial.outcomes.append(outcome)
+                for p in seats_a:
+                    trial.move_times.merge(result['stats'].seat(p)['time'])
+
+            survivors = sorted(survivors, key=lambda t: t.objective(latency_weight), reverse=True)
+            if verbose:
+                print(f"\n第 {rung} 轮：{len(survivors)} 组参数，每组 {games} 局")
+                for trial in survivors:
+                    print(f"  {trial.label():<50} 得分率 {trial.score() * 100:5.1f}%  "
+                          f"每步 {trial.latency() * 1000:7.1f} ms  目标值 {trial.objective(latency_weight):.3f}")
+            if len(survivors) == 1:
+                break
+            survivors = survivors[:max(1, math.ceil(len(survivors) / eta))]
+            games *= eta
+            rung += 1
+
+    return survivors[0], trials
+
+
+def print_tuning_result(agent, opponent, best, trials, latency_weight):
+    opponent_name = opponent if isinstance(opponent, str) else opponent[0]
+    print("\n========================================")
+    print(f"{agent} 调参（对手 {opponent_name}，耗时权重 {latency_weight:g}/s）")
+    print("------------------------------------------------")
+    print(f"最佳参数: {best.label()}")
+    print(f"得分率 {best.score() * 100:.1f}%（{best.games} 局）  平均每步 {best.latency() * 1000:.1f} ms  "
+          f"p95 {best.move_times.quantile(0.95) * 1000:.1f} ms")
+    print("------------------------------------------------")
+    print("得分率-耗时 Pareto 前沿：")
+    for trial in pareto_front(trials):
+        print(f"  {trial.label():<50} 得分率 {trial.score() * 100:5.1f}%  "
+              f"每步 {trial.latency() * 1000:7.1f} ms  ({trial.games} 局)")
+    print("========================================\n")
+
+
+if __name__ == '__main__':
+    best, trials = successive_halving('MCTS', opponent='Greedy', n_configs=16, eta=2, min_games=4,
+                                      latency_weight=0.2)
+    print_tuning_result('MCTS', 'Greedy', best, trials, 0.2)